@@ -1,8 +1,12 @@
 from flask import Flask
 
 from config.settings import Config
-from app.extensions import db, migrate, setup_async_sqlalchemy
+from app.extensions import db, migrate, compress, instrumentation, cache, read_replicas, rate_limiter, configure_engine_options, setup_async_sqlalchemy
 from app.routes import register_routes
+from app.services.catalog_version_service import register_catalog_version_events
+from app.services.fingerprint_service import backfill_fingerprints_command
+from app.services.image_variant_service import backfill_image_variants_command
+from app.services.product_document_service import backfill_product_documents_command
 
 def create_app(config_class=Config):
     """Application factory pattern"""
@@ -10,14 +14,30 @@ def create_app(config_class=Config):
     
     app.config.from_object(config_class)
     
+    # Pool sizing, engine tuning and read replicas from the DB_* settings
+    configure_engine_options(app)
+
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    compress.init_app(app)
+    instrumentation.init_app(app)
+    cache.init_app(app)
+    read_replicas.init_app(app)
+    rate_limiter.init_app(app)
     
     with app.app_context():
         setup_async_sqlalchemy(app)
+
+    # Keep seller.catalog_version in step with every catalog write
+    register_catalog_version_events()
     
     # Register blueprints
     register_routes(app)
+
+    # flask backfill-fingerprints / backfill-product-documents / backfill-image-variants
+    app.cli.add_command(backfill_fingerprints_command)
+    app.cli.add_command(backfill_product_documents_command)
+    app.cli.add_command(backfill_image_variants_command)
     
     return app
\ No newline at end of file
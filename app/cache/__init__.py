@@ -0,0 +1,4 @@
+from app.cache.backends import MemoryBackend, RedisBackend, SQLiteBackend, create_backend
+from app.cache.cache import MISSING, Cache
+from app.cache.local import LocalLRU
+from app.cache.single_flight import SingleFlight
@@ -0,0 +1,347 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # only needed with CACHE_BACKEND=redis
+    redis = None
+
+""" --------------------------------- L2: shared cache stores --------------------------------- """
+# Byte stores shared by every worker. They all offer the same small API: get / get_many / set /
+# add (set if absent) / delete, integer counters (incr / get_counters) used as tag versions and
+# an atomic token bucket (consume) used by the rate limiter.
+#
+#   memory -> in-process dict: tests and single-process runs (nothing is shared between workers)
+#   sqlite -> one SQLite file (WAL) shared by the workers of a host
+#   redis  -> any Redis-compatible server, shared by every host
+
+# CACHE_BACKEND=sqlite without CACHE_URL
+DEFAULT_SQLITE_PATH = os.path.join(tempfile.gettempdir(), "mbdatastream-cache.sqlite3")
+
+
+class MemoryBackend:
+    """In-process stand-in for the shared store."""
+
+    def __init__(self):
+        self._items = {}
+        self._counters = {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._get(key)
+
+    def get_many(self, keys):
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._items[key] = (value, _expires_at(ttl, time.monotonic()))
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._get(key) is not None:
+                return False
+
+            self._items[key] = (value, _expires_at(ttl, time.monotonic()))
+
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+            return self._counters[key]
+
+    def get_counters(self, keys):
+        with self._lock:
+            return {key: self._counters.get(key, 0) for key in keys}
+
+    def consume(self, key, rate, burst, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            allowed, tokens = _take(self._buckets.get(key), rate, burst, cost, now)
+            self._buckets[key] = (tokens, now)
+
+            return allowed, tokens
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._counters.clear()
+            self._buckets.clear()
+
+    def _get(self, key):
+        entry = self._items.get(key)
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._items[key]
+            return None
+
+        return value
+
+
+class SQLiteBackend:
+    """
+    Entries in a SQLite file, one connection per thread (and per process: connections are
+    never carried across a fork). Expired rows are purged every PURGE_EVERY writes.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entry "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_counter (key TEXT PRIMARY KEY, value INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL) WITHOUT ROWID"
+            )
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+
+        rows = self._connection().execute(
+            f"SELECT key, value FROM cache_entry WHERE key IN ({', '.join('?' * len(keys))}) "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (*keys, time.time())
+        )
+        found = dict(rows)
+
+        return [found.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute(
+            "INSERT INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+            (key, value, _expires_at(ttl, time.time()))
+        )
+        self._count_write(connection)
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        connection = self._connection()
+
+        # An expired row does not block the key
+        cursor = connection.execute(
+            "INSERT INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+            "WHERE cache_entry.expires_at IS NOT NULL AND cache_entry.expires_at <= ?",
+            (key, value, _expires_at(ttl, now), now)
+        )
+        self._count_write(connection)
+
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+
+    def incr(self, key):
+        connection = self._connection()
+
+        with _immediate(connection):
+            connection.execute(
+                "INSERT INTO cache_counter (key, value) VALUES (?, 1) "
+                "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+                (key,)
+            )
+
+            return connection.execute("SELECT value FROM cache_counter WHERE key = ?", (key,)).fetchone()[0]
+
+    def get_counters(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        found = dict(self._connection().execute(
+            f"SELECT key, value FROM cache_counter WHERE key IN ({', '.join('?' * len(keys))})", keys
+        ))
+
+        return {key: found.get(key, 0) for key in keys}
+
+    def consume(self, key, rate, burst, cost=1):
+        connection = self._connection()
+
+        with _immediate(connection):
+            now = time.time()
+            state = connection.execute("SELECT tokens, updated_at FROM cache_bucket WHERE key = ?", (key,)).fetchone()
+            allowed, tokens = _take(state, rate, burst, cost, now)
+
+            connection.execute(
+                "INSERT INTO cache_bucket (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now)
+            )
+
+        return allowed, tokens
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_entry")
+        connection.execute("DELETE FROM cache_counter")
+        connection.execute("DELETE FROM cache_bucket")
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None or self._local.pid != os.getpid():
+            # Autocommit: every statement is its own transaction
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
+
+    def _count_write(self, connection):
+        self._writes += 1
+
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute("DELETE FROM cache_entry WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+
+class RedisBackend:
+    """Redis (or a compatible server: Valkey, KeyDB, ...) reached through redis-py."""
+
+    # Same arithmetic as _take, run atomically on the server (its clock, not the workers')
+    CONSUME_SCRIPT = """
+        local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+        local tokens = burst
+        if state[1] then
+            tokens = math.min(burst, tonumber(state[1]) + (now - tonumber(state[2])) * rate)
+        end
+        local allowed = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+        return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis needs the redis package (pip install redis)")
+
+        self.client = redis.Redis.from_url(url)
+        self._consume = self.client.register_script(self.CONSUME_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+
+        return self.client.mget(keys) if keys else []
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, px=_milliseconds(ttl))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, value, px=_milliseconds(ttl), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def get_counters(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        return {key: int(value or 0) for key, value in zip(keys, self.client.mget(keys))}
+
+    def consume(self, key, rate, burst, cost=1):
+        allowed, tokens = self._consume(keys=[key], args=[rate, burst, cost])
+
+        return bool(allowed), float(tokens)
+
+    def clear(self):
+        # Only meant for tests and local runs: drops the whole logical database
+        self.client.flushdb()
+
+
+def create_backend(name, url=None):
+    """The L2 store for CACHE_BACKEND / CACHE_URL."""
+    if name == "memory":
+        return MemoryBackend()
+
+    if name == "sqlite":
+        return SQLiteBackend(url or DEFAULT_SQLITE_PATH)
+
+    if name == "redis":
+        return RedisBackend(url)
+
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r} (expected memory, sqlite or redis)")
+
+
+def _take(state, rate, burst, cost, now):
+    """Token bucket step: refill <rate> tokens per second up to <burst>, then take <cost>."""
+    if state is None:
+        tokens = burst
+    else:
+        tokens, updated_at = state
+        tokens = min(burst, tokens + max(0.0, now - updated_at) * rate)
+
+    if tokens >= cost:
+        return True, tokens - cost
+
+    return False, tokens
+
+
+def _expires_at(ttl, now):
+    return None if ttl is None else now + ttl
+
+
+def _milliseconds(ttl):
+    return None if ttl is None else max(1, int(ttl * 1000))
+
+
+class _immediate:
+    """BEGIN IMMEDIATE ... COMMIT on an autocommit sqlite3 connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
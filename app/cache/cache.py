@@ -0,0 +1,238 @@
+import logging
+import pickle
+import time
+import uuid
+from app.cache.backends import create_backend
+from app.cache.local import LocalLRU
+from app.utils.metrics import registry
+
+""" --------------------------------- Two-tier cache --------------------------------- """
+# get / set / delete / get_or_set with a TTL and tags, over two tiers:
+#   L1 -> LocalLRU in each worker (no I/O, values kept as Python objects)
+#   L2 -> the shared store picked by CACHE_BACKEND (see backends.py)
+#
+# Tags are version counters kept in L2. An entry records the versions of its tags when it is
+# written and is ignored once any of them moved, so invalidate_tags() is one INCR per tag and
+# reaches every worker. The worker that invalidates also drops its own L1 entries at once; the
+# others stop serving theirs within CACHE_L1_TTL seconds.
+#
+# L2 errors are logged and counted, never raised: a broken cache store degrades to misses.
+# Cached values are shared between requests and must be treated as read-only.
+
+log = logging.getLogger(__name__)
+
+MISSING = object()
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by tier that answered (l1, l2, miss).", ("result",)
+)
+CACHE_ERRORS = registry.counter(
+    "cache_errors_total", "Shared cache store operations that failed.", ("operation",)
+)
+
+
+class Cache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.local = None
+        self.prefix = ""
+        self.default_ttl = 300
+        self.l1_ttl = 5
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "sqlite")
+        app.config.setdefault("CACHE_URL", None)
+        app.config.setdefault("CACHE_KEY_PREFIX", "mbds:")
+        app.config.setdefault("CACHE_DEFAULT_TTL", 300)
+        app.config.setdefault("CACHE_L1_MAX_ENTRIES", 2048)
+        app.config.setdefault("CACHE_L1_MAX_BYTES", 64 * 1024 * 1024)
+        app.config.setdefault("CACHE_L1_TTL", 5)
+
+        backend = app.config["CACHE_BACKEND"]
+
+        # "none" keeps the API but caches nothing
+        self.backend = None if backend == "none" else create_backend(backend, app.config["CACHE_URL"])
+        self.local = LocalLRU(app.config["CACHE_L1_MAX_ENTRIES"], app.config["CACHE_L1_MAX_BYTES"])
+        self.prefix = app.config["CACHE_KEY_PREFIX"]
+        self.default_ttl = app.config["CACHE_DEFAULT_TTL"]
+        self.l1_ttl = app.config["CACHE_L1_TTL"]
+
+        app.extensions["cache"] = self
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get(self, key, default=None):
+        if not self.enabled:
+            CACHE_REQUESTS.inc(result="miss")
+            return default
+
+        key = self.prefix + key
+
+        hit = self.local.get(key)
+        if hit is not None:
+            CACHE_REQUESTS.inc(result="l1")
+            return hit[0]
+
+        data = self._call("get", key)
+        entry = self._load(data) if data is not None else None
+
+        if entry is None:
+            CACHE_REQUESTS.inc(result="miss")
+            return default
+
+        value, versions, expires_at = entry
+
+        if versions and self._tag_versions(versions) != versions:
+            CACHE_REQUESTS.inc(result="miss")
+            return default
+
+        remaining = self.l1_ttl if expires_at is None else min(self.l1_ttl, expires_at - time.time())
+        if remaining > 0:
+            self.local.set(key, value, versions, len(data), remaining)
+
+        CACHE_REQUESTS.inc(result="l2")
+
+        return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        """
+        Stores <value> for <ttl> seconds (CACHE_DEFAULT_TTL by default) under the given tags.
+        The value is tied to the tag versions read now: to avoid caching a value computed before
+        a concurrent invalidation, use get_or_set, which reads them before computing.
+        """
+        if not self.enabled:
+            return
+
+        self._store(key, value, ttl, self._tag_versions(tags))
+
+    def get_or_set(self, key, compute, ttl=None, tags=()):
+        """The cached value, or compute() stored under <key> and returned."""
+        value = self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        versions = self._tag_versions(tags) if self.enabled else {}
+        value = compute()
+
+        if self.enabled:
+            self._store(key, value, ttl, versions)
+
+        return value
+
+    def delete(self, key):
+        if not self.enabled:
+            return
+
+        key = self.prefix + key
+        self.local.delete(key)
+        self._call("delete", key)
+
+    def invalidate_tags(self, tags):
+        """Every entry stored under any of <tags> stops being served."""
+        tags = set(tags)
+        if not self.enabled or not tags:
+            return
+
+        for tag in sorted(tags):
+            self._call("incr", self._tag_key(tag))
+
+        self.local.drop_tags(tags)
+
+    def clear(self):
+        if not self.enabled:
+            return
+
+        self.local.clear()
+        self._call("clear")
+
+    def acquire_lock(self, name, ttl):
+        """
+        Token of a lock held in L2 for at most <ttl> seconds, or None when another holder has
+        it (or the store is unavailable). Locks coordinate work between workers; they are
+        advisory and expire on their own if the holder dies.
+        """
+        if not self.enabled:
+            return None
+
+        token = uuid.uuid4().hex
+
+        return token if self._call("add", self._lock_key(name), token.encode(), ttl) else None
+
+    def lock_owner(self, name):
+        """Token of the current holder of the lock, None when free."""
+        if not self.enabled:
+            return None
+
+        token = self._call("get", self._lock_key(name))
+
+        return token.decode() if token is not None else None
+
+    def release_lock(self, name, token):
+        if self.lock_owner(name) == token:
+            self._call("delete", self._lock_key(name))
+
+    def consume(self, name, rate, burst, cost=1):
+        """
+        Takes <cost> tokens from the shared token bucket <name> (refilled at <rate> per second,
+        holding at most <burst>). Returns (allowed, tokens left), or None without a store.
+        """
+        if not self.enabled:
+            return None
+
+        return self._call("consume", f"{self.prefix}bucket:{name}", rate, burst, cost)
+
+    def _store(self, key, value, ttl, versions):
+        if versions is None:
+            # Tag versions unknown: the entry could never be invalidated
+            return
+
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl else None
+
+        try:
+            data = pickle.dumps((value, versions, expires_at), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            log.warning("Value of cache key %s cannot be pickled, not cached", key, exc_info=True)
+            return
+
+        key = self.prefix + key
+        self.local.set(key, value, versions, len(data), min(self.l1_ttl, ttl) if ttl else self.l1_ttl)
+        self._call("set", key, data, ttl or None)
+
+    def _tag_versions(self, tags):
+        """{tag: current version}; a failed read returns None, which never matches stored versions."""
+        tags = sorted(tags)
+        if not tags:
+            return {}
+
+        counters = self._call("get_counters", [self._tag_key(tag) for tag in tags])
+        if counters is None:
+            return None
+
+        return {tag: counters[self._tag_key(tag)] for tag in tags}
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}tag:{tag}"
+
+    def _lock_key(self, name):
+        return f"{self.prefix}lock:{name}"
+
+    def _load(self, data):
+        try:
+            return pickle.loads(data)
+        except Exception:
+            log.warning("Unreadable cache entry, ignored", exc_info=True)
+            return None
+
+    def _call(self, operation, *args):
+        try:
+            return getattr(self.backend, operation)(*args)
+        except Exception:
+            CACHE_ERRORS.inc(operation=operation)
+            log.warning("Cache store %s failed", operation, exc_info=True)
+            return None
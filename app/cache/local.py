@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+
+""" --------------------------------- L1: per-process LRU --------------------------------- """
+# Bounded by entry count and by the pickled size of the values. Entries live at most
+# CACHE_L1_TTL seconds: invalidations made by other workers reach this tier within that delay.
+
+
+class LocalLRU:
+    """Thread-safe LRU of key -> (value, tags, size, expires_at)."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(value, tags) or None when missing or expired."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+
+            value, tags, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._items[key]
+                self.total_bytes -= size
+                return None
+
+            self._items.move_to_end(key)
+
+            return value, tags
+
+    def set(self, key, value, tags, size, ttl):
+        if self.max_entries <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+
+            self._items[key] = (value, frozenset(tags), size, time.monotonic() + ttl)
+            self.total_bytes += size
+
+            while self._items and (len(self._items) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= evicted[2]
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._items.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[2]
+
+    def drop_tags(self, tags):
+        """Removes every entry carrying any of the tags."""
+        tags = set(tags)
+
+        with self._lock:
+            for key in [key for key, entry in self._items.items() if entry[1] & tags]:
+                self.total_bytes -= self._items.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,118 @@
+import threading
+import time
+from app.cache.cache import MISSING
+from app.utils.metrics import registry
+
+""" --------------------------------- Single-flight (request coalescing) --------------------------------- """
+# Concurrent calls with the same key run compute() once: the first caller (the leader) runs it,
+# the others wait for it and get the same result (or exception). Within a worker the callers are
+# threads waiting on an Event. Across workers (given a cache) the leader also takes a lock in the
+# shared cache and publishes its result there under the lock token; leaders of other workers
+# that find the lock taken poll for that result instead of running their own computation.
+#
+# Nothing is cached beyond the flight itself: the shared result lives RESULT_TTL seconds, keyed
+# by the lock token, so only callers that waited on that very computation ever read it.
+
+# Lifetime of a result published for other workers
+RESULT_TTL = 5
+
+SINGLE_FLIGHT_CALLS = registry.counter(
+    "single_flight_calls_total",
+    "Coalesced computations by outcome (leader ran it, shared in-process, shared from another worker, timeout).",
+    ("result",)
+)
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, timeout=10, cache=None, poll_interval=0.025):
+        """
+        compute()'s result, computed once for all concurrent callers of <key>. Callers that wait
+        longer than <timeout> seconds give up and compute on their own. With a <cache> (see
+        app.cache.Cache) the computation is also shared with the other workers.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                SINGLE_FLIGHT_CALLS.inc(result="timeout")
+                return compute()
+
+            SINGLE_FLIGHT_CALLS.inc(result="shared")
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.result
+
+        try:
+            if cache is not None and cache.enabled:
+                flight.result = self._do_shared(key, compute, timeout, cache, poll_interval)
+            else:
+                SINGLE_FLIGHT_CALLS.inc(result="leader")
+                flight.result = compute()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+            flight.done.set()
+
+        return flight.result
+
+    def _do_shared(self, key, compute, timeout, cache, poll_interval):
+        lock_name = f"single-flight:{key}"
+        token = cache.acquire_lock(lock_name, timeout)
+
+        if token is not None:
+            try:
+                SINGLE_FLIGHT_CALLS.inc(result="leader")
+                result = compute()
+                # Published before the lock goes, so waiters that see it released find the result
+                cache.set(f"{lock_name}:{token}", result, ttl=RESULT_TTL)
+
+                return result
+            finally:
+                cache.release_lock(lock_name, token)
+
+        owner = cache.lock_owner(lock_name)
+        deadline = time.monotonic() + timeout
+
+        while owner is not None and time.monotonic() < deadline:
+            time.sleep(poll_interval)
+
+            result = cache.get(f"{lock_name}:{owner}", MISSING)
+            if result is not MISSING:
+                SINGLE_FLIGHT_CALLS.inc(result="shared_remote")
+                return result
+
+            if cache.lock_owner(lock_name) != owner:
+                # Released without a result (the computation failed): do it here
+                break
+        else:
+            if owner is not None:
+                SINGLE_FLIGHT_CALLS.inc(result="timeout")
+                return compute()
+
+        SINGLE_FLIGHT_CALLS.inc(result="leader")
+
+        return compute()
@@ -1,6 +1,4 @@
-import boto3
 import os
-from botocore.exceptions import NoCredentialsError
 
 
 class S3ClientSingleton:
@@ -8,6 +6,9 @@ class S3ClientSingleton:
 
     def __new__(cls):
         if cls._instance is None:
+            # boto3 is imported on first use, workers that never touch S3 don't pay for it
+            import boto3
+
             instance = super(S3ClientSingleton, cls).__new__(cls)
             # Store the boto3 client in an attribute on the instance
             instance.client = boto3.client(
@@ -21,7 +22,14 @@ class S3ClientSingleton:
 
         return cls._instance
 
+    @classmethod
+    def reset_instance(cls):
+        """Drops the cached client; boto3 clients must not be shared across a fork."""
+        cls._instance = None
+
     def upload_image(self, file, bucket, object_name):
+        from botocore.exceptions import NoCredentialsError
+
         try:
             # Here, file is expected to be a file-like object (or already the binary content)
             self.client.put_object(
@@ -46,6 +54,8 @@ class S3ClientSingleton:
         :param object_name: The desired S3 object key.
         :return: True if the upload succeeded, False otherwise.
         """
+        from botocore.exceptions import NoCredentialsError
+
         try:
             with open(file_path, 'rb') as file:
                 self.client.put_object(
@@ -69,6 +79,8 @@ class S3ClientSingleton:
         :param bucket: The name of the S3 bucket.
         :return: A list of dictionaries containing image names, their URLs, and a product code.
         """
+        from botocore.exceptions import NoCredentialsError
+
         images = []
         continuation_token = None
 
@@ -85,6 +97,9 @@ class S3ClientSingleton:
                 if 'Contents' in response:
                     for obj in response['Contents']:
                         image_name = obj['Key']
+                        # Resized copies (see image_variant_service) are not product images
+                        if image_name.startswith("variants/"):
+                            continue
                         image_url = f"https://{bucket}.s3.{os.environ.get('AWS_REGION_NAME')}.amazonaws.com/{image_name}"
                         cod_product = image_name.split(
                             "-")[0] if '-' in image_name else image_name
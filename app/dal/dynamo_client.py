@@ -1,13 +1,13 @@
-import boto3
 import os
-from botocore.exceptions import NoCredentialsError
-from boto3.dynamodb.types import TypeDeserializer
 
 class DynamoSingleton:
     _instance = None
     
     def __new__(cls):
         if cls._instance is None:
+            # boto3 is imported on first use, workers that never touch DynamoDB don't pay for it
+            import boto3
+
             instance = super(DynamoSingleton, cls).__new__(cls)
             
             instance.client = boto3.client(
@@ -19,6 +19,11 @@ class DynamoSingleton:
             cls._instance = instance
         
         return cls._instance
+
+    @classmethod
+    def reset_instance(cls):
+        """Drops the cached client; boto3 clients must not be shared across a fork."""
+        cls._instance = None
     
     def get_item_by_hash_key(self, table_name, hash_key_name, hash_key_value):
         """
@@ -31,6 +36,9 @@ class DynamoSingleton:
         :return: The item if found, otherwise None.
         """
         
+        from botocore.exceptions import NoCredentialsError
+        from boto3.dynamodb.types import TypeDeserializer
+
         try:
             response = self.client.get_item(
                 TableName=table_name,
@@ -0,0 +1,120 @@
+import random
+from functools import wraps
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.elements import TextClause
+from app.utils.metrics import registry
+
+""" --------------------------------- Read replicas --------------------------------- """
+# With DB_REPLICA_URLS set, every replica gets its own engine (a Flask-SQLAlchemy bind named
+# replica_<n>, same pool settings as the primary). GET/HEAD requests pick one replica when
+# they start and db.session reads from it; anything that writes goes to the primary:
+#   - a flush, an INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE or a non-SELECT text() statement
+#     pins the session to the primary for the rest of the request (it reads its own writes);
+#   - commit() always pins, so the catalog version hooks write on the primary;
+#   - views decorated with @use_primary, other methods and CLI commands never use a replica.
+# The async engine (spreadsheet import) only talks to the primary.
+
+REPLICA_BIND_PREFIX = "replica_"
+
+# session.info flag: the session wrote (or is about to), stay on the primary
+PINNED_TO_PRIMARY = "db_pinned_to_primary"
+
+# Statements that start with these words only read
+_READ_KEYWORDS = {"SELECT", "WITH", "SHOW", "EXPLAIN", "DESCRIBE", "PRAGMA"}
+
+DB_ROUTED_REQUESTS = registry.counter(
+    "db_routed_requests_total", "Requests by the engine their reads were routed to.", ("bind",)
+)
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries of the replica URLs (comma separated string or list)."""
+    if isinstance(urls, str):
+        urls = [url.strip() for url in urls.split(",")]
+
+    return {f"{REPLICA_BIND_PREFIX}{i}": url for i, url in enumerate(url for url in urls if url)}
+
+
+class RoutingSession(Session):
+    """db.session: sends the reads of replica-routed requests to the replica chosen for them."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self.info.get(PINNED_TO_PRIMARY):
+            replica = _request_replica()
+
+            if replica is not None:
+                if self._flushing or _is_write(clause):
+                    self.info[PINNED_TO_PRIMARY] = True
+                else:
+                    return self._db.engines[replica]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        # Before the before_commit hooks run: whatever they write must reach the primary
+        self.info[PINNED_TO_PRIMARY] = True
+
+        super().commit()
+
+
+class ReadReplicas:
+    """Chooses, per request, the replica that db.session reads from."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self.before_request)
+        app.extensions["read_replicas"] = self
+
+    def before_request(self):
+        g.db_replica = None
+
+        if request.method not in ("GET", "HEAD"):
+            return
+
+        view = current_app.view_functions.get(request.endpoint)
+        if view is None or getattr(view, "use_primary", False):
+            DB_ROUTED_REQUESTS.inc(bind="primary")
+            return
+
+        replicas = [key for key in current_app.extensions["sqlalchemy"].engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+        if replicas:
+            g.db_replica = random.choice(replicas)
+
+        DB_ROUTED_REQUESTS.inc(bind=g.db_replica or "primary")
+
+
+def use_primary(f):
+    """Marks a GET view whose reads must see the latest writes (it never reads a replica)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return f(*args, **kwargs)
+
+    decorated_function.use_primary = True
+
+    return decorated_function
+
+
+def _request_replica():
+    if not has_app_context():
+        return None
+
+    return g.get("db_replica")
+
+
+def _is_write(clause):
+    if clause is None:
+        return False
+
+    if getattr(clause, "is_dml", False) or getattr(clause, "_for_update_arg", None) is not None:
+        return True
+
+    if isinstance(clause, TextClause):
+        words = clause.text.split(None, 1)
+
+        return not words or words[0].upper() not in _READ_KEYWORDS
+
+    return False
@@ -1,19 +1,62 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from flask_migrate import Migrate
+from app.cache import Cache
+from app.dal.routing_session import ReadReplicas, RoutingSession, replica_binds
+from app.middleware.compression import Compress
+from app.middleware.instrumentation import Instrumentation
+from app.middleware.rate_limit import RateLimiter
 
-# Initialize the standard SQLAlchemy instance
-db = SQLAlchemy()
+# Initialize the standard SQLAlchemy instance (its session routes reads to the replicas, if any)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
+compress = Compress()
+instrumentation = Instrumentation()
+cache = Cache()
+read_replicas = ReadReplicas()
+rate_limiter = RateLimiter()
+
+def configure_engine_options(app):
+    """
+    Fills SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings, unless it was set explicitly,
+    and adds a bind per DB_REPLICA_URLS entry.
+    Must run before db.init_app, which creates the engine from these options.
+    """
+    config = app.config
+    db_uri = config.get('SQLALCHEMY_DATABASE_URI') or ''
+
+    options = {"query_cache_size": config.get('DB_QUERY_CACHE_SIZE', 500)}
+
+    # SQLite (local runs, benchmarks) keeps the pool Flask-SQLAlchemy picks for it
+    if not db_uri.startswith('sqlite'):
+        options.update(
+            pool_size=config.get('DB_POOL_SIZE', 5),
+            max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+            pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+            pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+            pool_pre_ping=config.get('DB_POOL_PRE_PING', True),
+        )
+
+    if db_uri.startswith('mysql'):
+        options["connect_args"] = {"connect_timeout": config.get('DB_CONNECT_TIMEOUT', 10)}
+
+    config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', options)
+
+    # One bind (engine and pool, same options) per read replica, see app.dal.routing_session
+    replicas = replica_binds(config.get('DB_REPLICA_URLS') or ())
+    if replicas:
+        binds = config.setdefault('SQLALCHEMY_BINDS', {})
+        for key, url in replicas.items():
+            binds.setdefault(key, url)
+
 
 # Function to setup async SQLAlchemy once app is created
 def setup_async_sqlalchemy(app):
     # Get the database URI from Flask config
     db_uri = app.config['SQLALCHEMY_DATABASE_URI']
     
-    print(db_uri)
-    
     # Convert database URIs to their async equivalents
     if db_uri.startswith('sqlite:'):
         async_uri = db_uri.replace('sqlite:', 'sqlite+aiosqlite:')
@@ -30,11 +73,24 @@ def setup_async_sqlalchemy(app):
     # print(f"Original URI: {db_uri}")
     # print(f"Async URI: {async_uri}")
     
-    # Create async engine
+    engine_options = {
+        "query_cache_size": app.config.get('DB_QUERY_CACHE_SIZE', 500)
+    }
+
+    if async_uri.startswith('mysql'):
+        engine_options["connect_args"] = {"connect_timeout": app.config.get('DB_CONNECT_TIMEOUT', 10)}
+
+    engine_options["echo"] = app.config.get('SQLALCHEMY_ECHO', False)
+
+    # Create async engine. process_excel runs each import on a fresh event loop, and pooled
+    # async connections are bound to the loop that opened them, so they must not be reused:
+    # pool size/overflow/recycle do not apply here, every session opens and closes its own.
+    # Long-running work on a single loop should use create_scoped_async_engine instead.
     async_engine = create_async_engine(
         async_uri,
-        echo=app.config.get('SQLALCHEMY_ECHO', False),
-        future=True
+        future=True,
+        poolclass=NullPool,
+        **engine_options
     )
     
     # Create async session factory
@@ -44,7 +100,30 @@ def setup_async_sqlalchemy(app):
         class_=AsyncSession
     )
     
-    # Add async session to db instance
+    # Add async engine and session to db instance
+    db.async_engine = async_engine
     db.async_session = async_session_factory
+    db.async_uri = async_uri
+    db.async_engine_options = engine_options
+    db.async_pool_options = {
+        "pool_timeout": app.config.get('DB_POOL_TIMEOUT', 30),
+        "pool_recycle": app.config.get('DB_POOL_RECYCLE', 1800),
+        "pool_pre_ping": app.config.get('DB_POOL_PRE_PING', True),
+    }
     
-    return async_engine
\ No newline at end of file
+    return async_engine
+
+
+def create_scoped_async_engine(pool_size, max_overflow=1):
+    """
+    Async engine with its own connection pool, for work that stays on one event loop
+    (e.g. a whole spreadsheet import). The caller must `await engine.dispose()` on that
+    same loop before closing it.
+    """
+    options = dict(db.async_engine_options)
+
+    # SQLite keeps the pool SQLAlchemy picks for it
+    if not db.async_uri.startswith('sqlite'):
+        options.update(db.async_pool_options, pool_size=pool_size, max_overflow=max_overflow)
+
+    return create_async_engine(db.async_uri, future=True, **options)
\ No newline at end of file
@@ -1,24 +1,59 @@
 from functools import wraps
+import hmac
 import os
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 
 
 def require_api_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         api_key = request.headers.get('API-Key')
-        
+
         if not api_key:
             return jsonify({"error": "API key is required"}), 401
-        
+
         # Validate API key
-        if not is_valid_api_key(api_key):
+        key_name = api_key_name(api_key)
+        if key_name is None:
             return jsonify({"error": "Invalid API key"}), 401
-        
+
+        # Token bucket of this key for the view's endpoint class (see rate_limit.py)
+        limiter = current_app.extensions.get("rate_limiter")
+        if limiter is not None:
+            limited = limiter.check(key_name, decorated_function)
+            if limited is not None:
+                return limited
+
         return f(*args, **kwargs)
-    
+
     return decorated_function
 
 
 def is_valid_api_key(api_key):
-    return api_key == os.environ.get("API_TOKEN")
\ No newline at end of file
+    return api_key_name(api_key) is not None
+
+
+def api_key_name(api_key):
+    """
+    Name of the integration the key belongs to, or None. API_TOKEN is the "default" key;
+    API_TOKENS adds named keys as "name:token,name:token" (names label the usage metrics).
+    """
+    for name, token in _configured_keys():
+        if hmac.compare_digest(api_key.encode(), token.encode()):
+            return name
+
+    return None
+
+
+def _configured_keys():
+    keys = []
+
+    if os.environ.get("API_TOKEN"):
+        keys.append(("default", os.environ["API_TOKEN"]))
+
+    for item in os.environ.get("API_TOKENS", "").split(","):
+        name, _, token = item.strip().partition(":")
+        if name and token:
+            keys.append((name, token))
+
+    return keys
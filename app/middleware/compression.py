@@ -0,0 +1,189 @@
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/csv",
+    "text/css",
+    "application/javascript",
+)
+
+
+class Compress:
+    """
+    Negotiated gzip/brotli compression of responses, registered as an after_request hook.
+
+    - Only responses larger than COMPRESS_MIN_SIZE and of a COMPRESS_MIMETYPES type are compressed
+      (XLSX/images are already deflated containers and are left alone).
+    - Streamed (generator) responses are compressed chunk by chunk, flushing after each chunk.
+    - With COMPRESS_CACHE_SIZE > 0, compressed bodies of responses carrying an ETag are kept in a
+      per-process LRU, so repeated catalog payloads are compressed only once.
+    """
+
+    def __init__(self, app=None):
+        self.cache = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_ENABLED", True)
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BR_LEVEL", 4)
+        app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+        app.config.setdefault("COMPRESS_CACHE_SIZE", 0)
+        app.config.setdefault("COMPRESS_CACHE_MAX_BYTES", 32 * 1024 * 1024)
+
+        if app.config["COMPRESS_CACHE_SIZE"]:
+            self.cache = CompressedCache(
+                app.config["COMPRESS_CACHE_SIZE"],
+                app.config["COMPRESS_CACHE_MAX_BYTES"]
+            )
+
+        if app.config["COMPRESS_ENABLED"]:
+            app.after_request(self.after_request)
+
+        app.extensions["compress"] = self
+
+    def after_request(self, response):
+        config = current_app.config
+
+        response.vary.add("Accept-Encoding")
+
+        if not self._should_compress(response, config):
+            return response
+
+        encoding = self._negotiate()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.response, encoding, config)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+
+            if len(data) < config["COMPRESS_MIN_SIZE"]:
+                return response
+
+            etag, weak = response.get_etag()
+            cache_key = (etag, encoding) if self.cache is not None and etag else None
+
+            compressed = self.cache.get(cache_key) if cache_key else None
+
+            if compressed is None:
+                compressed = self.compress(data, encoding, config)
+
+                if cache_key:
+                    self.cache.set(cache_key, compressed)
+
+            response.set_data(compressed)
+
+            # A strong ETag identifies exact bytes, so each encoding needs its own
+            if etag and not weak:
+                response.set_etag(f"{etag}-{encoding}")
+
+        response.headers["Content-Encoding"] = encoding
+
+        return response
+
+    def _should_compress(self, response, config):
+        if request.method == "HEAD":
+            return False
+
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+
+        if "Content-Encoding" in response.headers or response.direct_passthrough:
+            return False
+
+        return response.mimetype in config["COMPRESS_MIMETYPES"]
+
+    def _negotiate(self):
+        offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+        return request.accept_encodings.best_match(offered)
+
+    @staticmethod
+    def compress(data, encoding, config):
+        if encoding == "br":
+            return brotli.compress(data, quality=config["COMPRESS_BR_LEVEL"])
+
+        return gzip.compress(data, compresslevel=config["COMPRESS_LEVEL"])
+
+    @staticmethod
+    def _compress_stream(chunks, encoding, config):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=config["COMPRESS_BR_LEVEL"])
+
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+
+                data = compressor.process(chunk) + compressor.flush()
+                if data:
+                    yield data
+
+            yield compressor.finish()
+
+        else:
+            # wbits=31 -> gzip container
+            compressor = zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 31)
+
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+
+                data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                if data:
+                    yield data
+
+            yield compressor.flush()
+
+
+class CompressedCache:
+    """Small thread-safe LRU of compressed bodies keyed by (etag, encoding)."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+
+            if value is not None:
+                self._items.move_to_end(key)
+
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous)
+
+            self._items[key] = value
+            self.total_bytes += len(value)
+
+            while self._items and (len(self._items) > self.max_entries or self.total_bytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self.total_bytes -= len(evicted)
@@ -0,0 +1,79 @@
+from functools import wraps
+import hashlib
+from flask import request, make_response
+
+
+def conditional_get(etag_key=None):
+    """
+    Adds ETag / If-None-Match handling to a GET endpoint.
+
+    :param etag_key: optional callable receiving the view arguments and returning
+                     a cheap validator (e.g. a catalog version), or a
+                     (validator, last_modified) pair. When it returns a value, a
+                     matching If-None-Match answers 304 before the view runs, so
+                     no query or serializer is executed. When it is not given
+                     (or returns None), the ETag is a hash of the payload.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return f(*args, **kwargs)
+
+            etag = None
+            last_modified = None
+
+            if etag_key is not None:
+                key = etag_key(*args, **kwargs)
+
+                if isinstance(key, tuple):
+                    key, last_modified = key
+
+                if key is not None:
+                    etag = build_etag(request.full_path, key)
+
+                    if request.if_none_match.contains_weak(etag):
+                        return not_modified(etag, last_modified)
+
+                    if (not request.if_none_match and last_modified and request.if_modified_since
+                            and last_modified.replace(microsecond=0, tzinfo=None)
+                            <= request.if_modified_since.replace(tzinfo=None)):
+                        return not_modified(etag, last_modified)
+
+            response = make_response(f(*args, **kwargs))
+
+            if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                return response
+
+            if etag is None:
+                etag = hashlib.sha1(response.get_data()).hexdigest()
+
+            # Weak validators survive content-encoding (gzip/br) of the same payload
+            response.set_etag(etag, weak=True)
+            response.cache_control.no_cache = True
+
+            if last_modified:
+                response.last_modified = last_modified
+
+            return response.make_conditional(request)
+
+        return decorated_function
+
+    return decorator
+
+
+def build_etag(*parts):
+    raw = "|".join(str(part) for part in parts)
+
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def not_modified(etag, last_modified=None):
+    response = make_response("", 304)
+    response.set_etag(etag, weak=True)
+    response.cache_control.no_cache = True
+
+    if last_modified:
+        response.last_modified = last_modified
+
+    return response
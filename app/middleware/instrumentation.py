@@ -0,0 +1,206 @@
+import time
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+from app.utils.metrics import QUERY_COUNT_BUCKETS, registry
+
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Total request latency.", ("blueprint", "method")
+)
+REQUEST_DB_TIME = registry.histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per request.", ("blueprint",)
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("blueprint",),
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_SERIALIZATION_TIME = registry.histogram(
+    "http_request_serialization_duration_seconds", "Time spent encoding JSON per request.", ("blueprint",)
+)
+REQUESTS_TOTAL = registry.counter(
+    "http_requests_total", "Requests served.", ("blueprint", "method", "status")
+)
+DB_QUERIES_TOTAL = registry.counter(
+    "db_queries_total", "SQL statements executed, inside or outside requests.", ("context",)
+)
+DB_POOL_EVENTS = registry.counter(
+    "db_pool_events_total", "Connection pool events (connect, checkout, invalidate).", ("event",)
+)
+DB_POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections", "Connections held by each engine pool, by state.", ("engine", "state")
+)
+
+
+class Instrumentation:
+    """
+    Per-request query count, DB time, serialization time and total latency.
+
+    - SQL is timed by before/after_cursor_execute listeners on the Engine class, so the sync
+      Flask-SQLAlchemy engine and the async engine (through its sync proxy) are both covered.
+    - JSON encoding is timed by a JSON provider wrapping `dumps`, which `jsonify` goes through.
+    - Results go out as a Server-Timing header and feed the histograms exposed on /metrics.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("INSTRUMENTATION_ENABLED", True)
+        app.config.setdefault("SERVER_TIMING_HEADER", True)
+
+        if not app.config["INSTRUMENTATION_ENABLED"]:
+            return
+
+        register_query_events()
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+        app.extensions["instrumentation"] = self
+
+    @staticmethod
+    def before_request():
+        g.request_stats = RequestStats()
+
+    def after_request(self, response):
+        stats = g.pop("request_stats", None)
+        if stats is None:
+            return response
+
+        total = time.perf_counter() - stats.started_at
+        blueprint = request.blueprint or "app"
+
+        REQUEST_LATENCY.observe(total, blueprint=blueprint, method=request.method)
+        REQUEST_DB_TIME.observe(stats.db_time, blueprint=blueprint)
+        REQUEST_DB_QUERIES.observe(stats.query_count, blueprint=blueprint)
+        REQUEST_SERIALIZATION_TIME.observe(stats.serialization_time, blueprint=blueprint)
+        REQUESTS_TOTAL.inc(blueprint=blueprint, method=request.method, status=response.status_code)
+
+        if current_app.config["SERVER_TIMING_HEADER"]:
+            response.headers["Server-Timing"] = stats.server_timing(total)
+
+        return response
+
+
+class RequestStats:
+    __slots__ = ("started_at", "query_count", "db_time", "serialization_time")
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialization_time = 0.0
+
+    def server_timing(self, total):
+        return ", ".join((
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries"',
+            f"serialize;dur={self.serialization_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        stats = current_stats()
+        if stats is None:
+            return super().dumps(obj, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats.serialization_time += time.perf_counter() - start
+
+
+def current_stats():
+    if not has_request_context():
+        return None
+
+    return g.get("request_stats")
+
+
+""" --------------------------------- SQL listeners --------------------------------- """
+
+
+def register_query_events():
+    if event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+
+    for pool_event in ("connect", "checkout", "invalidate", "soft_invalidate"):
+        event.listen(Pool, pool_event, _pool_event_counter(pool_event))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started_at")
+    if not started:
+        return
+
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_stats()
+
+    if stats is None:
+        DB_QUERIES_TOTAL.inc(context="background")
+        return
+
+    DB_QUERIES_TOTAL.inc(context="request")
+    stats.query_count += 1
+    stats.db_time += elapsed
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute never fires for a failed statement, drop its start time
+    conn = exception_context.connection
+    started = conn.info.get("query_started_at") if conn is not None else None
+
+    if started:
+        started.pop()
+
+
+def _pool_event_counter(pool_event):
+    def listener(*args):
+        DB_POOL_EVENTS.inc(event=pool_event)
+
+    return listener
+
+
+""" --------------------------------- Pool stats --------------------------------- """
+
+
+def pool_stats(engine):
+    """Snapshot of an engine pool; QueuePool reports sizes, other pools only their class."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            timeout=pool.timeout(),
+        )
+
+    return stats
+
+
+def update_pool_gauges(engines):
+    """Refreshes the db_pool_connections gauge from {name: engine}, called on scrape."""
+    for name, engine in engines.items():
+        stats = pool_stats(engine)
+
+        for state in ("checked_in", "checked_out", "overflow"):
+            if state in stats:
+                DB_POOL_CONNECTIONS.set(stats[state], engine=name, state=state)
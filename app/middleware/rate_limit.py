@@ -0,0 +1,120 @@
+import math
+from flask import current_app, jsonify, request
+from app.cache import MemoryBackend
+from app.utils.metrics import registry
+
+""" --------------------------------- Per-API-key rate limiting --------------------------------- """
+# require_api_key charges every request to a token bucket per (API key, endpoint class).
+# RATE_LIMITS holds "class:rate:burst" budgets: <rate> tokens per second, at most <burst> saved.
+# Views opt into a class with @rate_limit_class; the rest are "default". Deep pages of the
+# listings cost more: one extra token per RATE_LIMIT_DEEP_PAGE_ITEMS rows skipped.
+#
+# RATE_LIMIT_STORAGE=memory keeps the buckets in each worker (the effective budget is then
+# multiplied by the worker count); "cache" keeps them in the shared cache store, so the
+# budget holds across workers and hosts. If the shared store fails, the worker's own
+# buckets are used for that request.
+
+DEFAULT_RATE_LIMITS = "default:20:60,export:0.05:3,import:0.02:2"
+
+API_REQUESTS = registry.counter(
+    "api_requests_total", "Requests by API key name, endpoint class and rate limit outcome.",
+    ("key", "endpoint_class", "result")
+)
+API_TOKENS_SPENT = registry.counter(
+    "api_rate_limit_tokens_total", "Rate limit tokens charged, by API key name and endpoint class.",
+    ("key", "endpoint_class")
+)
+
+
+def parse_rate_limits(spec):
+    """{endpoint class: (rate per second, burst)} from "class:rate:burst,..."."""
+    limits = {}
+
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+
+        name, rate, burst = item.split(":")
+        limits[name.strip()] = (float(rate), float(burst))
+
+    limits.setdefault("default", (20.0, 60.0))
+
+    return limits
+
+
+def rate_limit_class(name):
+    """Charges the view to the <name> budget of RATE_LIMITS instead of "default"."""
+    def decorator(f):
+        f.rate_limit_class = name
+
+        return f
+
+    return decorator
+
+
+class RateLimiter:
+    def __init__(self, app=None):
+        self.limits = {}
+        self.local = MemoryBackend()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATE_LIMIT_ENABLED", True)
+        app.config.setdefault("RATE_LIMITS", DEFAULT_RATE_LIMITS)
+        app.config.setdefault("RATE_LIMIT_STORAGE", "memory")
+        app.config.setdefault("RATE_LIMIT_DEEP_PAGE_ITEMS", 2000)
+        app.config.setdefault("RATE_LIMIT_MAX_COST", 10)
+
+        self.limits = parse_rate_limits(app.config["RATE_LIMITS"])
+
+        app.extensions["rate_limiter"] = self
+
+    def check(self, key_name, view):
+        """None when the request may go on, otherwise the 429 response to send."""
+        config = current_app.config
+        if not config["RATE_LIMIT_ENABLED"]:
+            return None
+
+        endpoint_class = getattr(view, "rate_limit_class", "default")
+        rate, burst = self.limits.get(endpoint_class) or self.limits["default"]
+        cost = min(self._cost(endpoint_class, config), burst)
+        bucket = f"{key_name}:{endpoint_class}"
+
+        result = None
+        if config["RATE_LIMIT_STORAGE"] == "cache":
+            result = current_app.extensions["cache"].consume(f"rate-limit:{bucket}", rate, burst, cost)
+        if result is None:
+            result = self.local.consume(bucket, rate, burst, cost)
+
+        allowed, tokens = result
+
+        if allowed:
+            API_REQUESTS.inc(key=key_name, endpoint_class=endpoint_class, result="allowed")
+            API_TOKENS_SPENT.inc(cost, key=key_name, endpoint_class=endpoint_class)
+            return None
+
+        API_REQUESTS.inc(key=key_name, endpoint_class=endpoint_class, result="limited")
+
+        retry_after = max(1, math.ceil((cost - tokens) / rate))
+        response = jsonify({
+            "error": "Rate limit exceeded",
+            "endpoint_class": endpoint_class,
+            "retry_after": retry_after
+        })
+        response.status_code = 429
+        response.headers["Retry-After"] = str(retry_after)
+
+        return response
+
+    def _cost(self, endpoint_class, config):
+        if endpoint_class != "default":
+            return 1
+
+        page = request.args.get("page", 1, type=int) or 1
+        per_page = request.args.get("per_page", 16, type=int) or 16
+        skipped = max(0, (page - 1) * per_page)
+
+        return min(1 + skipped // config["RATE_LIMIT_DEEP_PAGE_ITEMS"], config["RATE_LIMIT_MAX_COST"])
@@ -0,0 +1,57 @@
+from functools import wraps
+import hashlib
+from flask import current_app, make_response, request
+from app.cache import SingleFlight
+
+
+_flights = SingleFlight()
+
+
+def single_flight(shared=None):
+    """
+    Coalesces identical concurrent GET requests: while one request runs the view, the others
+    with the same endpoint, path arguments and query string wait for it and answer with a
+    copy of its response (see app.cache.single_flight). Place it below require_api_key and
+    conditional_get, so every request is still authenticated and can still get its 304.
+
+    :param shared: also coalesce across workers through the shared cache; defaults to
+                   SINGLE_FLIGHT_SHARED.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            config = current_app.config
+
+            if request.method not in ("GET", "HEAD") or not config.get("SINGLE_FLIGHT_ENABLED", True):
+                return f(*args, **kwargs)
+
+            use_cache = config.get("SINGLE_FLIGHT_SHARED", False) if shared is None else shared
+
+            def run_view():
+                response = make_response(f(*args, **kwargs))
+
+                # Frozen into plain data: every waiter builds its own response object
+                return response.get_data(), response.status_code, list(response.headers.items())
+
+            body, status, headers = _flights.do(
+                request_key(),
+                run_view,
+                timeout=config.get("SINGLE_FLIGHT_TIMEOUT", 10),
+                cache=current_app.extensions.get("cache") if use_cache else None,
+                poll_interval=config.get("SINGLE_FLIGHT_POLL_INTERVAL", 0.025)
+            )
+
+            return current_app.response_class(body, status=status, headers=headers)
+
+        return decorated_function
+
+    return decorator
+
+
+def request_key():
+    """Endpoint, path arguments and query string (parameters sorted): what the views read."""
+    view_args = sorted((request.view_args or {}).items())
+    query = sorted(request.args.items(multi=True))
+    raw = "|".join((request.endpoint or "", repr(view_args), repr(query)))
+
+    return hashlib.sha1(raw.encode()).hexdigest()
@@ -1,7 +1,12 @@
+from sqlalchemy.dialects import mysql
 from .extensions import db
  
  
 class Category(db.Model):
+    __table_args__ = (
+        db.Index("ix_category_name_category", "name_category"),
+    )
+
     hash_category = db.Column(db.String(255), primary_key=True)
     name_category = db.Column(db.String(255), nullable=False)
     display_order = db.Column(db.Integer, default=0, nullable=False)
@@ -13,6 +18,12 @@ class Category(db.Model):
  
  
 class Product(db.Model):
+    __table_args__ = (
+        # Listings filter by seller, then by category or by manufactured flag
+        db.Index("ix_product_id_seller_hash_category", "id_seller", "hash_category"),
+        db.Index("ix_product_id_seller_is_manufactured", "id_seller", "is_manufactured"),
+    )
+
     cod_product = db.Column(db.String(255), primary_key=True)
     name_product = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=False)
@@ -32,6 +43,8 @@ class Product(db.Model):
     id_manufacturer = db.Column(db.Integer, db.ForeignKey(
       'manufacturer.id', onupdate="CASCADE", ondelete="CASCADE"
     ), nullable=True)
+    # sha256 of fields + compatibilities + images, NULL when unknown (see fingerprint_service)
+    content_hash = db.Column(db.String(64), nullable=True)
  
     images = db.relationship('Images', backref='product', lazy=True, cascade="all" )
     compatibilities = db.relationship(
@@ -55,6 +68,10 @@ class SellerManufacturer(db.Model):
  
 class Images(db.Model):
     __tablename__ = "images"
+    __table_args__ = (
+        # The PK (cod_product, id_image) covers lookups by product; this one covers id_image alone
+        db.Index("ix_images_id_image", "id_image"),
+    )
  
     cod_product = db.Column(
         db.String(255),
@@ -72,12 +89,20 @@ class Images(db.Model):
     )
  
     url = db.Column(db.String(255), nullable=False)
+
+    # JSON {"<size>": {"webp": url, "jpeg": url}} of the resized copies (see image_variant_service);
+    # NULL until they are generated, {} when the original could not be processed
+    variants = db.Column(db.Text, nullable=True)
  
     def __repr__(self):
         return f"Images('{self.cod_product}', '{self.id_image}', '{self.url}')"
  
  
 class Vehicle(db.Model):
+    __table_args__ = (
+        db.Index("ix_vehicle_hash_brand", "hash_brand"),
+    )
+
     vehicle_name = db.Column(db.String(255), primary_key=True)
     start_year = db.Column(db.String(4), nullable=True)
     end_year = db.Column(db.String(4), nullable=True)
@@ -93,6 +118,10 @@ class Vehicle(db.Model):
  
  
 class Compatibility(db.Model):
+    __table_args__ = (
+        db.Index("ix_compatibility_vehicle_name", "vehicle_name"),
+    )
+
     cod_product = db.Column(db.String(255), db.ForeignKey(
         'product.cod_product', onupdate="CASCADE", ondelete="CASCADE"
     ), primary_key=True)
@@ -104,8 +133,23 @@ class Compatibility(db.Model):
         return f"Compatibility('{self.cod_product}', '{self.vehicle_name}')"
  
  
+class ProductDocument(db.Model):
+    """Product + category name + images + compatibilities as one JSON (see product_document_service)."""
+    __tablename__ = "product_document"
+
+    cod_product = db.Column(db.String(255), db.ForeignKey(
+        'product.cod_product', onupdate="CASCADE", ondelete="CASCADE"
+    ), primary_key=True)
+    # TEXT caps at 64 KB on MySQL, too little for products with hundreds of vehicles
+    document = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), "mysql"), nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+ 
+ 
 class VehicleBrand(db.Model):
     __tablename__ = "vehicle_brand"
+    __table_args__ = (
+        db.Index("ix_vehicle_brand_brand_name", "brand_name"),
+    )
     hash_brand = db.Column(db.String(255), primary_key=True)
     brand_name = db.Column(db.String(255), nullable=False)
     brand_image = db.Column(db.String(255), nullable=True)
@@ -139,6 +183,8 @@ class Seller(db.Model):
     name = db.Column(db.String(75), unique=True, nullable=False)
     cnpj = db.Column(db.String(20), unique=True, nullable=False)
     seller_domain = db.Column(db.String(15), nullable=False, default="")
+    catalog_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    catalog_updated_at = db.Column(db.DateTime, nullable=True)
  
 class SellerVehicles(db.Model):
     id_seller = db.Column(db.Integer, db.ForeignKey(
@@ -189,6 +235,11 @@ class SellerCategories(db.Model):
  
  
 class Label(db.Model):
+    __table_args__ = (
+        # label.name already leads the PK; listings by seller need their own index
+        db.Index("ix_label_id_seller", "id_seller"),
+    )
+
     name = db.Column(db.String(255), primary_key=True)
     id_seller = db.Column(db.Integer, db.ForeignKey(
         'seller.id', onupdate="CASCADE", ondelete="CASCADE"
@@ -7,6 +7,8 @@ from .auth_routes import auth_bp
 from .seller_db_routes import seller_db_bp
 from .manufacturer_routes import manufacturer_bp
 from .compatibility_routes import compatibility_bp
+from .metrics_routes import metrics_bp
+from .autocomplete_routes import autocomplete_bp
 
 def register_routes(app):
     app.register_blueprint(product_bp, url_prefix="/product")
@@ -17,4 +19,6 @@ def register_routes(app):
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(seller_db_bp, url_prefix="/seller-db")
     app.register_blueprint(manufacturer_bp, url_prefix="/manufacturer")
-    app.register_blueprint(compatibility_bp, url_prefix="/compatibility")
\ No newline at end of file
+    app.register_blueprint(compatibility_bp, url_prefix="/compatibility")
+    app.register_blueprint(metrics_bp, url_prefix="/metrics")
+    app.register_blueprint(autocomplete_bp, url_prefix="/autocomplete")
\ No newline at end of file
@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify, request
+from app.middleware.api_token import require_api_key
+from app.services.autocomplete_service import DEFAULT_LIMIT, MAX_LIMIT, SUGGESTION_TYPES, get_seller_index
+
+
+autocomplete_bp = Blueprint("autocomplete", __name__)
+
+
+@autocomplete_bp.route("/<int:id_seller>", methods=["GET"])
+@require_api_key
+def autocomplete(id_seller):
+    """
+    Typeahead suggestions of a seller's vehicles, brands and products whose name (or any word
+    of it) or product code starts with ?q=. ?limit= caps each list, ?types=vehicles,products
+    restricts the lists returned.
+    """
+    query = request.args.get("q", "")
+    limit = max(1, min(request.args.get("limit", DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    types = request.args.get("types")
+
+    if types:
+        types = tuple(dict.fromkeys(t.strip() for t in types.split(",") if t.strip()))
+        unknown = [t for t in types if t not in SUGGESTION_TYPES]
+        if unknown:
+            return jsonify({
+                "message": f"Unknown suggestion types: {', '.join(unknown)}",
+                "valid_types": list(SUGGESTION_TYPES)
+            }), 400
+    else:
+        types = SUGGESTION_TYPES
+
+    if not query.strip():
+        return jsonify({"message": "Nenhum termo de busca fornecido"}), 400
+
+    index = get_seller_index(id_seller)
+    if index is None:
+        return jsonify({"message": "Seller not found"}), 404
+
+    suggestions = index.search(query, limit, types)
+    suggestions["query"] = query
+    suggestions["catalog_version"] = index.catalog_version
+
+    return jsonify(suggestions), 200
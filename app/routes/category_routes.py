@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
 from app.dal.encryptor import HashGenerator
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
 from app.models import Category, SellerCategories
+from app.services.catalog_version_service import seller_catalog_etag
 from app.utils.functions import serialize_category
 from app.extensions import db
 from sqlalchemy import func
@@ -13,6 +15,7 @@ category_bp = Blueprint("categories", __name__)
 
 @category_bp.route("/all", methods=["GET"])
 @require_api_key
+@conditional_get(etag_key=seller_catalog_etag)
 def get_all_categories():
     # Read and validate the id_seller parameter
     id_seller = request.args.get("id_seller", type=int)
@@ -142,6 +145,7 @@ def create_seller_categories():
 # Retrieve a single category by its hash_category
 @category_bp.route("/<string:hash_category>", methods=["GET"])
 @require_api_key
+@conditional_get()
 def get_category(hash_category):
     category = Category.query.filter_by(hash_category=hash_category).first()
     if not category:
@@ -0,0 +1,48 @@
+from flask import Blueprint, Response, current_app, jsonify
+from app.extensions import db
+from app.middleware.api_token import require_api_key
+from app.middleware.instrumentation import pool_stats, update_pool_gauges
+from app.utils.metrics import registry
+
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+def _engines():
+    engines = {"sync": db.engine}
+
+    for key, engine in db.engines.items():
+        if key is not None:
+            engines[key] = engine
+
+    async_engine = getattr(db, "async_engine", None)
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+
+    return engines
+
+
+@metrics_bp.route("", methods=["GET"])
+@require_api_key
+def get_metrics():
+    update_pool_gauges(_engines())
+
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@metrics_bp.route("/db-pool", methods=["GET"])
+@require_api_key
+def get_db_pool_stats():
+    config = current_app.config
+
+    return jsonify({
+        "engines": {name: pool_stats(engine) for name, engine in _engines().items()},
+        "settings": {
+            "pool_size": config.get("DB_POOL_SIZE"),
+            "max_overflow": config.get("DB_MAX_OVERFLOW"),
+            "pool_timeout": config.get("DB_POOL_TIMEOUT"),
+            "pool_recycle": config.get("DB_POOL_RECYCLE"),
+            "pool_pre_ping": config.get("DB_POOL_PRE_PING"),
+            "query_cache_size": config.get("DB_QUERY_CACHE_SIZE"),
+        }
+    }), 200
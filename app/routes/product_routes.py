@@ -3,17 +3,28 @@ import json
 import math
 import tempfile
 import os
-import boto3
-from flask import Blueprint, jsonify, request, send_file, current_app
-import pandas as pd
-from sqlalchemy import text, or_
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context, current_app
+from sqlalchemy import bindparam, select, text, or_
+from sqlalchemy.orm import load_only
 from app.models import Product, Images, Category, Compatibility, Vehicle, SellerBrands, SellerVehicles, SellerCategories
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
+from app.middleware.rate_limit import rate_limit_class
+from app.middleware.single_flight import single_flight
 from app.extensions import db
-from app.services.product_service import get_all_product_data, process_excel, transform_rows
+from app.services.import_planner import IMPORT_MODES
+from app.services.product_document_service import (
+    get_product_document, get_product_documents, product_detail, product_fieldset
+)
+from app.services.catalog_export import COLUMNAR_FORMATS, columnar_export_available, write_products_columnar
+from app.services.product_service import (
+    EXPORT_CHUNK_SIZE, get_seller_product_codes, image_insert_statements, iter_product_data, process_excel,
+    write_products_xlsx
+)
+from app.services.catalog_version_service import mark_catalog_changed, product_catalog_etag
+from app.services.image_variant_service import upload_product_images
 from app.dal.S3_client import S3ClientSingleton
 from app.utils.functions import is_image_file, extract_existing_product_codes, serialize_products, serialize_meta_pagination
-from botocore.exceptions import BotoCoreError, ClientError
 from werkzeug.utils import secure_filename
 
 
@@ -25,11 +36,15 @@ product_bp = Blueprint("products", __name__)
 def get_products():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
+    try:
+        fieldset = product_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"message": f"Campos desconhecidos: {e}"}), 400
 
-    pagination = Product.query.paginate(
+    pagination = _listed_products().paginate(
         page=page, per_page=per_page, error_out=False)
 
-    products = serialize_products(pagination.items)
+    products = serialize_products(pagination.items, fieldset)
 
     meta = serialize_meta_pagination(
         pagination.total,
@@ -49,6 +64,10 @@ def get_products():
 def get_products_by_seller(id_seller):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
+    try:
+        fieldset = product_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"message": f"Campos desconhecidos: {e}"}), 400
     is_manufactured_str = request.args.get("is_manufactured")
 
     is_manufactured = None
@@ -58,17 +77,17 @@ def get_products_by_seller(id_seller):
     pagination = None
 
     if is_manufactured is None:
-        pagination = Product.query.filter(
+        pagination = _listed_products().filter(
             Product.id_seller == id_seller
         ).paginate(page=page, per_page=per_page, error_out=False)
 
     else:
-        pagination = Product.query.filter(
+        pagination = _listed_products().filter(
             Product.is_manufactured == is_manufactured,
             Product.id_seller == id_seller
         ).paginate(page=page, per_page=per_page, error_out=False)
 
-    filtered_products = serialize_products(pagination.items)
+    filtered_products = serialize_products(pagination.items, fieldset)
 
     meta = serialize_meta_pagination(
         pagination.total,
@@ -88,6 +107,10 @@ def get_products_by_seller(id_seller):
 def get_products_by_category(hash_category):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
+    try:
+        fieldset = product_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"message": f"Campos desconhecidos: {e}"}), 400
     id_seller = request.args.get("id_seller", type=int)
     is_manufactured_str = request.args.get("is_manufactured")
 
@@ -103,7 +126,7 @@ def get_products_by_category(hash_category):
         return jsonify({"message": "Nenhuma categoria fornecida"}), 400
 
     if is_manufactured is None:
-        pagination = Product.query.filter_by(
+        pagination = _listed_products().filter_by(
             hash_category=transformed_hash_category,
             id_seller=id_seller
         ).paginate(
@@ -111,7 +134,7 @@ def get_products_by_category(hash_category):
         )
 
     else:
-        pagination = Product.query.filter(
+        pagination = _listed_products().filter(
             Product.hash_category == transformed_hash_category,
             Product.is_manufactured == is_manufactured,
             Product.id_seller == id_seller
@@ -119,7 +142,7 @@ def get_products_by_category(hash_category):
             page=page, per_page=per_page, error_out=False
         )
 
-    products = serialize_products(pagination.items)
+    products = serialize_products(pagination.items, fieldset)
 
     meta = serialize_meta_pagination(
         pagination.total,
@@ -139,6 +162,10 @@ def get_products_by_category(hash_category):
 def search_product(search_term):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
+    try:
+        fieldset = product_fieldset(request.args.get("fields"), request.args.get("include"))
+    except ValueError as e:
+        return jsonify({"message": f"Campos desconhecidos: {e}"}), 400
     is_manufactured_str = request.args.get("is_manufactured")
     id_seller = request.args.get("id_seller")
     exact = request.args.get("exact", "false").lower() == "true"
@@ -156,7 +183,7 @@ def search_product(search_term):
 
     if is_manufactured is None:
         if exact:
-            pagination = Product.query.filter(
+            pagination = _listed_products().filter(
                 or_(
                     Product.cod_product.ilike(f"{transformed_search_term}"),
                     Product.name_product.ilike(f"{transformed_search_term}"),
@@ -168,7 +195,7 @@ def search_product(search_term):
             ).paginate(page=page, per_page=per_page, error_out=False)
 
         else:
-            pagination = Product.query.filter(
+            pagination = _listed_products().filter(
                 or_(
                     Product.cod_product.ilike(f"%{transformed_search_term}%"),
                     Product.name_product.ilike(f"%{transformed_search_term}%"),
@@ -181,7 +208,7 @@ def search_product(search_term):
 
     else:
         if exact:
-            pagination = Product.query.filter(
+            pagination = _listed_products().filter(
                 or_(
                     Product.cod_product.ilike(f"{transformed_search_term}"),
                     Product.name_product.ilike(f"{transformed_search_term}"),
@@ -193,7 +220,7 @@ def search_product(search_term):
                 Product.id_seller == id_seller
             ).paginate(page=page, per_page=per_page, error_out=False)
         else:
-            pagination = Product.query.filter(
+            pagination = _listed_products().filter(
                 or_(
                     Product.cod_product.ilike(f"%{transformed_search_term}%"),
                     Product.name_product.ilike(f"%{transformed_search_term}%"),
@@ -205,7 +232,7 @@ def search_product(search_term):
                 Product.id_seller == id_seller
             ).paginate(page=page, per_page=per_page, error_out=False)
 
-    filtered_products = serialize_products(pagination.items)
+    filtered_products = serialize_products(pagination.items, fieldset)
 
     meta = serialize_meta_pagination(
         pagination.total,
@@ -222,6 +249,7 @@ def search_product(search_term):
 
 @product_bp.route("/compatibility/<string:vehicle_name>", methods=["GET"])
 @require_api_key
+@single_flight()
 def get_by_compatibility(vehicle_name):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
@@ -281,12 +309,12 @@ def get_by_compatibility(vehicle_name):
         JOIN category ct ON ct.hash_category = p.hash_category
         LEFT JOIN images img ON p.cod_product = img.cod_product
         WHERE p.cod_product IN :product_ids
-    """)
+    """).bindparams(bindparam("product_ids", expanding=True))
 
     details_result = db.session.execute(
         details_sql,
         {
-            "product_ids": tuple(product_ids)
+            "product_ids": product_ids
         }
     )
 
@@ -345,6 +373,7 @@ def get_by_compatibility(vehicle_name):
 
 @product_bp.route("/compatibility-all/<string:vehicle_name>", methods=["GET"])
 @require_api_key
+@single_flight()
 def get_all_by_compatibility(vehicle_name):
     if not vehicle_name:
         return jsonify({"message": "Nenhuma compatibilidade informada"}), 400
@@ -390,12 +419,12 @@ def get_all_by_compatibility(vehicle_name):
         JOIN category ct ON ct.hash_category = p.hash_category
         LEFT JOIN images img ON p.cod_product = img.cod_product
         WHERE p.cod_product IN :product_ids
-    """)
+    """).bindparams(bindparam("product_ids", expanding=True))
 
     details_result = db.session.execute(
         details_sql,
         {
-            "product_ids": tuple(product_ids)
+            "product_ids": product_ids
         }
     )
 
@@ -469,6 +498,7 @@ def create_product():
 
 @product_bp.route("/create-from-csv", methods=["POST"])
 @require_api_key
+@rate_limit_class("import")
 def create_products_from_csv():
     if 'file' not in request.files:
         return jsonify({"message": "Nenhum arquivo enviado"}), 400
@@ -481,13 +511,27 @@ def create_products_from_csv():
     if not file.filename.endswith('.xlsx'):
         return jsonify({"message": "Arquivo inválido"}), 400
 
+    # full: processa todas as linhas; delta: grava só o que mudou; dry-run: só relata as mudanças
+    mode = request.args.get("mode", "full")
+    if mode not in IMPORT_MODES:
+        return jsonify({"message": f"Modo inválido, use um de: {', '.join(IMPORT_MODES)}"}), 400
+
     # Create a temporary file
     with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as temp:
         file.save(temp.name)
         temp_path = temp.name
 
+    workers = request.args.get("workers", current_app.config.get("IMPORT_WORKERS", 1), type=int)
+    workers = max(1, min(workers, current_app.config.get("IMPORT_MAX_WORKERS", 8)))
+
     try:
-        products = process_excel(temp_path)
+        products = process_excel(temp_path, workers=workers, mode=mode)
+
+        if mode == "dry-run":
+            return jsonify({
+                "message": "Simulação da importação, nenhuma alteração gravada",
+                "data": products
+            }), 200
 
         return jsonify({
             "message": "Produtos criados com sucesso",
@@ -500,70 +544,66 @@ def create_products_from_csv():
             os.remove(temp_path)
 
 
-@product_bp.route("/<string:cod_product>", methods=["GET"])
+@product_bp.route("/batch", methods=["POST"])
 @require_api_key
-def get_product(cod_product):
-    product = Product.query.filter_by(cod_product=cod_product).first()
-
-    if not product:
-        return jsonify({"message": "Produto não encontrado"}), 404
+def get_products_batch():
+    """
+    Several products in one call: {"codes": [...], "id_seller": optional, "with_image_ids": false}.
+    Products come back in the order of the codes (repeated codes once); codes without a
+    product (or of another seller, when id_seller is given) are listed in "missing".
+    """
+    data = request.get_json(silent=True) or {}
+    codes = data.get("codes")
+    max_codes = current_app.config.get("PRODUCT_BATCH_MAX_CODES", 100)
+
+    if not isinstance(codes, list) or not codes or not all(isinstance(code, str) and code for code in codes):
+        return jsonify({"message": "Informe 'codes' como uma lista de códigos de produto"}), 400
+
+    codes = list(dict.fromkeys(codes))
+    if len(codes) > max_codes:
+        return jsonify({"message": f"No máximo {max_codes} códigos por requisição"}), 400
+
+    id_seller = data.get("id_seller")
+    with_image_ids = bool(data.get("with_image_ids", False))
+
+    # One primary-key read of the documents, missing ones built with one IN query per table
+    documents = get_product_documents(codes)
+
+    products, missing = [], []
+    for code in codes:
+        document = documents.get(code)
+
+        if document is None or (id_seller is not None and str(document["id_seller"]) != str(id_seller)):
+            missing.append(code)
+        else:
+            products.append(product_detail(document, with_image_ids=with_image_ids))
 
-    category_name = product.category.name_category if product.category else None
+    return jsonify({"products": products, "missing": missing}), 200
 
-    images = [img.url for img in product.images]
 
-    compatibility = [{"vehicle_name": comp.vehicle_name}
-                     for comp in product.compatibilities]
+@product_bp.route("/<string:cod_product>", methods=["GET"])
+@require_api_key
+@conditional_get(etag_key=product_catalog_etag)
+def get_product(cod_product):
+    # One primary-key read of the precomputed document (product_document_service)
+    document = get_product_document(cod_product)
 
-    data = {
-        "cod_product": product.cod_product,
-        "name_product": product.name_product,
-        "description": product.description,
-        "is_active": product.is_active,
-        "is_manufactured": product.is_manufactured,
-        "bar_code": product.bar_code,
-        "gear_quantity": product.gear_quantity,
-        "gear_dimensions": product.gear_dimensions,
-        "cross_reference": product.cross_reference,
-        "category": category_name,
-        "images": images,
-        "compatibilities": compatibility
-    }
+    if not document:
+        return jsonify({"message": "Produto não encontrado"}), 404
 
-    return jsonify(data), 200
+    return jsonify(product_detail(document)), 200
 
 
 @product_bp.route("/with-id-url-image/<string:cod_product>", methods=["GET"])
 @require_api_key
+@conditional_get(etag_key=product_catalog_etag)
 def get_product_with_id_url_image(cod_product):
-    product = Product.query.filter_by(cod_product=cod_product).first()
+    document = get_product_document(cod_product)
 
-    if not product:
+    if not document:
         return jsonify({"message": "Produto não encontrado"}), 404
 
-    category_name = product.category.name_category if product.category else None
-
-    images = [{"id_image": img.id_image, "url": img.url} for img in product.images]
-    
-    compatibility = [{"vehicle_name": comp.vehicle_name}
-                     for comp in product.compatibilities]
-
-    data = {
-        "cod_product": product.cod_product,
-        "name_product": product.name_product,
-        "description": product.description,
-        "is_active": product.is_active,
-        "is_manufactured": product.is_manufactured,
-        "bar_code": product.bar_code,
-        "gear_quantity": product.gear_quantity,
-        "gear_dimensions": product.gear_dimensions,
-        "cross_reference": product.cross_reference,
-        "category": category_name,
-        "images": images,
-        "compatibilities": compatibility
-    }
-
-    return jsonify(data), 200
+    return jsonify(product_detail(document, with_image_ids=True)), 200
 
 
 @product_bp.route("/<string:cod_product>", methods=["PUT"])
@@ -600,25 +640,20 @@ def update_product(cod_product):
         product.hash_category = request.form.get(
             "hash_category",   product.hash_category)
 
-        s3 = S3ClientSingleton()
         images = request.files.getlist("images")
 
-        print(product.is_manufactured)
-        for idx, img in enumerate(images):
-            print(img)
-            print("o index dessa nova imagem é:", idx)
-            url = s3.upload_to_s3(image=img)
+        for img, (url, variants) in zip(images, upload_product_images(images)):
             id_image = f"{cod_product}-{img.filename}"
-            print("o id_image dessa nova nova imagem é:", id_image)
             db.session.add(Images(
                 cod_product=cod_product,
                 id_image=id_image,
-                url=url
+                url=url,
+                variants=variants
             ))
         db.session.commit()
         return jsonify({"message": "Produto atualizado com sucesso"}), 200
     except Exception as e:
-        print(e)
+        current_app.logger.exception("Failed to update product %s", cod_product)
         db.session.rollback()
         return jsonify({"error": f"Erro ao atualizar produto: {e}"}), 500
     finally:
@@ -627,6 +662,7 @@ def update_product(cod_product):
 
 @product_bp.route("/upload-product-images-by-folder", methods=["POST"])
 @require_api_key
+@rate_limit_class("import")
 def upload_product_images_by_folder():
     s3_client = S3ClientSingleton()
 
@@ -693,6 +729,7 @@ def upload_product_images_by_folder():
 
 @product_bp.route("/upload-product-images-by-s3", methods=["POST"])
 @require_api_key
+@rate_limit_class("import")
 def upload_product_images_by_s3():
     s3_client = S3ClientSingleton()
 
@@ -843,37 +880,29 @@ def sync_images():
     online_image_codes = {img.get("cod_prod")
                           for img in online_images if img.get("cod_prod")}
 
-    # Query local images from the database and extract their product codes
-    local_images = db.session.query(Images).all()
-    local_image_codes = {img.cod_product for img in local_images}
-
-    # Retrieve all valid product codes from the product table to avoid foreign key issues
-    valid_products = db.session.query(Product.cod_product).all()
-    valid_product_codes = {prod[0] for prod in valid_products}
+    # Product codes that already have images, and every valid product code (avoids FK issues)
+    local_image_codes = set(db.session.scalars(select(Images.cod_product).distinct()))
+    valid_product_codes = set(db.session.scalars(select(Product.cod_product)))
 
     # Determine missing codes (images present online but not in the local DB)
     missing_codes = (online_image_codes -
                      local_image_codes) & valid_product_codes
 
-    synced_images = []
-
-    # total_num = len(missing_codes)
-    # percentage = 0
-
-    for image in online_images:
-        # Check if this image is missing locally by its product code
-        if image.get("cod_prod") in missing_codes:
-            new_image = Images(
-                cod_product=image.get("cod_prod"),
-                id_image=image.get("name"),
-                url=image.get("url", "")
-            )
+    synced_images = [
+        {
+            "cod_product": image.get("cod_prod"),
+            "id_image": image.get("name"),
+            "url": image.get("url", "")
+        }
+        for image in online_images
+        if image.get("cod_prod") in missing_codes
+    ]
 
-            db.session.add(new_image)
-            synced_images.append(new_image)
-            # percentage += 1
+    # Same chunked multi-row INSERT used by the spreadsheet importer
+    for stmt in image_insert_statements(synced_images):
+        db.session.execute(stmt)
 
-            # print(f"{percentage} | {total_num}")
+    mark_catalog_changed(db.session, cod_products=missing_codes)
 
     # Commit once after processing all images
     db.session.commit()
@@ -1007,16 +1036,13 @@ def create_product_and_compatibilty():
                         vehicle_name=vehicle_name
                     ))
 
-        s3 = S3ClientSingleton()
-
         urls = []
-        for idx, img in enumerate(images):
-            url = s3.upload_to_s3(image=img)
-
+        for idx, (url, variants) in enumerate(upload_product_images(images)):
             db.session.add(Images(
                 cod_product=cod_product,
                 id_image=name_product + f"_{idx}",
-                url=url
+                url=url,
+                variants=variants
             ))
             urls.append(url)
 
@@ -1086,101 +1112,51 @@ def delete_images():
 
 @product_bp.route("/extract-all-xlsx/<string:id_seller>")
 @require_api_key
+@rate_limit_class("export")
 def extract_database_xlsx(id_seller):
     format = request.args.get("format")
 
-    # 1) fetch products (eager-loaded)
-    products = get_all_product_data(id_seller)
+    # 1) product codes only; the products are loaded and serialized chunk by chunk
+    codes = get_seller_product_codes(id_seller)
+    product_count = len(codes)
 
-    # 2) serialize
-    serialized_products = serialize_products(products)
-    
-    product_count = len(serialized_products)
-
-    # optional: if client asks for JSON instead of xlsx, return JSON
+    # optional: if client asks for JSON instead of xlsx, stream it as it is serialized
     if format == "json":
-        return jsonify({
-            "products": serialized_products,
-            "count": product_count
-            })
+        return Response(
+            stream_with_context(_stream_products_json(id_seller, codes)),
+            mimetype="application/json"
+        )
+
+    # parquet/arrow: typed columns, images and compatibilities as list columns (catalog_export)
+    if format in COLUMNAR_FORMATS:
+        if not columnar_export_available():
+            return jsonify({"error": f"Formato {format} indisponível: pyarrow não está instalado"}), 501
+
+        extension, content_type = COLUMNAR_FORMATS[format]
+        output = io.BytesIO()
+        filename = f"products_{secure_filename(id_seller)}.{extension}"
+        write_products_columnar(iter_product_data(id_seller, codes=codes), output, format)
+        output.seek(0)
+
+        # ?destination=s3 uploads it like format=s3 does with the XLSX
+        if request.args.get("destination") == "s3":
+            return _upload_export_to_s3(output, id_seller, filename, content_type, product_count)
 
-    # 3) create a pandas DataFrame and put compatibilities/images as JSON strings (or semicolon-separated)
-    df = transform_rows(serialized_products)
+        return send_file(output, as_attachment=True, download_name=filename, mimetype=content_type)
 
-    # 4) write to Excel in-memory
+    # 2) write to Excel in-memory, row by row (openpyxl is only loaded by the export paths)
     output = io.BytesIO()
     filename = f"products_{secure_filename(id_seller)}.xlsx"
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="products")
+    write_products_xlsx(iter_product_data(id_seller, codes=codes), output)
     output.seek(0)
 
     if format == "s3":
-        # read AWS config from Flask config first, fallback to env
-        aws_region = current_app.config.get(
-            "AWS_REGION") or os.getenv("AWS_REGION")
-        aws_bucket = current_app.config.get(
-            "AWS_XLSX_BUCKET_NAME") or os.getenv("AWS_XLSX_BUCKET_NAME")
-        # boto3 will also pick up creds from env or instance profile if not explicitly provided
-        s3_client = boto3.client(
-            "s3",
-            region_name=aws_region or None,
-            aws_access_key_id=current_app.config.get(
-                "AWS_ACCESS_KEY_ID") or os.getenv("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=current_app.config.get(
-                "AWS_SECRET_ACCESS_KEY") or os.getenv("AWS_SECRET_ACCESS_KEY"),
+        return _upload_export_to_s3(
+            output, id_seller, filename,
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", product_count
         )
 
-        if not aws_bucket:
-            return jsonify({"error": "S3 bucket not configured (AWS_S3_BUCKET)"}), 500
-
-        # optional: include seller id and timestamp in object key to avoid collisions
-        import datetime
-        now = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        object_key = f"exports/{secure_filename(id_seller)}/{now}_{filename}"
-
-        try:
-            # upload_fileobj will stream the BytesIO to S3
-            # reset buffer pointer just in case
-            output.seek(0)
-            s3_client.upload_fileobj(
-                Fileobj=output,
-                Bucket=aws_bucket,
-                Key=object_key,
-                ExtraArgs={
-                    "ContentType": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    # "ACL": "private"  # default is private; set to 'public-read' only if you intend public files
-                }
-            )
-        except (BotoCoreError, ClientError) as e:
-            current_app.logger.exception("S3 upload failed")
-            return jsonify({"error": "failed to upload file to s3", "details": str(e)}), 500
-
-        # generate a presigned URL for GET (default expiry 1 hour). Adjust ExpiresIn if you want longer.
-        presign_expires = int(request.args.get("expires", 3600))
-        try:
-            presigned_url = s3_client.generate_presigned_url(
-                ClientMethod="get_object",
-                Params={"Bucket": aws_bucket, "Key": object_key},
-                ExpiresIn=presign_expires
-            )
-        except (BotoCoreError, ClientError) as e:
-            current_app.logger.exception("Failed to create presigned URL")
-            # As a fallback, return the S3 object key (caller can build an internal link)
-            return jsonify({
-                "error": "uploaded but failed to generate presigned url",
-                "s3_key": object_key,
-                "count": product_count
-            }), 500
-
-        return jsonify({
-            "s3_url": presigned_url,
-            "s3_key": object_key,
-            "bucket": aws_bucket,
-            "count": product_count,
-            "expires_in": presign_expires
-        })
-
-    # 5) send file
+    # 3) send file
     # Flask >=2.0: use download_name; older Flask uses attachment_filename
     return send_file(
         output,
@@ -1188,3 +1164,101 @@ def extract_database_xlsx(id_seller):
         download_name=f"products_{id_seller}.xlsx",
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
+
+
+def _upload_export_to_s3(output, id_seller, filename, content_type, product_count):
+    """Uploads an export file to the exports bucket and answers with a presigned GET URL."""
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    # read AWS config from Flask config first, fallback to env
+    aws_region = current_app.config.get(
+        "AWS_REGION") or os.getenv("AWS_REGION")
+    aws_bucket = current_app.config.get(
+        "AWS_XLSX_BUCKET_NAME") or os.getenv("AWS_XLSX_BUCKET_NAME")
+    # boto3 will also pick up creds from env or instance profile if not explicitly provided
+    s3_client = boto3.client(
+        "s3",
+        region_name=aws_region or None,
+        aws_access_key_id=current_app.config.get(
+            "AWS_ACCESS_KEY_ID") or os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=current_app.config.get(
+            "AWS_SECRET_ACCESS_KEY") or os.getenv("AWS_SECRET_ACCESS_KEY"),
+    )
+
+    if not aws_bucket:
+        return jsonify({"error": "S3 bucket not configured (AWS_S3_BUCKET)"}), 500
+
+    # optional: include seller id and timestamp in object key to avoid collisions
+    import datetime
+    now = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    object_key = f"exports/{secure_filename(id_seller)}/{now}_{filename}"
+
+    try:
+        # upload_fileobj will stream the BytesIO to S3
+        # reset buffer pointer just in case
+        output.seek(0)
+        s3_client.upload_fileobj(
+            Fileobj=output,
+            Bucket=aws_bucket,
+            Key=object_key,
+            ExtraArgs={
+                "ContentType": content_type,
+                # "ACL": "private"  # default is private; set to 'public-read' only if you intend public files
+            }
+        )
+    except (BotoCoreError, ClientError) as e:
+        current_app.logger.exception("S3 upload failed")
+        return jsonify({"error": "failed to upload file to s3", "details": str(e)}), 500
+
+    # generate a presigned URL for GET (default expiry 1 hour). Adjust ExpiresIn if you want longer.
+    presign_expires = int(request.args.get("expires", 3600))
+    try:
+        presigned_url = s3_client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": aws_bucket, "Key": object_key},
+            ExpiresIn=presign_expires
+        )
+    except (BotoCoreError, ClientError) as e:
+        current_app.logger.exception("Failed to create presigned URL")
+        # As a fallback, return the S3 object key (caller can build an internal link)
+        return jsonify({
+            "error": "uploaded but failed to generate presigned url",
+            "s3_key": object_key,
+            "count": product_count
+        }), 500
+
+    return jsonify({
+        "s3_url": presigned_url,
+        "s3_key": object_key,
+        "bucket": aws_bucket,
+        "count": product_count,
+        "expires_in": presign_expires
+    })
+
+
+def _stream_products_json(id_seller, codes):
+    """Body of the JSON export, one piece per EXPORT_CHUNK_SIZE products ({"count", "products"} like jsonify)."""
+    def dumps(obj):
+        return current_app.json.dumps(obj, separators=(",", ":"))
+
+    yield '{"count":%d,"products":[' % len(codes)
+
+    separator, chunk = "", []
+    for product in iter_product_data(id_seller, codes=codes):
+        chunk.append(dumps(product))
+
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield separator + ",".join(chunk)
+            separator, chunk = ",", []
+
+    if chunk:
+        yield separator + ",".join(chunk)
+
+    yield "]}\n"
+
+
+def _listed_products():
+    # The list endpoints serialize from product_document / column projections: the paginated
+    # query only needs the codes
+    return Product.query.options(load_only(Product.cod_product))
@@ -1,8 +1,12 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy import text
 from app.extensions import db
+from app.dal.routing_session import use_primary
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
+from app.middleware.single_flight import single_flight
 from app.models import Seller, Label, CustomShowcase
+from app.services.catalog_version_service import get_catalog_version, mark_catalog_changed
 from sqlalchemy.exc import SQLAlchemyError
 from app.services.seller_db_service import get_all_db_sellers, get_one_db_seller, get_all_labels, get_all_showcase_items, get_one_db_seller_by_cnpj, get_one_db_seller_by_name, get_one_label, get_one_similar_label, get_all_labeled_custom_showcases
 from app.utils.functions import serialize_label, serialize_custom_showcase, serialize_seller_showcase_items, serialize_seller, serialize_one_seller
@@ -158,6 +162,28 @@ def delete_seller(id):
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
 
+@seller_db_bp.route("/catalog-version/<string:id_seller>", methods=["GET"])
+@require_api_key
+@use_primary
+def get_seller_catalog_version(id_seller):
+    try:
+        version = get_catalog_version(id_seller)
+
+        if version is None:
+            return jsonify({"message": f"Seller with id {id_seller} not found!"}), 404
+
+        catalog_version, updated_at = version
+
+        return jsonify({
+            "id_seller": int(id_seller),
+            "catalog_version": catalog_version,
+            "catalog_updated_at": updated_at.isoformat() if updated_at else None
+        }), 200
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": f"An error occurred: {str(e)}"}), 500
+
+
 @seller_db_bp.route("/create-label/<string:id_seller>", methods=["POST"])
 @require_api_key
 def create_showcase_label(id_seller):
@@ -391,6 +417,8 @@ def get_custom_showcase_items():
 
 @seller_db_bp.route("/get-seller-custom-showcase-items/<string:id_seller>", methods=["GET"])
 @require_api_key
+@conditional_get()
+@single_flight()
 def get_seller_showcase_items(id_seller):
     try:
         labels = get_all_labels(id_seller)
@@ -409,6 +437,8 @@ def get_seller_showcase_items(id_seller):
 
 @seller_db_bp.route("/get-seller-custom-showcase/<string:id_seller>/<string:label>", methods=["GET"])
 @require_api_key
+@conditional_get()
+@single_flight()
 def get_seller_showcase_item(id_seller, label):
     try:
         seller_showcase_product_sql = text("""
@@ -495,6 +525,7 @@ def update_showcase_items(id_seller, label):
             existing_label.name = new_label
             
             # Update all existing CustomShowcase items to use the new label name
+            mark_catalog_changed(db.session, id_sellers=[id_seller])
             CustomShowcase.query.filter_by(name=label).update(
                 {CustomShowcase.name: new_label},
                 synchronize_session=False
@@ -506,6 +537,7 @@ def update_showcase_items(id_seller, label):
         items_to_delete = current_cod_products - new_cod_products
 
         if items_to_delete:
+            mark_catalog_changed(db.session, id_sellers=[id_seller])
             CustomShowcase.query.filter(
                 CustomShowcase.name == label,
                 CustomShowcase.cod_product.in_(items_to_delete)
@@ -556,6 +588,8 @@ def delete_custom_showcase(label):
         if not existing_custom_showcase:
             return jsonify({"message": f"Vitrine {label} não existe para ser deletada!"})
         
+        mark_catalog_changed(db.session, id_sellers=[existing_custom_showcase.id_seller])
+
         CustomShowcase.query.filter_by(
             name=label
         ).delete()
@@ -1,6 +1,8 @@
 from flask import Blueprint, Response, json, jsonify, request
+from sqlalchemy.orm import load_only
 from app.dal.dynamo_client import DynamoSingleton
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
 from app.models import Product
 from app.services.seller_db_service import get_one_db_seller
 from app.services.seller_db_service import get_all_labeled_custom_showcases, get_all_labels
@@ -42,6 +44,7 @@ def get_seller_info_by_domain(seller_domain):
 
 @seller_bp.route("/showcase", methods=["GET"])
 @require_api_key
+@conditional_get()
 def get_showcase():
     dynamo_client = DynamoSingleton()
     
@@ -74,7 +77,7 @@ def get_showcase():
         # Ensure that the tag id is the correct type (assuming Product.hash_category is stored as a string)
         # category_id = str(tag_id)
         
-        pagination = Product.query.filter_by(
+        pagination = Product.query.options(load_only(Product.cod_product)).filter_by(
             hash_category=tag_id,
             id_seller=id_seller
         ).limit(per_page).all()
@@ -3,7 +3,9 @@ from sqlalchemy import func
 from app.dal.S3_client import S3ClientSingleton
 from app.dal.encryptor import HashGenerator
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
 from app.models import VehicleBrand, SellerBrands
+from app.services.catalog_version_service import seller_catalog_etag
 from app.extensions import db
 from app.utils.functions import serialize_brand, serialize_meta_pagination
 from sqlalchemy import func
@@ -16,6 +18,7 @@ vehicle_brand_bp = Blueprint("vehicle_brands", __name__)
 
 @vehicle_brand_bp.route("/all", methods=["GET"])
 @require_api_key
+@conditional_get(etag_key=seller_catalog_etag)
 def get_all_vehicle_brands():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
@@ -46,6 +49,7 @@ def get_all_vehicle_brands():
 
 @vehicle_brand_bp.route("/<string:hash_brand>")
 @require_api_key
+@conditional_get()
 def get_vehicle_brand(hash_brand):
     vehicle_brand = VehicleBrand.query.filter_by(hash_brand=hash_brand).first()
 
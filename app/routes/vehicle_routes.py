@@ -2,10 +2,10 @@ from flask import Blueprint, jsonify, request
 from sqlalchemy import func
 from sqlalchemy.exc import SQLAlchemyError
 from app.middleware.api_token import require_api_key
+from app.middleware.conditional_get import conditional_get
 from app.dal.encryptor import HashGenerator
 from app.models import Compatibility, Product, SellerVehicles, Vehicle, VehicleBrand
 from app.extensions import db
-import pandas as pd
 from app.utils.functions import serialize_meta_pagination, serialize_vehicle_product_count
 
 
@@ -14,6 +14,7 @@ vehicle_bp = Blueprint("vehicles", __name__)
 
 @vehicle_bp.route("/all", methods=["GET"])
 @require_api_key
+@conditional_get()
 def get_vehicles_count_prods():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
@@ -51,6 +52,7 @@ def get_vehicles_count_prods():
 
 @vehicle_bp.route("/brand/<string:hash_brand>", methods=["GET"])
 @require_api_key
+@conditional_get()
 def get_by_vehicle_brand(hash_brand):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
@@ -110,6 +112,7 @@ def create_vehicle():
 # Retrieve a single vehicle by its vehicle_name
 @vehicle_bp.route("/<string:vehicle_name>", methods=["GET"])
 @require_api_key
+@conditional_get()
 def get_vehicle(vehicle_name):
     vehicle = Vehicle.query.filter_by(vehicle_name=vehicle_name).first()
     if not vehicle:
@@ -127,6 +130,7 @@ def get_vehicle(vehicle_name):
 # Retrieve a single vehicle by its vehicle_name
 @vehicle_bp.route("/search/<string:vehicle_name>", methods=["GET"])
 @require_api_key
+@conditional_get()
 def search_vehicle(vehicle_name):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 16, type=int)
@@ -374,6 +378,8 @@ def create_vehicle_compatibility():
 @vehicle_bp.route("/create-brand-vehicle", methods=["POST"])
 @require_api_key
 def create_vehicle_by_xlsx(file):
+    import pandas as pd
+
     hash_generator = HashGenerator()
     try:
         df = pd.read_excel(file)
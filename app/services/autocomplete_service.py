@@ -0,0 +1,250 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import func, select
+from app.extensions import db
+from app.models import Compatibility, Product, SellerBrands, SellerVehicles, Vehicle, VehicleBrand
+from app.services.catalog_version_service import get_catalog_version
+from app.utils.metrics import registry
+
+""" --------------------------------- Per-seller typeahead index --------------------------------- """
+# GET /autocomplete answers from an in-memory prefix index per seller instead of running
+# ILIKE '%term%' queries on every keystroke. Each suggestion type (vehicles, brands, products)
+# keeps its normalized keys in one sorted array: a prefix lookup is two bisects plus a scan of
+# the matching range, and the best results of every 1-2 character prefix are computed up front.
+#
+# Indexes are built on first use and tagged with the seller's catalog_version; when the version
+# moves, the next lookup rebuilds them. Every worker process keeps its own indexes.
+
+SUGGESTION_TYPES = ("vehicles", "brands", "products")
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Prefixes up to this length have their top MAX_LIMIT results precomputed
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+# Words of a name indexed as their own prefix ("GOL" finds "VW GOL 1.0")
+MAX_INDEXED_WORDS = 8
+
+_LAST_CHAR = "\U0010ffff"
+_NOT_CODE_CHARS = re.compile(r"[^0-9A-Z]")
+
+INDEX_BUILD_TIME = registry.histogram(
+    "autocomplete_index_build_seconds", "Time spent building a seller's autocomplete index."
+)
+INDEX_BUILDS = registry.counter(
+    "autocomplete_index_builds_total", "Autocomplete indexes built, by reason.", ("reason",)
+)
+
+
+def normalize(text):
+    """Upper case, no accents, single spaces: the form both keys and queries are compared in."""
+    if text is None:
+        return ""
+
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+
+    return " ".join(stripped.upper().split())
+
+
+def word_keys(text):
+    """The normalized text and each of its suffixes that start a word."""
+    words = normalize(text).split(" ")
+
+    return {" ".join(words[i:]) for i in range(min(len(words), MAX_INDEXED_WORDS)) if words[i]}
+
+
+class PrefixIndex:
+    """
+    Suggestions of one type. <entries> are (key, item position) pairs, several keys may point
+    to the same item; <ranks> holds the sort key of each item (smallest first).
+    """
+
+    def __init__(self, items, ranks, entries):
+        pairs = sorted(set(entries))
+        self.items = items
+        self._ranks = ranks
+        self._keys = [key for key, _ in pairs]
+        self._positions = [position for _, position in pairs]
+        self._top = {}
+
+        for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+            start = 0
+            while start < len(self._keys):
+                prefix = self._keys[start][:length]
+                if len(prefix) < length:
+                    start += 1
+                    continue
+
+                end = bisect_left(self._keys, prefix + _LAST_CHAR, start)
+                self._top[prefix] = self._best(start, end, MAX_LIMIT)
+                start = end
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        best = self._top.get(prefix)
+
+        if best is None:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + _LAST_CHAR, start)
+            best = self._best(start, end, limit)
+
+        return [self.items[position] for position in best[:limit]]
+
+    def __len__(self):
+        return len(self.items)
+
+    def _best(self, start, end, limit):
+        return heapq.nsmallest(limit, set(self._positions[start:end]), key=self._ranks.__getitem__)
+
+
+class SellerIndex:
+    def __init__(self, catalog_version, indexes):
+        self.catalog_version = catalog_version
+        self.indexes = indexes
+        self.checked_at = time.monotonic()
+
+    def search(self, query, limit=DEFAULT_LIMIT, types=SUGGESTION_TYPES):
+        prefix = normalize(query)
+        if not prefix:
+            return {suggestion_type: [] for suggestion_type in types}
+
+        return {suggestion_type: self.indexes[suggestion_type].search(prefix, limit) for suggestion_type in types}
+
+
+_seller_indexes = OrderedDict()
+_registry_lock = threading.Lock()
+# One build lock per seller (guarded by _registry_lock). Kept when the index is evicted: only
+# existing sellers get one, and a build never has to race a replaced lock
+_build_locks = {}
+
+
+def get_seller_index(id_seller):
+    """
+    The seller's index, built or rebuilt when its catalog_version moved. The version is read
+    at most once every AUTOCOMPLETE_RECHECK_SECONDS per seller; returns None for unknown sellers.
+    """
+    recheck = current_app.config.get("AUTOCOMPLETE_RECHECK_SECONDS", 2)
+    entry = _seller_indexes.get(id_seller)
+
+    if entry is not None and time.monotonic() - entry.checked_at < recheck:
+        return entry
+
+    version = get_catalog_version(id_seller)
+    if version is None:
+        return None
+
+    catalog_version = version[0]
+
+    if entry is not None and entry.catalog_version == catalog_version:
+        entry.checked_at = time.monotonic()
+        return entry
+
+    # One build at a time per seller: concurrent requests for it wait and reuse the result,
+    # other sellers' requests never wait on it
+    with _build_lock(id_seller):
+        entry = _seller_indexes.get(id_seller)
+        if entry is None or entry.catalog_version != catalog_version:
+            started = time.perf_counter()
+            entry = SellerIndex(catalog_version, build_seller_indexes(id_seller))
+            INDEX_BUILD_TIME.observe(time.perf_counter() - started)
+            INDEX_BUILDS.inc(reason="new" if id_seller not in _seller_indexes else "catalog_changed")
+
+            _store(id_seller, entry)
+
+    return entry
+
+
+def build_seller_indexes(id_seller):
+    """{suggestion type: PrefixIndex} from the seller's vehicles, brands and products."""
+    vehicle_products = (
+        select(Compatibility.vehicle_name, func.count().label("product_count"))
+        .join(Product, Product.cod_product == Compatibility.cod_product)
+        .where(Product.id_seller == id_seller)
+        .group_by(Compatibility.vehicle_name)
+        .subquery()
+    )
+
+    vehicle_rows = db.session.execute(
+        select(
+            SellerVehicles.vehicle_name, Vehicle.hash_brand, VehicleBrand.brand_name,
+            func.coalesce(vehicle_products.c.product_count, 0).label("product_count")
+        )
+        .join(Vehicle, Vehicle.vehicle_name == SellerVehicles.vehicle_name)
+        .outerjoin(VehicleBrand, VehicleBrand.hash_brand == Vehicle.hash_brand)
+        .outerjoin(vehicle_products, vehicle_products.c.vehicle_name == SellerVehicles.vehicle_name)
+        .where(SellerVehicles.id_seller == id_seller)
+    ).all()
+
+    items, ranks, entries = [], [], []
+    brand_vehicles = {}
+
+    for row in vehicle_rows:
+        brand_vehicles[row.hash_brand] = brand_vehicles.get(row.hash_brand, 0) + 1
+
+        entries.extend((key, len(items)) for key in word_keys(row.vehicle_name))
+        ranks.append((-row.product_count, row.vehicle_name))
+        items.append({"vehicle_name": row.vehicle_name, "brand": row.brand_name, "product_count": row.product_count})
+
+    vehicles = PrefixIndex(items, ranks, entries)
+
+    items, ranks, entries = [], [], []
+
+    for hash_brand, brand_name, display_order in db.session.execute(
+        select(VehicleBrand.hash_brand, VehicleBrand.brand_name, VehicleBrand.display_order)
+        .join(SellerBrands, SellerBrands.hash_brand == VehicleBrand.hash_brand)
+        .where(SellerBrands.id_seller == id_seller)
+    ):
+        entries.extend((key, len(items)) for key in word_keys(brand_name))
+        ranks.append((-brand_vehicles.get(hash_brand, 0), display_order, brand_name))
+        items.append({"hash_brand": hash_brand, "brand_name": brand_name})
+
+    brands = PrefixIndex(items, ranks, entries)
+
+    items, ranks, entries = [], [], []
+
+    for cod_product, name_product, is_active in db.session.execute(
+        select(Product.cod_product, Product.name_product, Product.is_active).where(Product.id_seller == id_seller)
+    ):
+        code = normalize(cod_product)
+        entries.append((code, len(items)))
+        # "ABC123" finds "ABC-123"
+        compact_code = _NOT_CODE_CHARS.sub("", code)
+        if compact_code and compact_code != code:
+            entries.append((compact_code, len(items)))
+        entries.extend((key, len(items)) for key in word_keys(name_product))
+
+        # Active products first, then shorter codes (closer to what was typed)
+        ranks.append((not is_active, len(cod_product), cod_product))
+        items.append({"cod_product": cod_product, "name_product": name_product})
+
+    products = PrefixIndex(items, ranks, entries)
+
+    return {"vehicles": vehicles, "brands": brands, "products": products}
+
+
+def _build_lock(id_seller):
+    with _registry_lock:
+        lock = _build_locks.get(id_seller)
+        if lock is None:
+            lock = _build_locks[id_seller] = threading.Lock()
+
+        return lock
+
+
+def _store(id_seller, entry):
+    """Keeps at most AUTOCOMPLETE_MAX_SELLERS indexes, dropping the least recently built."""
+    max_sellers = current_app.config.get("AUTOCOMPLETE_MAX_SELLERS", 64)
+
+    with _registry_lock:
+        _seller_indexes[id_seller] = entry
+        _seller_indexes.move_to_end(id_seller)
+
+        while len(_seller_indexes) > max_sellers:
+            _seller_indexes.popitem(last=False)
@@ -0,0 +1,85 @@
+""" --------------------------------- Columnar (Parquet / Arrow IPC) catalog export --------------------------------- """
+# Same products as the XLSX/JSON exports (serialize_products), written as typed columns:
+# images and compatibilities are native list columns, so consumers read them without parsing
+# JSON out of a cell. Rows are written in row groups as they come off iter_product_data.
+# pyarrow is imported on first use; without it these formats are reported as unavailable.
+
+COLUMNAR_FORMATS = {
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Products per row group (parquet) / record batch (arrow)
+ROW_GROUP_SIZE = 10000
+
+COMPRESSION = "zstd"
+
+
+def columnar_export_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def product_schema():
+    import pyarrow as pa
+
+    vehicle = pa.struct([
+        ("vehicle_name", pa.string()),
+        ("vehicle_type", pa.string()),
+        ("start_year", pa.string()),
+        ("end_year", pa.string()),
+        ("brand", pa.string()),
+    ])
+
+    return pa.schema([
+        ("cod_product", pa.string()),
+        ("name_product", pa.string()),
+        ("description", pa.string()),
+        ("is_active", pa.bool_()),
+        ("is_manufactured", pa.bool_()),
+        ("bar_code", pa.int64()),
+        ("gear_quantity", pa.int32()),
+        ("gear_dimensions", pa.string()),
+        ("cross_reference", pa.string()),
+        ("category", pa.string()),
+        ("images", pa.list_(pa.string())),
+        ("compatibilities", pa.list_(vehicle)),
+    ])
+
+
+def write_products_columnar(products, fileobj, format, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes serialized products to <fileobj> as a Parquet or Arrow IPC file (format is a key
+    of COLUMNAR_FORMATS), row_group_size products per row group. Returns the product count.
+    """
+    import pyarrow as pa
+
+    schema = product_schema()
+
+    if format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = pq.ParquetWriter(fileobj, schema, compression=COMPRESSION)
+    else:
+        writer = pa.ipc.new_file(fileobj, schema, options=pa.ipc.IpcWriteOptions(compression=COMPRESSION))
+
+    count = 0
+    with writer:
+        rows = []
+        for product in products:
+            rows.append(product)
+
+            if len(rows) == row_group_size:
+                writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+                count += len(rows)
+                rows = []
+
+        if rows or not count:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            count += len(rows)
+
+    return count
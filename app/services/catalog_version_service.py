@@ -0,0 +1,321 @@
+import datetime
+from flask import request
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+from app.extensions import cache, db
+from app.services.fingerprint_service import PENDING_FINGERPRINTS, write_fingerprints
+from app.services.product_document_service import (
+    DEFERRED_DOCUMENTS, discard_product_documents, products_embedding, refresh_product_documents
+)
+from app.models import (
+    Category, Compatibility, CustomShowcase, Images, Label, Product, Seller,
+    SellerBrands, SellerCategories, SellerVehicles, Vehicle, VehicleBrand
+)
+
+""" --------------------------------- Per-seller catalog version --------------------------------- """
+# Every commit that touches a seller's catalog bumps seller.catalog_version inside the same
+# transaction. Caches, ETags and CDN keys use that number to know exactly when to invalidate;
+# once the commit succeeds, entries of the shared cache tagged catalog_tag(id_seller) are dropped.
+# The same hooks keep product.content_hash and product_document in step (see fingerprint_service
+# and product_document_service).
+
+# Models that carry the seller directly
+SELLER_SCOPED_MODELS = (Product, SellerCategories, SellerBrands, SellerVehicles, Label)
+
+# Models that only reach the seller through their product
+PRODUCT_SCOPED_MODELS = (Images, Compatibility, CustomShowcase)
+
+# Shared reference data: (model, key attribute, seller link model, link key column)
+REFERENCE_MODELS = (
+    (Category, "hash_category", SellerCategories, SellerCategories.hash_category),
+    (Vehicle, "vehicle_name", SellerVehicles, SellerVehicles.vehicle_name),
+    (VehicleBrand, "hash_brand", SellerBrands, SellerBrands.hash_brand),
+)
+
+IN_CHUNK_SIZE = 500
+
+# session.info key of a shared set: when present, commits record the changed sellers there
+# instead of updating seller rows (see bump_catalog_versions)
+DEFERRED_BUMPS = "catalog_deferred_bumps"
+
+# session.info key of the sellers bumped by the transaction, for the after_commit hook
+BUMPED_SELLERS = "catalog_bumped_sellers"
+
+
+def register_catalog_version_events():
+    """Attach the session hooks once; they apply to Flask-SQLAlchemy and async sessions alike."""
+    if event.contains(Session, "before_flush", _collect_catalog_changes):
+        return
+
+    event.listen(Session, "before_flush", _collect_catalog_changes)
+    event.listen(Session, "before_commit", _bump_catalog_versions)
+    event.listen(Session, "after_commit", _invalidate_bumped_sellers)
+    event.listen(Session, "after_rollback", _discard_catalog_changes)
+
+
+def mark_catalog_changed(session, id_sellers=(), cod_products=()):
+    """
+    Flags sellers (directly or through product codes) as changed in the current transaction.
+    Needed by bulk UPDATE/DELETE statements, which never go through the flush hooks.
+    """
+    changes = _pending_changes(session)
+
+    for id_seller in id_sellers:
+        normalized = _normalize_seller_id(id_seller)
+        if normalized is not None:
+            changes["sellers"].add(normalized)
+
+    changes["products"].update(code for code in cod_products if code)
+
+
+def bump_catalog_versions(connection, id_sellers):
+    """
+    Increments catalog_version of the given sellers with a single UPDATE.
+    Used directly by work that defers the per-commit bumps (sessions created with
+    info={DEFERRED_BUMPS: set()}), e.g. a parallel import, so concurrent transactions
+    do not all queue on the same seller rows.
+    """
+    sellers = sorted({_normalize_seller_id(id_seller) for id_seller in id_sellers} - {None})
+    if not sellers:
+        return
+
+    seller_table = Seller.__table__
+
+    connection.execute(
+        update(seller_table)
+        .where(seller_table.c.id.in_(sellers))
+        .values(
+            catalog_version=seller_table.c.catalog_version + 1,
+            catalog_updated_at=datetime.datetime.utcnow()
+        )
+    )
+
+
+def catalog_tag(id_seller):
+    """Cache tag of everything derived from a seller's catalog."""
+    return f"seller:{_normalize_seller_id(id_seller)}"
+
+
+def invalidate_catalog_caches(id_sellers):
+    """
+    Drops the cached entries of the given sellers. The session hooks call it after each commit;
+    work that bumps versions itself (bump_catalog_versions) calls it once its transaction commits.
+    """
+    sellers = {_normalize_seller_id(id_seller) for id_seller in id_sellers} - {None}
+
+    cache.invalidate_tags(catalog_tag(id_seller) for id_seller in sellers)
+
+
+def get_catalog_version(id_seller):
+    """Returns (catalog_version, catalog_updated_at) for a seller or None if it does not exist."""
+    id_seller = _normalize_seller_id(id_seller)
+    if id_seller is None:
+        return None
+
+    row = db.session.execute(
+        select(Seller.catalog_version, Seller.catalog_updated_at).where(Seller.id == id_seller)
+    ).first()
+
+    return (row.catalog_version, row.catalog_updated_at) if row else None
+
+
+def get_catalog_version_by_product(cod_product):
+    """Returns (id_seller, catalog_version, catalog_updated_at) of the product's seller, or None."""
+    row = db.session.execute(
+        select(Seller.id, Seller.catalog_version, Seller.catalog_updated_at)
+        .join(Product, Product.id_seller == Seller.id)
+        .where(Product.cod_product == cod_product)
+    ).first()
+
+    return (row.id, row.catalog_version, row.catalog_updated_at) if row else None
+
+
+""" --------------------------------- ETag keys for conditional_get --------------------------------- """
+
+
+def seller_catalog_etag(*args, **kwargs):
+    """ETag key for endpoints scoped by an `id_seller` path or query parameter."""
+    id_seller = kwargs.get("id_seller") or request.args.get("id_seller")
+    version = get_catalog_version(id_seller)
+
+    if version is None:
+        return None
+
+    catalog_version, updated_at = version
+
+    return f"seller:{_normalize_seller_id(id_seller)}:v{catalog_version}", updated_at
+
+
+def product_catalog_etag(cod_product, **kwargs):
+    """ETag key for product endpoints: the catalog version of the product's seller."""
+    version = get_catalog_version_by_product(cod_product)
+
+    if version is None:
+        return None
+
+    id_seller, catalog_version, updated_at = version
+
+    return f"seller:{id_seller}:v{catalog_version}", updated_at
+
+
+""" --------------------------------- Session hooks --------------------------------- """
+
+
+def _pending_changes(session):
+    # products: content changed; documents: only what their documents embed (category, vehicle, brand)
+    return session.info.setdefault("catalog_changes", {"sellers": set(), "products": set(), "documents": set()})
+
+
+def _normalize_seller_id(id_seller):
+    try:
+        return int(id_seller)
+    except (TypeError, ValueError):
+        return None
+
+
+def _collect_catalog_changes(session, flush_context, instances):
+    changes = _pending_changes(session)
+    reference_keys = {}
+    renamed_vehicles = set()
+
+    touched = [(obj, False) for obj in session.new]
+    touched += [(obj, True) for obj in session.dirty if session.is_modified(obj)]
+    touched += [(obj, True) for obj in session.deleted]
+
+    for obj, persisted in touched:
+        if isinstance(obj, SELLER_SCOPED_MODELS):
+            changes["sellers"].add(_normalize_seller_id(obj.id_seller))
+
+            if isinstance(obj, Product):
+                changes["products"].add(obj.cod_product)
+
+                # A product moved to another seller changes both catalogs
+                history = _history(obj, "id_seller")
+                changes["sellers"].update(_normalize_seller_id(v) for v in history)
+
+        elif isinstance(obj, PRODUCT_SCOPED_MODELS):
+            changes["products"].add(obj.cod_product)
+
+        elif persisted:
+            # New reference rows are not linked to any seller yet, only edits/deletes matter
+            for model, key_attr, _, _ in REFERENCE_MODELS:
+                if isinstance(obj, model):
+                    reference_keys.setdefault(model, set()).add(getattr(obj, key_attr))
+
+            # Renaming or deleting a vehicle cascades into compatibility.vehicle_name, which is
+            # part of the product fingerprint; the rows still hold the old name at this point
+            if isinstance(obj, Vehicle):
+                old_names = _history(obj, "vehicle_name")
+                if old_names or obj in session.deleted:
+                    renamed_vehicles.update(old_names or [obj.vehicle_name])
+
+    changes["sellers"].discard(None)
+
+    # Resolve now: ON DELETE CASCADE would remove the seller links during this flush
+    for model, _, link_model, link_column in REFERENCE_MODELS:
+        keys = reference_keys.get(model)
+        if keys:
+            changes["sellers"].update(
+                _select_in(session, link_model.__table__.c.id_seller, link_column, keys)
+            )
+
+    if renamed_vehicles:
+        changes["products"].update(
+            _select_in(session, Compatibility.__table__.c.cod_product,
+                       Compatibility.__table__.c.vehicle_name, renamed_vehicles)
+        )
+
+    # Also before the flush, while cascaded rows still point at the old keys
+    if reference_keys:
+        changes["documents"].update(products_embedding(
+            session.connection(),
+            categories=reference_keys.get(Category, ()),
+            vehicles=reference_keys.get(Vehicle, set()) | renamed_vehicles,
+            brands=reference_keys.get(VehicleBrand, ())
+        ))
+
+
+def _bump_catalog_versions(session):
+    if (
+        "catalog_changes" not in session.info
+        and PENDING_FINGERPRINTS not in session.info
+        and not (session.new or session.dirty or session.deleted)
+    ):
+        return
+
+    # commit() only flushes after before_commit, so flush here to see the pending objects
+    session.flush()
+
+    changes = session.info.pop("catalog_changes", None)
+    fingerprints = session.info.pop(PENDING_FINGERPRINTS, None)
+
+    if (changes and changes["products"]) or fingerprints:
+        write_fingerprints(session.connection(), changes["products"] if changes else (), fingerprints)
+
+    if not changes:
+        return
+
+    documents = changes["products"] | changes["documents"]
+    if documents:
+        deferred_documents = session.info.get(DEFERRED_DOCUMENTS)
+
+        if deferred_documents is not None:
+            # Stale documents go now; the caller rebuilds them in bulk (reads build them live meanwhile)
+            deferred_documents.update(documents)
+            discard_product_documents(session.connection(), documents)
+        else:
+            refresh_product_documents(session.connection(), documents)
+
+    sellers = set(changes["sellers"])
+
+    if changes["products"]:
+        sellers.update(
+            _select_in(session, Product.__table__.c.id_seller,
+                       Product.__table__.c.cod_product, changes["products"])
+        )
+
+    sellers.discard(None)
+    if not sellers:
+        return
+
+    deferred = session.info.get(DEFERRED_BUMPS)
+    if deferred is not None:
+        deferred.update(sellers)
+        return
+
+    bump_catalog_versions(session.connection(), sellers)
+    session.info.setdefault(BUMPED_SELLERS, set()).update(sellers)
+
+
+def _invalidate_bumped_sellers(session):
+    sellers = session.info.pop(BUMPED_SELLERS, None)
+
+    if sellers:
+        invalidate_catalog_caches(sellers)
+
+
+def _discard_catalog_changes(session):
+    session.info.pop("catalog_changes", None)
+    session.info.pop(PENDING_FINGERPRINTS, None)
+    session.info.pop(BUMPED_SELLERS, None)
+
+
+def _history(obj, attribute):
+    history = inspect(obj).attrs[attribute].history
+
+    return list(history.deleted or ())
+
+
+def _select_in(session, target_column, key_column, keys):
+    """Runs `SELECT target WHERE key IN (...)` in chunks on the session's connection (no autoflush)."""
+    keys = list(keys)
+    found = set()
+
+    for i in range(0, len(keys), IN_CHUNK_SIZE):
+        chunk = keys[i:i + IN_CHUNK_SIZE]
+        rows = session.connection().execute(
+            select(target_column).where(key_column.in_(chunk))
+        )
+        found.update(row[0] for row in rows)
+
+    return found
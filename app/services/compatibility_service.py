@@ -9,6 +9,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from app.dal.encryptor import HashGenerator
 from app.extensions import db
 from app.models import Compatibility, Vehicle, VehicleBrand, SellerVehicles, SellerBrands
+from app.services.catalog_version_service import mark_catalog_changed
 
 
 class DatabaseError(Exception):
@@ -240,6 +241,13 @@ def handle_compatibility(
                 # brands that become unused (no remaining seller-vehicle entries) are:
                 deletable_brands = hash_brands - remaining_brands
 
+            # Bulk deletes skip the flush hooks, so flag the affected catalogs explicitly
+            affected_sellers_stmt = select(SellerVehicles.id_seller).where(
+                SellerVehicles.vehicle_name.in_(be_deleted)).distinct()
+            affected_sellers = db.session.execute(affected_sellers_stmt).scalars().all()
+
+            mark_catalog_changed(db.session, id_sellers=affected_sellers, cod_products=[cod_product])
+
             # 2) delete SellerVehicles entries for the vehicles being removed
             db.session.execute(
                 delete(SellerVehicles).where(SellerVehicles.vehicle_name.in_(be_deleted))
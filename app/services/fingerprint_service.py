@@ -0,0 +1,160 @@
+import hashlib
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, select, update
+from app.extensions import db
+from app.models import Compatibility, Images, Product
+
+""" --------------------------------- Per-product content fingerprint --------------------------------- """
+# product.content_hash digests what the catalog holds for a product: its fields, the set of
+# compatible vehicles and the set of image URLs. The import compares it with the fingerprint of
+# each sheet row to skip unchanged products without loading their compatibilities and images;
+# exports and caches can use it as a cheap "did this product change" marker.
+#
+# NULL means unknown. Every commit that touches a product clears it (see the catalog version
+# hooks) unless the same transaction staged a fresh fingerprint with stage_fingerprints.
+
+FINGERPRINT_FIELDS = (
+    "name_product", "description", "is_manufactured", "bar_code", "gear_quantity",
+    "gear_dimensions", "cross_reference", "hash_category", "id_seller",
+)
+
+# session.info key of the {cod_product: fingerprint} written when the transaction commits
+PENDING_FINGERPRINTS = "catalog_pending_fingerprints"
+
+FINGERPRINT_BATCH_SIZE = 500
+
+# Separators that never appear in catalog text
+_FIELD_BREAK = "\x1e"
+_ITEM_BREAK = "\x1f"
+
+
+def product_fingerprint(values, vehicle_names, image_urls):
+    """
+    sha256 of the product fields (a mapping with FINGERPRINT_FIELDS), the vehicle names and
+    the image URLs. Lists are compared as sets, like the import planner does: order and
+    repetitions never change the fingerprint.
+    """
+    parts = [_canonical(values.get(field)) for field in FINGERPRINT_FIELDS]
+    parts.append(_ITEM_BREAK.join(sorted({name.strip().upper() for name in vehicle_names})))
+    parts.append(_ITEM_BREAK.join(sorted({url.strip() for url in image_urls})))
+
+    return hashlib.sha256(_FIELD_BREAK.join(parts).encode()).hexdigest()
+
+
+def record_fingerprint(record, hash_category):
+    """Fingerprint of the product an ImportRecord describes (see import_normalizer)."""
+    return product_fingerprint(
+        record.product_fields(hash_category),
+        (name for name, *_ in record.vehicles),
+        record.images
+    )
+
+
+def stage_fingerprints(session, fingerprints):
+    """
+    Records {cod_product: fingerprint} to be written when the session commits, after every
+    other change of the transaction. Works for sync and async sessions alike.
+    """
+    session.info.setdefault(PENDING_FINGERPRINTS, {}).update(fingerprints)
+
+
+def write_fingerprints(connection, changed_products, fingerprints):
+    """
+    Called by the before_commit hook: clears content_hash of the changed products that did not
+    get a new fingerprint and writes the staged ones with a single executemany UPDATE.
+    """
+    fingerprints = fingerprints or {}
+    product_table = Product.__table__
+
+    stale = sorted(set(changed_products) - set(fingerprints) - {None})
+    for i in range(0, len(stale), FINGERPRINT_BATCH_SIZE):
+        connection.execute(
+            update(product_table)
+            .where(
+                product_table.c.cod_product.in_(stale[i:i + FINGERPRINT_BATCH_SIZE]),
+                product_table.c.content_hash.isnot(None)
+            )
+            .values(content_hash=None)
+        )
+
+    if fingerprints:
+        connection.execute(
+            update(product_table)
+            .where(product_table.c.cod_product == bindparam("b_cod_product"))
+            .values(content_hash=bindparam("b_content_hash")),
+            [
+                {"b_cod_product": cod_product, "b_content_hash": fingerprint}
+                for cod_product, fingerprint in fingerprints.items()
+            ]
+        )
+
+
+def backfill_fingerprints(batch_size=FINGERPRINT_BATCH_SIZE, only_missing=True):
+    """
+    Computes content_hash from what the database holds, batch_size products per transaction
+    (walked in cod_product order). Returns how many products got a fingerprint.
+    """
+    product_table = Product.__table__
+    columns = [product_table.c.cod_product] + [product_table.c[field] for field in FINGERPRINT_FIELDS]
+
+    written, last_code = 0, None
+
+    while True:
+        stmt = select(*columns).order_by(product_table.c.cod_product).limit(batch_size)
+        if only_missing:
+            stmt = stmt.where(product_table.c.content_hash.is_(None))
+        if last_code is not None:
+            stmt = stmt.where(product_table.c.cod_product > last_code)
+
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            break
+
+        codes = [row.cod_product for row in rows]
+        vehicles, images = {}, {}
+
+        for cod_product, vehicle_name in db.session.execute(
+            select(Compatibility.cod_product, Compatibility.vehicle_name)
+            .where(Compatibility.cod_product.in_(codes))
+        ):
+            vehicles.setdefault(cod_product, []).append(vehicle_name)
+
+        for cod_product, url in db.session.execute(
+            select(Images.cod_product, Images.url).where(Images.cod_product.in_(codes))
+        ):
+            images.setdefault(cod_product, []).append(url)
+
+        stage_fingerprints(db.session, {
+            row.cod_product: product_fingerprint(
+                row._mapping, vehicles.get(row.cod_product, ()), images.get(row.cod_product, ())
+            )
+            for row in rows
+        })
+        db.session.commit()
+
+        written += len(rows)
+        last_code = codes[-1]
+
+    return written
+
+
+@click.command("backfill-fingerprints")
+@click.option("--all", "recompute_all", is_flag=True, help="Recompute every product, not only those without a fingerprint.")
+@click.option("--batch-size", default=FINGERPRINT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def backfill_fingerprints_command(recompute_all, batch_size):
+    """Fills product.content_hash (flask backfill-fingerprints)."""
+    written = backfill_fingerprints(batch_size, only_missing=not recompute_all)
+    click.echo(f"{written} product fingerprints written")
+
+
+def _canonical(value):
+    """Same equality as import_planner._same: missing is not empty, bools as 0/1, text stripped."""
+    if value is None:
+        return "\x00"
+
+    if isinstance(value, bool):
+        return "1" if value else "0"
+
+    return str(value).strip()
@@ -0,0 +1,298 @@
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from urllib.parse import unquote, urlsplit, urlunsplit
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, tuple_, update
+from app.dal.S3_client import S3ClientSingleton
+from app.extensions import db
+from app.models import Images
+from app.services.catalog_version_service import mark_catalog_changed
+from app.utils.metrics import registry
+
+""" --------------------------------- Image variants (thumbnails) --------------------------------- """
+# Every product image gets resized copies for the storefront grids: for each IMAGE_VARIANT_SIZES
+# size (longest edge in pixels, never upscaled) one file per IMAGE_VARIANT_FORMATS format, stored
+# in the bucket of the original under variants/<size>/<original key>.<ext>. Their URLs are kept
+# in images.variants and embedded in the product documents.
+#
+# Decoding, resizing and encoding are CPU work: they run in a process pool (IMAGE_VARIANT_WORKERS
+# processes per worker, started on first use) so request threads only wait on the result and the
+# uploads. Uploads render their images while the originals go to S3; images uploaded before this
+# existed get their variants from flask backfill-image-variants.
+#
+# Pillow is optional: without it images are stored without variants.
+
+VARIANT_PREFIX = "variants/"
+
+FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+BACKFILL_BATCH_SIZE = 100
+
+IMAGE_VARIANTS = registry.counter(
+    "image_variants_total", "Images processed into variants, by outcome (rendered, failed, timeout).", ("result",)
+)
+IMAGE_VARIANT_TIME = registry.histogram(
+    "image_variant_seconds", "Time from submitting an image to the pool to having its variants rendered."
+)
+
+log = logging.getLogger(__name__)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def image_variants_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def variant_settings():
+    """(sizes, formats, quality) from the IMAGE_VARIANT_* settings, None when disabled."""
+    config = current_app.config
+
+    if not config.get("IMAGE_VARIANTS_ENABLED", True) or not image_variants_available():
+        return None
+
+    sizes = sorted({int(size) for size in str(config.get("IMAGE_VARIANT_SIZES", "320,640")).split(",") if size.strip()})
+    formats = [name.strip() for name in config.get("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",") if name.strip() in FORMATS]
+
+    if not sizes or not formats:
+        return None
+
+    return sizes, formats, config.get("IMAGE_VARIANT_QUALITY", 80)
+
+
+def render_variants(data, sizes, formats, quality):
+    """{(size, format): encoded bytes} of the image in <data>. Runs in the pool processes."""
+    from PIL import Image, ImageOps
+
+    rendered = {}
+
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+
+        if original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA" if "A" in original.getbands() or "transparency" in original.info else "RGB")
+
+        for size in sizes:
+            image = original.copy()
+            image.thumbnail((size, size), Image.LANCZOS)
+
+            for name in formats:
+                pil_format = FORMATS[name][0]
+                frame = image
+
+                if pil_format == "JPEG" and frame.mode == "RGBA":
+                    # No alpha in JPEG: flatten on white, as the storefront background
+                    frame = Image.new("RGB", image.size, (255, 255, 255))
+                    frame.paste(image, mask=image.getchannel("A"))
+
+                output = io.BytesIO()
+                frame.save(output, pil_format, quality=quality, optimize=pil_format == "JPEG")
+                rendered[(size, name)] = output.getvalue()
+
+    return rendered
+
+
+def submit_variants(data):
+    """Future of render_variants(<data>) in the pool, None when variants are disabled."""
+    settings = variant_settings()
+    if settings is None:
+        return None
+
+    return _get_pool().submit(render_variants, data, *settings)
+
+
+def upload_variants(future, url, submitted_at=None):
+    """
+    Waits for a submit_variants future and uploads the variants next to the original at <url>.
+    Returns the images.variants value: {"<size>": {format: url}}, {} when the image could not
+    be processed, None when rendering timed out or an upload failed (left to the backfill).
+    """
+    submitted_at = submitted_at or time.perf_counter()
+
+    try:
+        rendered = future.result(timeout=current_app.config.get("IMAGE_VARIANT_TIMEOUT", 30))
+    except FutureTimeoutError:
+        IMAGE_VARIANTS.inc(result="timeout")
+        future.cancel()
+        return None
+    except Exception:
+        IMAGE_VARIANTS.inc(result="failed")
+        log.warning("Variants of %s could not be rendered", url, exc_info=True)
+        return {}
+
+    IMAGE_VARIANT_TIME.observe(time.perf_counter() - submitted_at)
+
+    bucket, key = _bucket_and_key(url)
+    client = S3ClientSingleton().client
+    variants = {}
+
+    for (size, name), body in rendered.items():
+        _, extension, content_type = FORMATS[name]
+        variant_key = f"{VARIANT_PREFIX}{size}/{key}.{extension}"
+
+        try:
+            client.put_object(Bucket=bucket, Key=variant_key, Body=body, ContentType=content_type)
+        except Exception:
+            IMAGE_VARIANTS.inc(result="failed")
+            log.warning("Variant %s of %s could not be uploaded", variant_key, url, exc_info=True)
+            return None
+
+        variants.setdefault(str(size), {})[name] = _replace_key(url, variant_key)
+
+    IMAGE_VARIANTS.inc(result="rendered")
+
+    return variants
+
+
+def upload_product_images(images):
+    """
+    Uploads request files with S3ClientSingleton.upload_to_s3 and makes their variants.
+    Returns [(url, images.variants value)]; all the files render in the pool while the
+    originals are uploaded.
+    """
+    submitted = []
+
+    for image in images:
+        data = image.read()
+        image.seek(0)
+        submitted.append((image, submit_variants(data), time.perf_counter()))
+
+    s3 = S3ClientSingleton()
+    uploaded = []
+
+    for image, future, submitted_at in submitted:
+        url = s3.upload_to_s3(image=image)
+
+        if future is None or not isinstance(url, str):
+            if future is not None:
+                future.cancel()
+            uploaded.append((url, None))
+            continue
+
+        variants = upload_variants(future, url, submitted_at)
+        uploaded.append((url, dump_variants(variants)))
+
+    return uploaded
+
+
+def dump_variants(variants):
+    return None if variants is None else json.dumps(variants, separators=(",", ":"))
+
+
+def backfill_image_variants(batch_size=BACKFILL_BATCH_SIZE, limit=None):
+    """
+    Makes the variants of every image that has none yet (images.variants IS NULL), batch_size
+    images per transaction: originals are downloaded from S3 and rendered in the pool.
+    Returns (processed, with variants).
+    """
+    if variant_settings() is None:
+        raise click.ClickException("Image variants are disabled or Pillow is not installed")
+
+    client = S3ClientSingleton().client
+    processed = rendered = 0
+    # Keyset over the primary key: images left NULL by a failure are not retried in this run
+    last = None
+
+    while limit is None or processed < limit:
+        stmt = select(Images.cod_product, Images.id_image, Images.url).where(Images.variants.is_(None))
+        if last is not None:
+            stmt = stmt.where(tuple_(Images.cod_product, Images.id_image) > last)
+
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        rows = db.session.execute(stmt.order_by(Images.cod_product, Images.id_image).limit(size)).all()
+
+        if not rows:
+            break
+
+        last = (rows[-1].cod_product, rows[-1].id_image)
+
+        submitted = []
+        for row in rows:
+            bucket, key = _bucket_and_key(row.url)
+
+            try:
+                data = client.get_object(Bucket=bucket, Key=key)["Body"].read()
+            except Exception:
+                # Left NULL: the next run tries again
+                log.warning("Original %s could not be downloaded", row.url, exc_info=True)
+                continue
+
+            submitted.append((row, submit_variants(data), time.perf_counter()))
+
+        for row, future, submitted_at in submitted:
+            variants = upload_variants(future, row.url, submitted_at)
+
+            if variants is None:
+                continue
+
+            db.session.execute(
+                update(Images)
+                .where(Images.cod_product == row.cod_product, Images.id_image == row.id_image)
+                .values(variants=dump_variants(variants))
+            )
+            rendered += bool(variants)
+
+        # The documents embed the variant URLs: rebuilt by the catalog version hooks on commit
+        mark_catalog_changed(db.session, cod_products={row.cod_product for row in rows})
+        db.session.commit()
+
+        processed += len(rows)
+
+    return processed, rendered
+
+
+@click.command("backfill-image-variants")
+@click.option("--batch-size", default=BACKFILL_BATCH_SIZE, show_default=True)
+@click.option("--limit", type=int, default=None, help="Stop after this many images.")
+@with_appcontext
+def backfill_image_variants_command(batch_size, limit):
+    """Makes the variants of the images that have none (flask backfill-image-variants)."""
+    processed, rendered = backfill_image_variants(batch_size, limit)
+    click.echo(f"{processed} images processed, {rendered} with variants")
+
+
+def _get_pool():
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        # A pool inherited through fork (gunicorn preload) belongs to the parent
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(
+                max_workers=current_app.config.get("IMAGE_VARIANT_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_pid = os.getpid()
+
+        return _pool
+
+
+def _bucket_and_key(url):
+    """(bucket, key) of an S3 URL as upload_to_s3 builds them (https://<bucket>.s3[.<region>].amazonaws.com/<key>)."""
+    parts = urlsplit(url)
+
+    return parts.netloc.split(".s3", 1)[0], unquote(parts.path.lstrip("/"))
+
+
+def _replace_key(url, key):
+    parts = urlsplit(url)
+
+    return urlunsplit((parts.scheme, parts.netloc, "/" + key, "", ""))
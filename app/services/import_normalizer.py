@@ -0,0 +1,264 @@
+import re
+import string
+
+""" --------------------------------- Column-wise normalization of the product spreadsheet --------------------------------- """
+# Every cell is cleaned with whole-column pandas operations before any database work, so the
+# importer only loops over ready-to-use records. pandas/numpy are imported on first use.
+
+# Compatibility cells come in several shapes, all meaning the same list:
+#   "[ '1974' ; '1973' ; '1984' ]", "'Desconhecido', 'Desconhecido'", "A,B,C", ""
+COMPAT_COLUMNS = {
+    "name": "COMPATIBILITY",
+    "start_year": "START_YEAR",
+    "end_year": "END_YEAR",
+    "vehicle_type": "TYPE_VEHICLE",
+    "brand": "VEHICLE_BRAND",
+}
+
+# Outer brackets/parens of each cell and every quote go away, then the cell splits on ";" or ","
+COMPAT_SEPARATORS = ";,"
+IMAGES_SEPARATORS = "|"
+OPENING_CHARS = "[(" + string.whitespace
+CLOSING_CHARS = "])" + string.whitespace
+QUOTES = str.maketrans("", "", "'\"")
+
+# Joins the cells of a column into one string (never appears in spreadsheet text)
+CELL_BREAK = "\x01"
+
+DISCONTINUED_PREFIX = "ITEM DESCONTINUADO"
+
+
+class ImportRecord:
+    """One normalized spreadsheet row: plain Python values, ready to become a Product."""
+
+    __slots__ = (
+        "line", "cod_product", "name_product", "description", "is_manufactured", "bar_code",
+        "gear_quantity", "gear_dimensions", "cross_reference", "category", "id_seller",
+        "error", "images", "vehicles",
+    )
+
+    def __init__(self, line, cod_product, name_product, description, is_manufactured, bar_code,
+                 gear_quantity, gear_dimensions, cross_reference, category, id_seller,
+                 error=None, images=None, vehicles=None):
+        self.line = line
+        self.cod_product = cod_product
+        self.name_product = name_product
+        self.description = description
+        self.is_manufactured = is_manufactured
+        self.bar_code = bar_code
+        self.gear_quantity = gear_quantity
+        self.gear_dimensions = gear_dimensions
+        self.cross_reference = cross_reference
+        self.category = category
+        self.id_seller = id_seller
+        self.error = error
+        self.images = images or []
+        self.vehicles = vehicles or []
+
+    def product_fields(self, hash_category):
+        """Keyword arguments for Product(...)."""
+        return {
+            "cod_product": self.cod_product,
+            "name_product": self.name_product,
+            "description": self.description,
+            "is_manufactured": self.is_manufactured,
+            "bar_code": self.bar_code,
+            "gear_quantity": self.gear_quantity,
+            "gear_dimensions": self.gear_dimensions,
+            "cross_reference": self.cross_reference,
+            "hash_category": hash_category,
+            "id_seller": self.id_seller,
+        }
+
+
+def normalize_sheet(df):
+    """
+    Turns the DataFrame read from the spreadsheet (upper-cased columns) into a list of
+    ImportRecord, in sheet order. Rows that cannot be imported keep a message in `error`.
+    `vehicles` holds (name, start_year, end_year, vehicle_type, brand) tuples, with unknown
+    years as None and entries lacking a name or a brand dropped.
+    """
+    # "ITEM DESCONTINUADO - Produto X" -> "Produto X", not manufactured
+    names = _text_column(df, "NAME_PRODUCT")
+    name_parts = names.str.split("-", n=1, expand=True).reindex(columns=[0, 1]).astype("string")
+    discontinued = (
+        name_parts[0].str.strip().eq(DISCONTINUED_PREFIX) & name_parts[1].notna()
+    ).fillna(False).astype(bool)
+    names = names.where(~discontinued, name_parts[1].str.strip())
+
+    columns = {
+        "line": df.index.to_series(index=df.index) + 2,
+        "cod_product": _text_column(df, "COD_PRODUCT").str.strip(),
+        "name_product": names,
+        "description": _text_column(df, "DESCRIPTION").fillna("").str.strip(),
+        "is_manufactured": ~discontinued,
+        "bar_code": _integer_column(df, "BAR_CODE"),
+        "gear_quantity": _integer_column(df, "GEAR_QUANTITY"),
+        "gear_dimensions": _raw_column(df, "GEAR_DIMENSIONS"),
+        "cross_reference": _raw_column(df, "CROSS_REF"),
+        "category": _text_column(df, "CATEGORY").str.strip().str.upper(),
+        "id_seller": _integer_column(df, "ID_SELLER"),
+    }
+
+    columns["error"] = _row_errors(columns)
+
+    images = _list_column(df, "IMAGES", IMAGES_SEPARATORS)
+    vehicles = _compatibility_lists(df)
+
+    records = []
+    for row, fields in enumerate(zip(*(_python_values(series) for series in columns.values()))):
+        record = ImportRecord(*fields)
+        record.images = images.get(row, [])
+        record.vehicles = vehicles.get(row, [])
+        records.append(record)
+
+    return records
+
+
+def _row_errors(columns):
+    """Why each row cannot be imported (None when it can), first failing check wins."""
+    import numpy as np
+    import pandas as pd
+
+    checks = [
+        (columns["cod_product"].fillna("").eq(""), "Empty product code!"),
+        (columns["name_product"].fillna("").str.strip().eq(""), "Empty product name!"),
+        (columns["category"].fillna("").eq(""), "Empty category name!"),
+        (columns["id_seller"].isna(), "Invalid seller id!"),
+    ]
+    errors = np.select(
+        [mask.to_numpy(dtype=bool) for mask, _ in checks],
+        [message for _, message in checks],
+        default=""
+    )
+
+    return pd.Series(errors, index=columns["cod_product"].index, dtype="object").mask(errors == "")
+
+
+def _text_column(df, column):
+    """Column as pandas strings (missing cells stay NA); integral floats lose their ".0"."""
+    import pandas as pd
+
+    if column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+
+    series = df[column]
+
+    if pd.api.types.is_float_dtype(series):
+        integral = series.dropna()
+        if (integral == integral.round()).all():
+            series = series.astype("Int64")
+
+    return series.astype("string")
+
+
+def _integer_column(df, column):
+    """int() of every cell, None where it is missing or not a number (floats are truncated)."""
+    import numpy as np
+    import pandas as pd
+
+    if column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+
+    numbers = pd.to_numeric(df[column], errors="coerce")
+
+    if pd.api.types.is_float_dtype(numbers):
+        numbers = np.trunc(numbers)
+
+    return numbers.astype("Int64")
+
+
+def _raw_column(df, column):
+    import pandas as pd
+
+    if column not in df.columns:
+        return pd.Series(None, index=df.index, dtype="object")
+
+    return df[column]
+
+
+def _python_values(series):
+    """Series -> list of builtin Python values, None for every kind of missing value."""
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(series):
+        return series.tolist()
+
+    series = series.astype("object")
+
+    return series.where(series.notna(), None).tolist()
+
+
+def _split_column(df, column, separators, strip_brackets=False):
+    """
+    Splits every cell of a text column into its items in one go: the cells are joined into a
+    single string, cleaned and split with one regex pass each, and the items are numbered per
+    row with NumPy (blank items dropped, positions counted after dropping them).
+    Returns three aligned arrays: row number, position in the row and the item itself.
+    """
+    import numpy as np
+
+    text = CELL_BREAK.join(_text_column(df, column).fillna("").tolist())
+
+    if strip_brackets:
+        # Closing brackets of one cell, the break and the opening brackets of the next
+        text = re.sub(rf"[\]\)\s]*{CELL_BREAK}[\[\(\s]*", CELL_BREAK, text)
+        text = text.lstrip(OPENING_CHARS).rstrip(CLOSING_CHARS).translate(QUOTES)
+
+    # Items sit at the even slots, the delimiter that ended each one at the odd slots
+    parts = re.split(f"([{re.escape(CELL_BREAK + separators)}])", text)
+    items = np.array([item.strip() for item in parts[0::2]], dtype=object)
+    rows = np.concatenate(([0], np.cumsum(np.array(parts[1::2], dtype=object) == CELL_BREAK)))
+
+    keep = items != ""
+    items, rows = items[keep], rows[keep]
+
+    # Position = distance from the first item of the same row
+    order = np.arange(len(rows))
+    row_starts = np.concatenate(([True], rows[1:] != rows[:-1]))
+    positions = order - np.maximum.accumulate(np.where(row_starts, order, 0))
+
+    return rows, positions, items
+
+
+def _list_column(df, column, separators):
+    """{row number: [items of the cell]}"""
+    rows, _, items = _split_column(df, column, separators)
+
+    lists = {}
+    for row, item in zip(rows.tolist(), items.tolist()):
+        lists.setdefault(row, []).append(item)
+
+    return lists
+
+
+def _compatibility_lists(df):
+    """{row number: [(name, start_year, end_year, vehicle_type, brand), ...]}"""
+    import pandas as pd
+
+    if COMPAT_COLUMNS["name"] not in df.columns or COMPAT_COLUMNS["brand"] not in df.columns:
+        return {}
+
+    # Positional zip of the five lists of each row, padding the shorter ones with NaN:
+    # the columns are aligned on a (row << 32 | position) key
+    split = {}
+    for name, column in COMPAT_COLUMNS.items():
+        rows, positions, items = _split_column(df, column, COMPAT_SEPARATORS, strip_brackets=True)
+        split[name] = pd.Series(items, index=(rows << 32) | positions, dtype="object")
+
+    compat = pd.concat(split, axis=1).sort_index()
+    compat = compat[compat["name"].notna() & compat["brand"].notna()]
+
+    # Years repeat a lot, so the "Desconhecido" check runs on the distinct values only
+    for year in ("start_year", "end_year"):
+        values = compat[year]
+        unknown = [value for value in values.dropna().unique() if value.lower().startswith("desconhecido")]
+        compat[year] = values.mask(values.isin(unknown))
+
+    rows = (compat.index.to_numpy() >> 32).tolist()
+
+    vehicles = {}
+    for row, vehicle in zip(rows, zip(*(_python_values(compat[name]) for name in COMPAT_COLUMNS))):
+        vehicles.setdefault(row, []).append(vehicle)
+
+    return vehicles
@@ -0,0 +1,280 @@
+from sqlalchemy import select
+from app.models import Category, Compatibility, Images, Product
+from app.services.fingerprint_service import FINGERPRINT_FIELDS, product_fingerprint, record_fingerprint
+
+""" --------------------------------- Change set between a spreadsheet and the database --------------------------------- """
+# The planner reads, in bulk, everything the database holds for the products of a sheet and
+# classifies each row as new, changed or unchanged. The dry-run import returns the plan as is;
+# the delta import (product_service.apply_import_plan) writes only what it lists.
+# Products whose stored content_hash matches the row are settled by that one column and never
+# have their compatibilities or images loaded.
+
+IMPORT_MODES = ("full", "delta", "dry-run")
+
+# Products compared field by field with the sheet; "category" compares category names
+PLANNED_FIELDS = (
+    "name_product", "description", "is_manufactured", "bar_code", "gear_quantity",
+    "gear_dimensions", "cross_reference", "category", "id_seller",
+)
+
+PLAN_CHUNK_SIZE = 500
+
+# Products listed one by one in the dry-run report, per status
+PLAN_DETAIL_LIMIT = 500
+
+
+class ProductChange:
+    """What importing one spreadsheet record does to its product."""
+
+    __slots__ = (
+        "record", "status", "fields", "previous_seller", "compat_add", "compat_remove",
+        "images_add", "images_remove", "existing_image_ids",
+    )
+
+    def __init__(self, record, status, fields=None, previous_seller=None, compat_add=(), compat_remove=(),
+                 images_add=(), images_remove=(), existing_image_ids=()):
+        self.record = record
+        self.status = status
+        self.fields = fields or {}
+        self.previous_seller = previous_seller
+        self.compat_add = sorted(compat_add)
+        self.compat_remove = sorted(compat_remove)
+        self.images_add = list(images_add)
+        self.images_remove = sorted(images_remove)
+        self.existing_image_ids = set(existing_image_ids)
+
+    def as_dict(self):
+        change = {"cod_product": self.record.cod_product, "line": self.record.line}
+
+        if self.fields:
+            change["fields"] = {field: {"from": old, "to": new} for field, (old, new) in self.fields.items()}
+        if self.compat_add:
+            change["compatibilities_added"] = self.compat_add
+        if self.compat_remove:
+            change["compatibilities_removed"] = self.compat_remove
+        if self.images_add:
+            change["images_added"] = self.images_add
+        if self.images_remove:
+            change["images_removed"] = self.images_remove
+
+        return change
+
+
+class ImportPlan:
+    def __init__(self, changes, errors, fingerprint_matches=0, fingerprints=None):
+        self.changes = changes
+        self.errors = errors
+        # Unchanged products settled by content_hash alone
+        self.fingerprint_matches = fingerprint_matches
+        # {cod_product: fingerprint} of unchanged products that had none stored (or a stale one)
+        self.fingerprints = fingerprints or {}
+
+    def by_status(self, status):
+        return [change for change in self.changes if change.status == status]
+
+    def summary(self, detail_limit=PLAN_DETAIL_LIMIT):
+        new, changed = self.by_status("new"), self.by_status("changed")
+
+        return {
+            "products_new": len(new),
+            "products_changed": len(changed),
+            "products_unchanged": len(self.by_status("unchanged")),
+            "fingerprint_matches": self.fingerprint_matches,
+            "fields_changed": sum(1 for change in changed if change.fields),
+            "compatibilities_added": sum(len(change.compat_add) for change in self.changes),
+            "compatibilities_removed": sum(len(change.compat_remove) for change in self.changes),
+            "images_added": sum(len(change.images_add) for change in self.changes),
+            "images_removed": sum(len(change.images_remove) for change in self.changes),
+            "new": [change.record.cod_product for change in new[:detail_limit]],
+            "changed": [change.as_dict() for change in changed[:detail_limit]],
+            "truncated": len(new) > detail_limit or len(changed) > detail_limit,
+            "errors": self.errors,
+        }
+
+
+async def build_import_plan(session, records, compare_compatibilities=True, compare_images=True):
+    """
+    Compares the normalized records with the database using a handful of chunked SELECTs.
+    Compatibilities and images are only diffed when the sheet has their columns, so a sheet
+    without an IMAGES column never plans to remove images.
+    With both columns present, one SELECT of (cod_product, content_hash) settles every product
+    whose fingerprint matches the row; only the others are compared in detail.
+    """
+    errors, planned, seen = [], [], set()
+
+    for record in records:
+        if record.error:
+            errors.append(f"Error on row {record.line}: {record.error}")
+        elif record.cod_product in seen:
+            errors.append(f"Error on row {record.line}: Duplicate product code {record.cod_product}, row ignored")
+        else:
+            seen.add(record.cod_product)
+            planned.append(record)
+
+    codes = [record.cod_product for record in planned]
+
+    fingerprinted = compare_compatibilities and compare_images
+    stored_hashes, matched = {}, set()
+
+    if fingerprinted and codes:
+        stored_hashes = dict(await _select_in(
+            session,
+            lambda chunk: select(Product.cod_product, Product.content_hash).where(Product.cod_product.in_(chunk)),
+            codes
+        ))
+        category_hashes = await _category_hashes(
+            session, {record.category for record in planned if stored_hashes.get(record.cod_product)}
+        )
+        matched = {
+            record.cod_product for record in planned
+            if stored_hashes.get(record.cod_product)
+            and stored_hashes[record.cod_product] == record_fingerprint(record, category_hashes.get(record.category))
+        }
+        # New products need no lookup either
+        codes = [code for code in codes if code in stored_hashes and code not in matched]
+
+    products = {}
+    for product, category_name in await _select_in(
+        session,
+        lambda chunk: select(Product, Category.name_category)
+        .outerjoin(Category, Category.hash_category == Product.hash_category)
+        .where(Product.cod_product.in_(chunk)),
+        codes
+    ):
+        products[product.cod_product] = _ProductRow(product, category_name)
+
+    existing_codes = list(products)
+    compatibilities, images = {}, {}
+
+    if compare_compatibilities and existing_codes:
+        for cod_product, vehicle_name in await _select_in(
+            session,
+            lambda chunk: select(Compatibility.cod_product, Compatibility.vehicle_name)
+            .where(Compatibility.cod_product.in_(chunk)),
+            existing_codes
+        ):
+            compatibilities.setdefault(cod_product, set()).add(vehicle_name)
+
+    if compare_images and existing_codes:
+        for cod_product, id_image, url in await _select_in(
+            session,
+            lambda chunk: select(Images.cod_product, Images.id_image, Images.url)
+            .where(Images.cod_product.in_(chunk)),
+            existing_codes
+        ):
+            images.setdefault(cod_product, {})[id_image] = url
+
+    changes, fingerprints = [], {}
+    for record in planned:
+        if record.cod_product in matched:
+            changes.append(ProductChange(record, "unchanged"))
+            continue
+
+        current = products.get(record.cod_product)
+
+        if current is None:
+            changes.append(ProductChange(
+                record, "new",
+                compat_add={name.upper() for name, *_ in record.vehicles},
+                images_add=_unique(record.images)
+            ))
+            continue
+
+        fields = {
+            field: (old, new)
+            for field, old, new in (
+                (field, current.value(field), _record_value(record, field)) for field in PLANNED_FIELDS
+            )
+            if not _same(old, new)
+        }
+
+        compat_add = compat_remove = ()
+        if compare_compatibilities:
+            wanted = {name.upper() for name, *_ in record.vehicles}
+            stored = compatibilities.get(record.cod_product, set())
+            compat_add, compat_remove = wanted - stored, stored - wanted
+
+        stored_images = images.get(record.cod_product, {})
+        images_add = images_remove = ()
+        if compare_images:
+            stored_urls = set(stored_images.values())
+            wanted_urls = _unique(record.images)
+            images_add = [url for url in wanted_urls if url not in stored_urls]
+            images_remove = stored_urls - set(wanted_urls)
+
+        status = "changed" if fields or compat_add or compat_remove or images_add or images_remove else "unchanged"
+
+        if status == "unchanged" and fingerprinted:
+            # What the database holds, so the next import of this row takes the fast path
+            fingerprint = product_fingerprint(
+                {field: getattr(current.product, field) for field in FINGERPRINT_FIELDS},
+                compatibilities.get(record.cod_product, ()),
+                stored_images.values()
+            )
+            if fingerprint != stored_hashes.get(record.cod_product):
+                fingerprints[record.cod_product] = fingerprint
+
+        changes.append(ProductChange(
+            record, status, fields,
+            previous_seller=current.product.id_seller,
+            compat_add=compat_add, compat_remove=compat_remove,
+            images_add=images_add, images_remove=images_remove,
+            existing_image_ids=stored_images
+        ))
+
+    return ImportPlan(changes, errors, len(matched), fingerprints)
+
+
+class _ProductRow:
+    def __init__(self, product, category_name):
+        self.product = product
+        self.category_name = category_name
+
+    def value(self, field):
+        if field == "category":
+            return self.category_name
+
+        return getattr(self.product, field)
+
+
+def _record_value(record, field):
+    return record.category if field == "category" else getattr(record, field)
+
+
+def _same(old, new):
+    """Equality across the types the sheet and the database use for the same value."""
+    if old is None or new is None:
+        return old is None and new is None
+
+    if isinstance(old, bool) or isinstance(new, bool):
+        return bool(old) == bool(new)
+
+    return str(old).strip() == str(new).strip()
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+async def _category_hashes(session, names):
+    """{name_category: hash_category}, first match per name like get_or_create_category."""
+    hashes = {}
+
+    for name, hash_category in await _select_in(
+        session,
+        lambda chunk: select(Category.name_category, Category.hash_category).where(Category.name_category.in_(chunk)),
+        sorted(names)
+    ):
+        hashes.setdefault(name, hash_category)
+
+    return hashes
+
+
+async def _select_in(session, build_stmt, keys):
+    rows = []
+
+    for i in range(0, len(keys), PLAN_CHUNK_SIZE):
+        result = await session.execute(build_stmt(keys[i:i + PLAN_CHUNK_SIZE]))
+        rows.extend(result.all())
+
+    return rows
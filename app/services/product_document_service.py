@@ -0,0 +1,334 @@
+import datetime
+import json
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, select
+from app.extensions import db
+from app.models import Category, Compatibility, Images, Product, ProductDocument, Vehicle, VehicleBrand
+
+""" --------------------------------- Denormalized product documents --------------------------------- """
+# product_document holds, per product, the JSON of the product with its category name, images and
+# compatibilities (vehicle + brand). Detail and list endpoints read it with one primary-key lookup
+# instead of loading four tables. The catalog version hooks rebuild the documents of every product
+# a commit touches, inside that commit; shared reference edits (category, vehicle, brand) rebuild
+# the documents that embed them. A missing document is built on the fly from the tables.
+
+# Bump when the document layout changes: older documents are then treated as missing.
+# Additive keys don't need it: readers default them (image "variants" arrived that way, so
+# documents written before it stay valid until backfill-image-variants rewrites them)
+DOCUMENT_VERSION = 1
+
+DOCUMENT_CHUNK_SIZE = 500
+
+# session.info key of a shared set: when present, commits only drop the documents of the products
+# they change and record them there, for the caller to rebuild in bulk (see the spreadsheet import)
+DEFERRED_DOCUMENTS = "catalog_deferred_documents"
+
+# Keys of a listed product (product_summary), in output order. "image" (first image URL) is
+# only returned when asked for with ?fields= / ?include=. image_variants lines up with images:
+# per image, the URLs of its resized copies ({"<size>": {"webp": url, "jpeg": url}}, see
+# image_variant_service), {} while it has none
+SUMMARY_FIELDS = (
+    "cod_product", "name_product", "description", "is_active", "is_manufactured", "bar_code",
+    "gear_quantity", "gear_dimensions", "cross_reference", "category",
+)
+SUMMARY_RELATIONS = ("images", "image", "image_variants", "compatibilities")
+
+
+def build_product_documents(connection, codes):
+    """{cod_product: document} straight from the catalog tables, three SELECTs per chunk."""
+    codes = list(codes)
+    documents = {}
+
+    for i in range(0, len(codes), DOCUMENT_CHUNK_SIZE):
+        chunk = codes[i:i + DOCUMENT_CHUNK_SIZE]
+
+        for row in connection.execute(
+            select(
+                Product.cod_product, Product.name_product, Product.description, Product.is_active,
+                Product.is_manufactured, Product.bar_code, Product.gear_quantity, Product.gear_dimensions,
+                Product.cross_reference, Product.id_seller, Category.name_category
+            )
+            .outerjoin(Category, Category.hash_category == Product.hash_category)
+            .where(Product.cod_product.in_(chunk))
+        ):
+            documents[row.cod_product] = {
+                "v": DOCUMENT_VERSION,
+                "cod_product": row.cod_product,
+                "name_product": row.name_product,
+                "description": row.description,
+                "is_active": row.is_active,
+                "is_manufactured": row.is_manufactured,
+                "bar_code": row.bar_code,
+                "gear_quantity": row.gear_quantity,
+                "gear_dimensions": row.gear_dimensions,
+                "cross_reference": row.cross_reference,
+                "id_seller": row.id_seller,
+                "category": row.name_category,
+                "images": [],
+                "compatibilities": []
+            }
+
+        if not documents:
+            continue
+
+        for cod_product, id_image, url, variants in connection.execute(
+            select(Images.cod_product, Images.id_image, Images.url, Images.variants)
+            .where(Images.cod_product.in_(chunk))
+            .order_by(Images.cod_product, Images.id_image)
+        ):
+            documents[cod_product]["images"].append({
+                "id_image": id_image, "url": url, "variants": _load_variants(variants)
+            })
+
+        for row in connection.execute(
+            select(
+                Compatibility.cod_product, Compatibility.vehicle_name, Vehicle.vehicle_type,
+                Vehicle.start_year, Vehicle.end_year, VehicleBrand.brand_name
+            )
+            .outerjoin(Vehicle, Vehicle.vehicle_name == Compatibility.vehicle_name)
+            .outerjoin(VehicleBrand, VehicleBrand.hash_brand == Vehicle.hash_brand)
+            .where(Compatibility.cod_product.in_(chunk))
+            .order_by(Compatibility.cod_product, Compatibility.vehicle_name)
+        ):
+            documents[row.cod_product]["compatibilities"].append({
+                "vehicle_name": row.vehicle_name,
+                "vehicle_type": row.vehicle_type,
+                "start_year": row.start_year,
+                "end_year": row.end_year,
+                "brand": row.brand_name
+            })
+
+    return documents
+
+
+def refresh_product_documents(connection, codes):
+    """Rebuilds the documents of the given products (deleted products just lose theirs)."""
+    codes = sorted(set(codes) - {None})
+    document_table = ProductDocument.__table__
+    now = datetime.datetime.utcnow()
+
+    for i in range(0, len(codes), DOCUMENT_CHUNK_SIZE):
+        chunk = codes[i:i + DOCUMENT_CHUNK_SIZE]
+        documents = build_product_documents(connection, chunk)
+
+        connection.execute(delete(document_table).where(document_table.c.cod_product.in_(chunk)))
+
+        if documents:
+            connection.execute(insert(document_table), [
+                {
+                    "cod_product": cod_product,
+                    "document": json.dumps(document, ensure_ascii=False, separators=(",", ":")),
+                    "updated_at": now
+                }
+                for cod_product, document in documents.items()
+            ])
+
+
+def discard_product_documents(connection, codes):
+    codes = sorted(set(codes) - {None})
+    document_table = ProductDocument.__table__
+
+    for i in range(0, len(codes), DOCUMENT_CHUNK_SIZE):
+        connection.execute(
+            delete(document_table).where(document_table.c.cod_product.in_(codes[i:i + DOCUMENT_CHUNK_SIZE]))
+        )
+
+
+def products_embedding(connection, categories=(), vehicles=(), brands=()):
+    """Codes of the products whose documents show any of the given categories, vehicles or brands."""
+    lookups = (
+        (categories, lambda chunk: select(Product.cod_product).where(Product.hash_category.in_(chunk))),
+        (vehicles, lambda chunk: select(Compatibility.cod_product).where(Compatibility.vehicle_name.in_(chunk))),
+        (brands, lambda chunk: (
+            select(Compatibility.cod_product)
+            .join(Vehicle, Vehicle.vehicle_name == Compatibility.vehicle_name)
+            .where(Vehicle.hash_brand.in_(chunk))
+        )),
+    )
+
+    codes = set()
+    for keys, build_stmt in lookups:
+        keys = list(keys)
+
+        for i in range(0, len(keys), DOCUMENT_CHUNK_SIZE):
+            codes.update(connection.execute(build_stmt(keys[i:i + DOCUMENT_CHUNK_SIZE])).scalars())
+
+    return codes
+
+
+def get_product_documents(codes):
+    """{cod_product: document} with one primary-key read; missing or outdated ones are built live."""
+    codes = list(codes)
+    document_table = ProductDocument.__table__
+    documents = {}
+
+    for i in range(0, len(codes), DOCUMENT_CHUNK_SIZE):
+        for cod_product, document in db.session.execute(
+            select(document_table.c.cod_product, document_table.c.document)
+            .where(document_table.c.cod_product.in_(codes[i:i + DOCUMENT_CHUNK_SIZE]))
+        ):
+            document = json.loads(document)
+            if document.get("v") == DOCUMENT_VERSION:
+                documents[cod_product] = document
+
+    missing = [code for code in codes if code not in documents]
+    if missing:
+        documents.update(build_product_documents(db.session.connection(), missing))
+
+    return documents
+
+
+def get_product_document(cod_product):
+    return get_product_documents([cod_product]).get(cod_product)
+
+
+def product_detail(document, with_image_ids=False):
+    """Body of GET /product/<cod_product> (and of /with-id-url-image/ with with_image_ids)."""
+    detail = _product_fields(document)
+    if with_image_ids:
+        detail["images"] = [{"id_image": image["id_image"], "url": image["url"]} for image in document["images"]]
+    else:
+        detail["images"] = [image["url"] for image in document["images"]]
+        detail["image_variants"] = [image.get("variants", {}) for image in document["images"]]
+    detail["compatibilities"] = [
+        {"vehicle_name": compatibility["vehicle_name"]} for compatibility in document["compatibilities"]
+    ]
+
+    return detail
+
+
+def product_summary(document):
+    """A product as serialize_products lists it."""
+    summary = _product_fields(document)
+    summary["images"] = [image["url"] for image in document["images"]]
+    summary["image_variants"] = [image.get("variants", {}) for image in document["images"]]
+    summary["compatibilities"] = document["compatibilities"]
+
+    return summary
+
+
+def product_fieldset(fields=None, include=None):
+    """
+    Keys a list request asked for, from its ?fields= and ?include= (comma separated), or None
+    for the whole summary. fields= lists the keys to return (cod_product always is);
+    include= lists the relations to embed, on top of fields= or, alone, of every plain field.
+    Raises ValueError (with the unknown names as its message) for names it does not know.
+    """
+    fields = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    include = [name.strip() for name in (include or "").split(",") if name.strip()]
+
+    if not fields and not include:
+        return None
+
+    unknown = [name for name in fields if name not in SUMMARY_FIELDS + SUMMARY_RELATIONS]
+    unknown += [name for name in include if name not in SUMMARY_RELATIONS]
+    if unknown:
+        raise ValueError(", ".join(unknown))
+
+    wanted = set(fields or SUMMARY_FIELDS) | set(include) | {"cod_product"}
+
+    return tuple(name for name in SUMMARY_FIELDS + SUMMARY_RELATIONS if name in wanted)
+
+
+def get_product_summaries(codes, fieldset=None):
+    """
+    {cod_product: listed product} restricted to <fieldset> (see product_fieldset). Without
+    compatibilities only the requested product columns (and images, if asked) are selected;
+    compatibilities come from the documents, which already hold them joined.
+    """
+    if fieldset is None or "compatibilities" in fieldset:
+        documents = get_product_documents(codes)
+        summaries = {code: product_summary(document) for code, document in documents.items()}
+
+        return summaries if fieldset is None else {
+            code: _select_keys(summary, fieldset) for code, summary in summaries.items()
+        }
+
+    codes = list(codes)
+    columns = [getattr(Product, name) for name in fieldset if name in SUMMARY_FIELDS and name != "category"]
+    if "cod_product" not in fieldset:
+        columns.insert(0, Product.cod_product)
+
+    summaries = {}
+
+    for i in range(0, len(codes), DOCUMENT_CHUNK_SIZE):
+        chunk = codes[i:i + DOCUMENT_CHUNK_SIZE]
+        stmt = select(*columns)
+
+        if "category" in fieldset:
+            stmt = stmt.add_columns(Category.name_category.label("category")).outerjoin(
+                Category, Category.hash_category == Product.hash_category
+            )
+
+        for row in db.session.execute(stmt.where(Product.cod_product.in_(chunk))):
+            summaries[row.cod_product] = dict(row._mapping)
+
+        if {"images", "image", "image_variants"} & set(fieldset):
+            image_columns = [Images.cod_product, Images.url]
+            if "image_variants" in fieldset:
+                image_columns.append(Images.variants)
+
+            images = {}
+            for row in db.session.execute(
+                select(*image_columns)
+                .where(Images.cod_product.in_(chunk))
+                .order_by(Images.cod_product, Images.id_image)
+            ):
+                images.setdefault(row.cod_product, []).append(row)
+
+            for code in chunk:
+                if code in summaries:
+                    rows = images.get(code, [])
+                    summaries[code]["images"] = [row.url for row in rows]
+                    if "image_variants" in fieldset:
+                        summaries[code]["image_variants"] = [_load_variants(row.variants) for row in rows]
+
+    return {code: _select_keys(summary, fieldset) for code, summary in summaries.items()}
+
+
+def backfill_product_documents(batch_size=DOCUMENT_CHUNK_SIZE):
+    """(Re)builds every product document, batch_size products per transaction."""
+    codes = db.session.execute(select(Product.cod_product).order_by(Product.cod_product)).scalars().all()
+
+    for i in range(0, len(codes), batch_size):
+        refresh_product_documents(db.session.connection(), codes[i:i + batch_size])
+        db.session.commit()
+
+    return len(codes)
+
+
+@click.command("backfill-product-documents")
+@click.option("--batch-size", default=DOCUMENT_CHUNK_SIZE, show_default=True)
+@with_appcontext
+def backfill_product_documents_command(batch_size):
+    """Fills product_document (flask backfill-product-documents)."""
+    written = backfill_product_documents(batch_size)
+    click.echo(f"{written} product documents written")
+
+
+def _select_keys(summary, fieldset):
+    if "image" in fieldset and "image" not in summary:
+        summary["image"] = summary["images"][0] if summary.get("images") else None
+
+    return {name: summary[name] for name in fieldset}
+
+
+def _load_variants(value):
+    # images.variants: NULL (not generated yet) and {} (original unreadable) both mean none
+    return json.loads(value) if value else {}
+
+
+def _product_fields(document):
+    return {
+        "cod_product": document["cod_product"],
+        "name_product": document["name_product"],
+        "description": document["description"],
+        "is_active": document["is_active"],
+        "is_manufactured": document["is_manufactured"],
+        "bar_code": document["bar_code"],
+        "gear_quantity": document["gear_quantity"],
+        "gear_dimensions": document["gear_dimensions"],
+        "cross_reference": document["cross_reference"],
+        "category": document["category"],
+    }
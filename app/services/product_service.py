@@ -1,63 +1,52 @@
 import asyncio
-from itertools import zip_longest
 import json
-import re
-import pandas as pd
-from app.extensions import db
-from app.models import Category, Images, Product, Vehicle, Compatibility, VehicleBrand, SellerBrands, SellerCategories, SellerVehicles
-from sqlalchemy import select
+import logging
+import zlib
+from app.extensions import create_scoped_async_engine, db
+from app.models import Category, Images, Product, Seller, Vehicle, Compatibility, VehicleBrand, SellerBrands, SellerCategories, SellerVehicles
+from sqlalchemy import bindparam, delete, insert, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.dal.encryptor import HashGenerator
-from sqlalchemy.orm import joinedload
+from app.services.catalog_version_service import (
+    DEFERRED_BUMPS, bump_catalog_versions, invalidate_catalog_caches, mark_catalog_changed
+)
+from app.services.fingerprint_service import record_fingerprint, stage_fingerprints
+from app.services.import_normalizer import normalize_sheet
+from app.services.import_planner import build_import_plan
+from app.services.product_document_service import DEFERRED_DOCUMENTS, refresh_product_documents
+from sqlalchemy.orm import sessionmaker
 
 """ --------------------------------- Functions to handle product, category, compatibility and vehicles insertions on the database --------------------------------- """
-# Extract compatibilities from the compat column from Excel and tranform it in an array/list
-
-
-def extract_compat_to_list(compat_str: str) -> list[str]:
-    """
-    Turns strings like:
-      "[ '1974' ; '1973' ; '1984' ]"
-      "'Desconhecido', 'Desconhecido', 'Desconhecido'"
-      "A,B,C"
-      ""
-    into lists of clean values: ["1974","1973","1984"], ["Desconhecido",…], ["A","B","C"], []
-    """
-    # 1) guard clauses
-    if not compat_str or pd.isna(compat_str):
-        return []
-
-    # 2) remove outer brackets, parens, and any quotes
-    cleaned = re.sub(r"^[\[\(\s]*|[\]\)\s]*$", "",
-                     compat_str)  # strip [] or ()
-    cleaned = cleaned.replace("'", "").replace('"', "")
-
-    # 3) split on semicolons OR commas (one or more)
-    parts = re.split(r"[;,]+", cleaned)
-
-    # 4) strip whitespace and drop blank entries
-    return [p.strip() for p in parts if p.strip()]
+# pandas is only needed by the import/export paths, so it is imported on first use instead of
+# at module load (every worker imports this module through the product routes)
 
+log = logging.getLogger(__name__)
 
 # Synchronous wrapper function to handle the batch loop
-def process_excel(file_path, batch_size=100):
+def process_excel(file_path, batch_size=100, workers=1, mode="full"):
     """
     Synchronous wrapper for asynchronous processing function.
     This is what you'll call from your Flask routes.
+    workers > 1 imports the rows in that many concurrent shards (see _process_excel_async).
+    mode: "full" processes every row, "delta" writes only what differs from the database and
+    "dry-run" only returns that change set (see import_planner).
     """
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        return loop.run_until_complete(_process_excel_async(file_path, batch_size))
+        return loop.run_until_complete(_process_excel_async(file_path, batch_size, workers, mode))
     finally:
         loop.close()
 
 
 # Asynchronous processing function to process the product insertion in batches after reading the Excel
-async def _process_excel_async(file_path, batch_size):
+async def _process_excel_async(file_path, batch_size, workers=1, mode="full"):
     try:
         # Read the Excel file
+        import pandas as pd
+
         df = pd.read_excel(file_path)
 
         # Check if all required columns exist
@@ -72,8 +61,7 @@ async def _process_excel_async(file_path, batch_size):
         # ]
 
         # Convert column names to uppercase
-        df.columns = [col.upper() for col in df.columns]
-        print(f"Found columns: {df.columns}")
+        df.columns = [str(col).upper() for col in df.columns]
 
         # Check for missing columns
         missing_columns = [
@@ -82,6 +70,12 @@ async def _process_excel_async(file_path, batch_size):
         if missing_columns:
             return {"error": f"Missing columns: {', '.join(missing_columns)}"}
 
+        # Clean every column up front; the database work only sees typed records
+        records = normalize_sheet(df)
+        compare_compatibilities = "COMPATIBILITY" in df.columns
+        compare_images = "IMAGES" in df.columns
+        del df
+
         # Process the data
         results = {
             "processed": 0,
@@ -97,30 +91,127 @@ async def _process_excel_async(file_path, batch_size):
             "errors": []
         }
 
-        # Process batches for better performance
-        total_rows = len(df)
-        batches = [df[i:i+batch_size]
-                   for i in range(0, total_rows, batch_size)]
-
-        print(batches)
-
         # Store created categories, brands and vehicles across batches
         created_categories = {}
         created_vehicles = {}
         created_brands = {}
 
-        for batch_idx, batch_df in enumerate(batches):
-            print(f"Processing batch {batch_idx+1}/{len(batches)}")
-
-            # Process each batch with a new session
-            await process_batch(
-                batch_df,
-                batch_idx,
-                created_categories,
-                created_vehicles,
-                created_brands,
-                results
-            )
+        # SQLite serializes writers, concurrent shards would only fail with "database is locked"
+        if db.async_uri.startswith("sqlite"):
+            workers = 1
+
+        workers = max(1, min(workers, len(records)))
+
+        # One pool for the whole import, on this event loop: a connection per shard (+1 spare)
+        engine = create_scoped_async_engine(pool_size=workers)
+
+        # Every row commits on its own; the seller catalog versions are bumped and the product
+        # documents rebuilt once per batch (publish_catalog_changes), not by each row's commit
+        changed_sellers, changed_documents = set(), set()
+        session_factory = sessionmaker(
+            engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+            info={DEFERRED_BUMPS: changed_sellers, DEFERRED_DOCUMENTS: changed_documents}
+        )
+
+        async def publish_catalog_changes(final=False):
+            # Runs after each batch, so rows already committed are never left behind an old
+            # catalog_version (and its ETag) if the import dies before the end. Concurrent shards
+            # can deadlock on the document rows: a failed batch publish only logs, and the next
+            # one (or the final one, which raises) takes its changes
+            sellers, documents = set(changed_sellers), set(changed_documents)
+            if not sellers and not documents:
+                return
+
+            changed_sellers.difference_update(sellers)
+            changed_documents.difference_update(documents)
+
+            try:
+                async with engine.begin() as connection:
+                    await connection.run_sync(refresh_product_documents, documents)
+                    await connection.run_sync(bump_catalog_versions, sellers)
+            except Exception:
+                changed_sellers.update(sellers)
+                changed_documents.update(documents)
+
+                if final:
+                    raise
+
+                log.warning("Import catalog changes not published, retried after the next batch", exc_info=True)
+                return
+
+            invalidate_catalog_caches(sellers)
+
+        try:
+            changed = []
+
+            if mode != "full":
+                async with session_factory() as session:
+                    plan = await build_import_plan(session, records, compare_compatibilities, compare_images)
+
+                if mode == "dry-run":
+                    return {"plan": plan.summary()}
+
+                # Delta: new products take the regular path, changed ones are patched in bulk
+                # and unchanged ones are not touched at all
+                results["errors"].extend(plan.errors)
+                results["products_unchanged"] = len(plan.by_status("unchanged"))
+                records = [change.record for change in plan.by_status("new")]
+                changed = plan.by_status("changed")
+
+            if workers > 1 or changed:
+                # Categories, brands, vehicles and seller links are shared between shards:
+                # create them up front so the shards only ever read them
+                async with session_factory() as session:
+                    await resolve_reference_data(
+                        session, records + [change.record for change in changed],
+                        created_categories, created_vehicles, created_brands, results
+                    )
+
+                await publish_catalog_changes()
+
+            if workers == 1:
+                await process_shard(
+                    records, 0, batch_size, session_factory,
+                    created_categories, created_vehicles, created_brands, results,
+                    on_batch_done=publish_catalog_changes
+                )
+            else:
+
+                shards = partition_by_product(records, workers)
+
+                # Every shard runs to the end (closing its sessions) before an error goes up, so
+                # none is still using the engine when it is disposed and the loop closed
+                outcomes = await asyncio.gather(*(
+                    process_shard(
+                        shard, shard_idx, batch_size, session_factory,
+                        created_categories, created_vehicles, created_brands, results,
+                        on_batch_done=publish_catalog_changes
+                    )
+                    for shard_idx, shard in enumerate(shards)
+                ), return_exceptions=True)
+
+                for outcome in outcomes:
+                    if isinstance(outcome, BaseException):
+                        raise outcome
+
+            if changed:
+                await apply_import_plan(
+                    session_factory, changed, batch_size, created_categories, results,
+                    fingerprint=compare_compatibilities and compare_images,
+                    on_batch_done=publish_catalog_changes
+                )
+
+            if mode == "delta" and plan.fingerprints:
+                await save_fingerprints(session_factory, plan.fingerprints, batch_size)
+
+        finally:
+            try:
+                # Whatever a failed batch left unpublished
+                await publish_catalog_changes(final=True)
+            finally:
+                await engine.dispose()
 
         return {
             "stats": results
@@ -133,25 +224,231 @@ async def _process_excel_async(file_path, batch_size):
             "traceback": traceback.format_exc()
         }
 
+
+async def apply_import_plan(session_factory, changes, batch_size, created_categories, results, fingerprint=False,
+                            on_batch_done=None):
+    """
+    Writes the "changed" entries of an import plan, one transaction per batch: a single
+    executemany UPDATE for the product fields, then bulk INSERT/DELETE of the compatibilities
+    and images that were added to or removed from the sheet.
+    Expects the categories/vehicles of the batch to exist already (resolve_reference_data).
+    fingerprint=True (the sheet had every column, so the products now match their rows)
+    stores the rows' content_hash as well. on_batch_done() is awaited after each batch.
+    """
+    product_table = Product.__table__
+
+    for i in range(0, len(changes), batch_size):
+        batch = changes[i:i + batch_size]
+
+        async with session_factory() as session:
+            try:
+                updates = []
+                for change in batch:
+                    if change.fields:
+                        values = change.record.product_fields(created_categories[change.record.category])
+                        values["b_cod_product"] = values.pop("cod_product")
+                        updates.append(values)
+
+                if updates:
+                    await session.execute(
+                        update(product_table).where(product_table.c.cod_product == bindparam("b_cod_product")),
+                        updates
+                    )
+
+                compat_remove = [
+                    (change.record.cod_product, vehicle_name)
+                    for change in batch for vehicle_name in change.compat_remove
+                ]
+                for j in range(0, len(compat_remove), IMAGE_INSERT_CHUNK_SIZE):
+                    await session.execute(
+                        delete(Compatibility).where(
+                            tuple_(Compatibility.cod_product, Compatibility.vehicle_name)
+                            .in_(compat_remove[j:j + IMAGE_INSERT_CHUNK_SIZE])
+                        )
+                    )
+
+                compat_add = [
+                    {"cod_product": change.record.cod_product, "vehicle_name": vehicle_name}
+                    for change in batch for vehicle_name in change.compat_add
+                ]
+                for j in range(0, len(compat_add), IMAGE_INSERT_CHUNK_SIZE):
+                    await session.execute(insert(Compatibility).values(compat_add[j:j + IMAGE_INSERT_CHUNK_SIZE]))
+
+                images_remove = [
+                    (change.record.cod_product, url)
+                    for change in batch for url in change.images_remove
+                ]
+                for j in range(0, len(images_remove), IMAGE_INSERT_CHUNK_SIZE):
+                    await session.execute(
+                        delete(Images).where(
+                            tuple_(Images.cod_product, Images.url).in_(images_remove[j:j + IMAGE_INSERT_CHUNK_SIZE])
+                        )
+                    )
+
+                image_rows = []
+                for change in batch:
+                    image_rows += plan_image_rows(
+                        change.record.cod_product, change.images_add, change.existing_image_ids
+                    )
+                for stmt in image_insert_statements(image_rows):
+                    await session.execute(stmt)
+
+                # Core statements não passam pelos hooks de flush; o vendedor anterior também muda
+                mark_catalog_changed(
+                    session,
+                    id_sellers=[change.previous_seller for change in batch],
+                    cod_products=[change.record.cod_product for change in batch]
+                )
+
+                if fingerprint:
+                    stage_fingerprints(session, {
+                        change.record.cod_product: record_fingerprint(
+                            change.record, created_categories[change.record.category]
+                        )
+                        for change in batch
+                    })
+
+                await session.commit()
+
+            except Exception as e:
+                await session.rollback()
+                results["errors"].append(
+                    f"Error on rows {batch[0].record.line}-{batch[-1].record.line}: {str(e)}"
+                )
+                continue
+
+        if on_batch_done is not None:
+            await on_batch_done()
+
+        results["processed"] += len(batch)
+        results["products_updated"] = results.get("products_updated", 0) + len(updates)
+        results["compatibilities_created"] += len(compat_add)
+        results["compatibilities_removed"] = results.get("compatibilities_removed", 0) + len(compat_remove)
+        results["images_created"] += len(image_rows)
+        results["images_removed"] = results.get("images_removed", 0) + len(images_remove)
+
+
+async def save_fingerprints(session_factory, fingerprints, batch_size):
+    """Stores content_hash of products the import left untouched, batch_size per transaction."""
+    codes = list(fingerprints)
+
+    for i in range(0, len(codes), batch_size):
+        async with session_factory() as session:
+            stage_fingerprints(session, {code: fingerprints[code] for code in codes[i:i + batch_size]})
+            await session.commit()
+
+
+def partition_by_product(records, shards):
+    """
+    Splits the records into <shards> lists by a stable hash of the product code, so every
+    row of a given product lands in the same shard (and keeps its relative order).
+    """
+    partitions = [[] for _ in range(shards)]
+
+    for record in records:
+        partitions[zlib.crc32((record.cod_product or "").encode()) % shards].append(record)
+
+    return partitions
+
+
+# Function to process the batches of one shard, one after the other; on_batch_done() is
+# awaited after each of them
+async def process_shard(records, shard_idx, batch_size, session_factory, created_categories, created_vehicles, created_brands, results, on_batch_done=None):
+    batches = [records[i:i+batch_size]
+               for i in range(0, len(records), batch_size)]
+
+    for batch_idx, batch in enumerate(batches):
+        # Process each batch with a new session
+        await process_batch(
+            batch,
+            batch_idx,
+            created_categories,
+            created_vehicles,
+            created_brands,
+            results,
+            session_factory
+        )
+
+        if on_batch_done is not None:
+            await on_batch_done()
+
+
+async def resolve_reference_data(session, records, created_categories, created_vehicles, created_brands, results):
+    """
+    Creates every category, vehicle brand, vehicle and seller link referenced by the sheet
+    in one transaction and fills the caches, so concurrent shards never race to insert
+    the same shared row. Links of unknown sellers are left for the rows to report.
+    """
+    records = [record for record in records if not record.error]
+    seller_ids = {record.id_seller for record in records}
+
+    known_sellers = set()
+    if seller_ids:
+        result = await session.execute(select(Seller.id).where(Seller.id.in_(seller_ids)))
+        known_sellers = set(result.scalars().all())
+
+    seller_categories, seller_brands, seller_vehicles = set(), set(), set()
+
+    for record in records:
+        id_seller = record.id_seller
+        has_seller = id_seller in known_sellers
+
+        category_hash = await get_or_create_category(session, record.category, created_categories, results)
+
+        if has_seller:
+            seller_categories.add((id_seller, category_hash))
+
+        for name, start, end, vtype, brand in record.vehicles:
+            with session.no_autoflush:
+                hash_brand = await get_or_create_vehicle_brand(session, brand, created_brands, results)
+                vehicle_name = await get_or_create_vehicle(
+                    session, name, start, end, vtype, hash_brand, created_vehicles, results
+                )
+
+            # Existing vehicles are known from now on as well, the shards skip the lookup
+            created_vehicles[vehicle_name] = True
+
+            if has_seller:
+                seller_brands.add((id_seller, hash_brand))
+                seller_vehicles.add((id_seller, vehicle_name))
+
+    with session.no_autoflush:
+        for id_seller, hash_category in seller_categories:
+            await get_or_create_seller_category(session, id_seller, hash_category, results)
+
+        for id_seller, hash_brand in seller_brands:
+            await get_or_create_seller_brand(session, id_seller, hash_brand, results)
+
+        for id_seller, vehicle_name in seller_vehicles:
+            await get_or_create_seller_vehicles(session, id_seller, vehicle_name, results)
+
+    await session.commit()
+
+
 # Function to start the process of batches to insert into the database
 
 
-async def process_batch(batch_df, batch_idx, created_categories, created_vehicles, created_brands, results):
+async def process_batch(batch, batch_idx, created_categories, created_vehicles, created_brands, results, session_factory=None):
     """
-    Processa cada linha em batch_df, abrindo um AsyncSession por linha.
+    Processa cada registro (ImportRecord) de batch, abrindo um AsyncSession por linha.
     Se process_row não lançar exceção, dá commit; senão, dá rollback e registra erro.
     """
+    session_factory = session_factory or db.async_session
+
+    # Para cada linha da planilha, criamos uma sessão independente
+    for record in batch:
+        # Linhas que já falharam na normalização nem chegam ao banco
+        if record.error:
+            results["errors"].append(f"Error on row {record.line}: {record.error}")
+            continue
 
-    # Para cada linha do DataFrame, criamos uma sessão independente
-    for index, row in batch_df.iterrows():
         try:
             # 1) Abre um session novo para esta linha
-            async with db.async_session() as session:
+            async with session_factory() as session:
                 try:
                     # 2) Processa a linha (essa função NÃO comita nem dá rollback)
                     await process_row(
-                        index,
-                        row,
+                        record,
                         session,
                         created_categories,
                         created_vehicles,
@@ -170,72 +467,36 @@ async def process_batch(batch_df, batch_idx, created_categories, created_vehicle
 
         except Exception as e:
             # Aqui está fora do "async with session", ou seja, já rollbackado e session fechado
-            results["errors"].append(f"Error on row {index + 2}: {str(e)}")
+            results["errors"].append(f"Error on row {record.line}: {str(e)}")
             # Continua para a próxima linha, sem interromper todo o batch
             continue
 
 
 # Function to check the existence of the data and then register each row on the database
-async def process_row(index, row, session, created_categories, created_vehicles, created_brands, results):
-    """Process a single row from the Excel file"""
+async def process_row(record, session, created_categories, created_vehicles, created_brands, results):
+    """Process a single (normalized) row from the Excel file"""
     try:
-        id_seller = row.get("ID_SELLER", "")
+        id_seller = record.id_seller
 
         # Get category
-        category_name = row.get("CATEGORY", "")
         category_hash = await get_or_create_category(
             session,
-            category_name,
+            record.category,
             created_categories,
             results
         )
 
         await get_or_create_seller_category(session, id_seller, category_hash, results)
 
-        cod_product = await get_or_create_product(session, row, category_hash, results)
-
-        images = row.get("IMAGES", "")
-        if images:
-            image_list = images.split("|")
+        cod_product, created = await get_or_create_product(session, record, category_hash, results)
 
-            await create_image(session, cod_product, image_list, results)
+        if record.images:
+            await create_image(session, cod_product, record.images, results)
 
             await session.commit()
 
-        # Extract vehicle compatibility info
-        vehicles_names_string = row.get("COMPATIBILITY", "")
-        start_year_string = row.get("START_YEAR", "")
-        end_year_string = row.get("END_YEAR", "")
-        vehicle_type_string = row.get("TYPE_VEHICLE", "")
-        vehicle_brands_string = row.get("VEHICLE_BRAND", "")
-
-        # Extract the values from the strings to lists
-
-        names = extract_compat_to_list(vehicles_names_string)
-        starts = extract_compat_to_list(start_year_string)
-        ends = extract_compat_to_list(end_year_string)
-        types = extract_compat_to_list(vehicle_type_string)
-        brands = extract_compat_to_list(vehicle_brands_string)
-
-        # Process vehicle compatibilities with zip_longest to grant same lengths, nulling if not equal
-        for name, start, end, vtype, brand in zip_longest(
-            names, starts, ends, types, brands, fillvalue=None
-        ):
-
-            # normalize & skip empties
-            if not (name and brand):
-                continue
-            name = name.strip()
-            brand = brand.strip()
-
-            # normalize unknown years
-            def norm_year(y):
-                if not y or y.lower().startswith("desconhecido"):
-                    return None
-                return y.strip()
-
-            start = norm_year(start)
-            end = norm_year(end)
+        # Process vehicle compatibilities
+        for name, start, end, vtype, brand in record.vehicles:
 
             # wrap in no_autoflush to avoid the Query-invoked autoflush error
             with session.no_autoflush:
@@ -250,7 +511,7 @@ async def process_row(index, row, session, created_categories, created_vehicles,
                     name,
                     start,
                     end,
-                    vtype.strip() if vtype else None,
+                    vtype,
                     hash_brand,
                     created_vehicles,
                     results
@@ -263,8 +524,12 @@ async def process_row(index, row, session, created_categories, created_vehicles,
                 session, cod_product, name, results
             )
 
+        # A product created from this row holds exactly the row's content
+        if created:
+            stage_fingerprints(session, {cod_product: record_fingerprint(record, category_hash)})
+
     except Exception as e:
-        results["errors"].append(f"Error on row {index + 2}: {str(e)}")
+        results["errors"].append(f"Error on row {record.line}: {str(e)}")
 
 
 async def get_or_create_vehicle_brand(session, brand_name, created_brands, results):
@@ -297,66 +562,17 @@ async def get_or_create_vehicle_brand(session, brand_name, created_brands, resul
     return brand_hash
 
 
-async def get_or_create_product(session, row, category_hash, results) -> str:
+async def get_or_create_product(session, record, category_hash, results) -> tuple[str, bool]:
     """
-    Verifica se já existe um Product.cod_product no banco. Se não existir,
-    faz todos os checks de validação (nome, código de barras, quantidades, etc.),
-    cria um novo Product, faz flush para garantir o INSERT antes de retornarmos,
-    e incrementa o contador em results. Retorna sempre cod_product como string.
+    Verifica se já existe um Product.cod_product no banco. Se não existir, cria um novo
+    Product a partir do registro já normalizado (ver import_normalizer.normalize_sheet),
+    faz flush para garantir o INSERT antes de retornarmos, e incrementa o contador em
+    results. Retorna (cod_product, True se o produto foi criado agora).
     """
-
-    # Extrair e validar campos do row
-    name_product = row["NAME_PRODUCT"]
-    name_check = name_product.split("-")[0].strip()
-    is_manufactured = True
-
-    # Se o prefixo for "ITEM DESCONTINUADO", ajustamos o nome e marcamos como não fabricado
-    if name_check == "ITEM DESCONTINUADO":
-        # Ex.: "ITEM DESCONTINUADO - Produto X"
-        name_product = name_product.split("-", 1)[1].strip()
-        is_manufactured = False
-
-    # Validar bar_code: se for NaN, deixa None; senão, tenta converter para int
-    bar_code = row["BAR_CODE"]
-    if pd.isna(bar_code):
-        bar_code = None
-    else:
-        try:
-            bar_code = int(bar_code)
-        except (ValueError, TypeError):
-            bar_code = None
-
-    # Validar gear_quantity: se for NaN, deixa None; senão, tenta converter para int
-    gear_quantity = row["GEAR_QUANTITY"]
-    if pd.isna(gear_quantity):
-        gear_quantity = None
-    else:
-        try:
-            gear_quantity = int(gear_quantity)
-        except (ValueError, TypeError):
-            gear_quantity = None
-
-    # Outros campos simples (se vierem NaN, colocamos None)
-    gear_dimensions = None if pd.isna(
-        row.get("GEAR_DIMENSIONS", None)) else row.get("GEAR_DIMENSIONS")
-    cross_reference = None if pd.isna(
-        row.get("CROSS_REF", None)) else row.get("CROSS_REF")
-    cod_product = str(row["COD_PRODUCT"]).strip()
-    id_seller = row["ID_SELLER"]
+    cod_product = record.cod_product
 
     # Montar o dicionário que será passado ao construtor de Product
-    product_dict = {
-        "cod_product": cod_product,
-        "name_product": name_product,
-        "description": row.get("DESCRIPTION", "").strip(),
-        "is_manufactured": is_manufactured,
-        "bar_code": bar_code,
-        "gear_quantity": gear_quantity,
-        "gear_dimensions": gear_dimensions,
-        "cross_reference": cross_reference,
-        "hash_category": category_hash,
-        "id_seller": id_seller,
-    }
+    product_dict = record.product_fields(category_hash)
 
     # Verificar se o produto já existe no banco
     stmt = select(Product).where(Product.cod_product == cod_product)
@@ -383,7 +599,7 @@ async def get_or_create_product(session, row, category_hash, results) -> str:
             raise
 
     # Ao chegar aqui, ou o produto já existia, ou acabamos de criá-lo e dar flush.
-    return cod_product
+    return cod_product, existing_product is None
 
 
 async def get_or_create_category(session, raw_name, created_categories, results):
@@ -583,6 +799,52 @@ async def get_or_create_seller_vehicles(session, id_seller, vehicle_name, result
         return
 
 
+# Rows per multi-row INSERT into images (keeps statements well under max_allowed_packet)
+IMAGE_INSERT_CHUNK_SIZE = 500
+
+
+def existing_image_ids_stmt(cod_product: str):
+    """SELECT of every id_image already numbered for <cod_product> (served by ix_images_id_image)."""
+    return select(Images.id_image).where(Images.id_image.like(f"{cod_product}%"))
+
+
+def plan_image_rows(cod_product: str, urls: list[str], existing_ids) -> list[dict]:
+    """
+    Numera as novas imagens de <cod_product> como "<cod_product>-<número>", continuando do
+    maior sufixo já existente (id_image == cod_product puro conta como sufixo 0) e pulando
+    qualquer id que já esteja em existing_ids. Não toca no banco.
+    """
+    existing_ids = set(existing_ids)
+
+    max_suffix = 0
+    for full_id_image in existing_ids:
+        # se vier algo do tipo "2110655-17", fazemos rsplit:
+        parts = full_id_image.rsplit("-", 1)
+        if len(parts) == 2 and parts[0] == cod_product and parts[1].isdigit():
+            max_suffix = max(max_suffix, int(parts[1]))
+
+    rows = []
+    next_suffix = max_suffix + 1
+
+    for url in urls:
+        new_id = f"{cod_product}-{next_suffix}"
+
+        while new_id in existing_ids:
+            next_suffix += 1
+            new_id = f"{cod_product}-{next_suffix}"
+
+        rows.append({"cod_product": cod_product, "id_image": new_id, "url": url.strip()})
+        next_suffix += 1
+
+    return rows
+
+
+def image_insert_statements(rows: list[dict]):
+    """Multi-row INSERTs for the given image rows, IMAGE_INSERT_CHUNK_SIZE rows per statement."""
+    for i in range(0, len(rows), IMAGE_INSERT_CHUNK_SIZE):
+        yield insert(Images).values(rows[i:i + IMAGE_INSERT_CHUNK_SIZE])
+
+
 async def create_image(
     session,
     cod_product: str,
@@ -590,106 +852,135 @@ async def create_image(
     results: dict
 ):
     """
-    Insere novas imagens para <cod_product>, numerando id_image como "<cod_product>-<número>".
-    Antes de cada SELECT, faz flush para que não exista inconsisência entre pendências e BD real.
-    Além disso, se encontrar exatamente id_image == cod_product (sem suffix), trata como sufixo 0.
-    E, para cada novo new_id gerado, verifica explicitamente se ele já existe no banco. 
-    Se existir, pula para o próximo.
+    Insere novas imagens para <cod_product> com um único SELECT dos ids existentes e um
+    INSERT multi-linha (ver plan_image_rows para a numeração).
+    Não commita: quem chamou deve chamar `await session.commit()` após processar a linha inteira.
     """
 
-    # 1) Flush de quaisquer INSERTs/UPDATEs pendentes na sessão
+    # 1) Flush de quaisquer INSERTs pendentes (o Product desta linha precisa existir para a FK)
     await session.flush()
 
-    # 2) Busca todos os id_image que já existem no banco para este produto:
-    stmt = select(Images.id_image).where(
-        Images.id_image.like(f"{cod_product}%"))
-    result = await session.execute(stmt)
-    raw_existing = result.scalars().all()
-    # Exemplo de raw_existing: ["2110655", "2110655-1", "2110655-2", ...]
-
-    # 3) Determinar qual é o maior sufixo numérico. Se existir uma entrada igual a cod_product puro,
-    #    vamos tratá-la como "sucesso zero" (ou seja, consideramos max_suffix >= 0).
-    max_suffix = -1
-    for full_id_image in raw_existing:
-        if full_id_image == cod_product:
-            # existe id_image exatamente igual ao cod_product
-            max_suffix = max(max_suffix, 0)
-            continue
+    # 2) Busca, de uma vez, todos os id_image que já existem para este produto
+    result = await session.execute(existing_image_ids_stmt(cod_product))
+    rows = plan_image_rows(cod_product, urls, result.scalars().all())
 
-        # se vier algo do tipo "2110655-17", fazemos rsplit:
-        parts = full_id_image.rsplit("-", 1)
-        if len(parts) == 2 and parts[0] == cod_product and parts[1].isdigit():
-            num = int(parts[1])
-            if num > max_suffix:
-                max_suffix = num
-
-    # Se não havia NADA (nem cod_product puro nem "<cod_product>-n"), max_suffix = -1
-    # Logo, next_suffix = 0? Não, queremos iniciar em 1 mesmo que não tivesse imagem,
-    # porque nosso primeiro id_image deverá ser "<cod_product>-1".
-    # Mas se max_suffix == 0 (significa que existia um registro "cod_product" sem suffix),
-    # então next_suffix = 1 gera "<cod_product>-1" sem colisão. Se max_suffix == 2,
-    # next_suffix = 3, etc.
-    next_suffix = max_suffix + 1
-    if next_suffix < 1:
-        next_suffix = 1
+    if not rows:
+        return
 
-    # 4) Agora percorremos cada URL e tentamos inserir
-    for url in urls:
-        treated_url = url.strip()
+    for stmt in image_insert_statements(rows):
+        await session.execute(stmt)
 
-        # Recalcular new_id com o next_suffix corrente
-        new_id = f"{cod_product}-{next_suffix}"
+    # Core INSERTs não passam pelos hooks de flush
+    mark_catalog_changed(session, cod_products=[cod_product])
 
-        # 4.1) Verificar se já existe um registro com esse mesmo new_id
-        stmt2 = select(Images).where(Images.id_image == new_id)
-        r2 = await session.execute(stmt2)
-        if r2.scalars().first():
-            # Se id_image == new_id já existe, pulamos diretamente para o próximo sufixo
-            next_suffix += 1
-            # (não incrementamos imagens_created, pois nada foi inserido)
-            continue
+    results["images_created"] = results.get("images_created", 0) + len(rows)
 
-        # 4.2) Caso não exista, criamos e adicionamos
-        image = Images(cod_product=cod_product,
-                       id_image=new_id, url=treated_url)
-        session.add(image)
-        results["images_created"] = results.get("images_created", 0) + 1
 
-        # 4.3) Incrementa pour o próximo new_id
-        next_suffix += 1
+# Products loaded (and serialized) per round trip by the catalog exports
+EXPORT_CHUNK_SIZE = 500
+
 
-    # Atenção: não commitamos aqui. Quem chamou create_image deve chamar `await session.commit()`
-    # após processar a linha inteira. Se ocorrer qualquer erro mais adiante, basta fazer rollback.
+def get_seller_product_codes(id_seller: str) -> list[str]:
+    """Every cod_product of the seller, in order (index-only on ix_product_id_seller_*)."""
+    return db.session.execute(
+        select(Product.cod_product)
+        .where(Product.id_seller == id_seller)
+        .order_by(Product.cod_product)
+    ).scalars().all()
 
-   
-def get_all_product_data(id_seller: str):
+
+def iter_product_data(id_seller: str, chunk_size=EXPORT_CHUNK_SIZE, codes=None):
     """
-    Return list[Product] for given seller id, eager-loading relationships used by serializer
-    Adjust the filter if you store seller as a relationship (see notes below).
+    Yields the seller's products as the dicts serialize_products builds, chunk_size products
+    at a time. Each chunk costs three plain SELECTs (products + category name, images,
+    compatibilities + vehicle + brand) read as rows, with no ORM objects and no
+    products x images x compatibilities join, so memory stays flat however large the catalog.
+    Pass codes (get_seller_product_codes) when the caller needs the count up front.
     """
-    results = Product.query.options(
-        joinedload(Product.category),
-        joinedload(Product.images),
-        # joinedload compatibilities -> vehicle -> vehicle_brand
-        joinedload(Product.compatibilities)
-            .joinedload(Compatibility.vehicle)
-            .joinedload(Vehicle.vehicle_brand)
-    ).filter_by(id_seller=id_seller).all()   # <-- change 'seller_id' if your column is different
+    if codes is None:
+        codes = get_seller_product_codes(id_seller)
 
-    return results
+    for i in range(0, len(codes), chunk_size):
+        chunk = codes[i:i + chunk_size]
 
+        images = {}
+        for cod_product, url in db.session.execute(
+            select(Images.cod_product, Images.url).where(Images.cod_product.in_(chunk))
+        ):
+            images.setdefault(cod_product, []).append(url)
 
-def transform_rows(serialized_products):
-    rows = []
-    for p in serialized_products:
-        row = {k: v for k, v in p.items() if k not in (
-            "images", "compatibilities")}
-        # store lists as JSON strings so they appear in a single cell; adjust if you prefer other formatting
-        row["images"] = json.dumps(p.get("images", []), ensure_ascii=False)
-        row["compatibilities"] = json.dumps(
-            p.get("compatibilities", []), ensure_ascii=False)
-        rows.append(row)
-        
-    df = pd.DataFrame(rows)
+        compatibilities = {}
+        for row in db.session.execute(
+            select(
+                Compatibility.cod_product, Compatibility.vehicle_name, Vehicle.vehicle_type,
+                Vehicle.start_year, Vehicle.end_year, VehicleBrand.brand_name
+            )
+            .outerjoin(Vehicle, Vehicle.vehicle_name == Compatibility.vehicle_name)
+            .outerjoin(VehicleBrand, VehicleBrand.hash_brand == Vehicle.hash_brand)
+            .where(Compatibility.cod_product.in_(chunk))
+        ):
+            compatibilities.setdefault(row.cod_product, []).append({
+                "vehicle_name": row.vehicle_name,
+                "vehicle_type": row.vehicle_type,
+                "start_year": row.start_year,
+                "end_year": row.end_year,
+                "brand": row.brand_name
+            })
+
+        for row in db.session.execute(
+            select(
+                Product.cod_product, Product.name_product, Product.description, Product.is_active,
+                Product.is_manufactured, Product.bar_code, Product.gear_quantity, Product.gear_dimensions,
+                Product.cross_reference, Category.name_category
+            )
+            .outerjoin(Category, Category.hash_category == Product.hash_category)
+            .where(Product.cod_product.in_(chunk))
+            .order_by(Product.cod_product)
+        ):
+            yield {
+                "cod_product": row.cod_product,
+                "name_product": row.name_product,
+                "description": row.description,
+                "is_active": row.is_active,
+                "is_manufactured": row.is_manufactured,
+                "bar_code": row.bar_code,
+                "gear_quantity": row.gear_quantity,
+                "gear_dimensions": row.gear_dimensions,
+                "cross_reference": row.cross_reference,
+                "category": row.name_category,
+                "images": images.get(row.cod_product, []),
+                "compatibilities": compatibilities.get(row.cod_product, [])
+            }
+
+
+def transform_row(product: dict) -> dict:
+    """Serialized product -> spreadsheet row, with compatibilities/images as JSON strings."""
+    row = {k: v for k, v in product.items() if k not in ("images", "compatibilities")}
+    # store lists as JSON strings so they appear in a single cell; adjust if you prefer other formatting
+    row["images"] = json.dumps(product.get("images", []), ensure_ascii=False)
+    row["compatibilities"] = json.dumps(product.get("compatibilities", []), ensure_ascii=False)
+
+    return row
+
+
+def write_products_xlsx(products, fileobj):
+    """
+    Writes serialized products to <fileobj> as a single "products" sheet, row by row:
+    openpyxl's write-only mode keeps no cell objects in memory.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("products")
+
+    header = None
+    for product in products:
+        row = transform_row(product)
+
+        if header is None:
+            header = list(row)
+            sheet.append(header)
+
+        sheet.append([row[column] for column in header])
 
-    return df
\ No newline at end of file
+    workbook.save(fileobj)
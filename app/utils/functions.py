@@ -3,6 +3,7 @@ import asyncio
 from flask import json
 from app.models import Images
 from app.extensions import db
+from app.services.product_document_service import get_product_summaries
 
 def is_image_file(filename):
     valid_extensions = ('.png', '.jpg', '.jpeg', '.webp')
@@ -32,54 +33,15 @@ def extract_existing_product_codes():
 """ ----------------------------- Function to handle json from the database ------------------------------ """
 
 
-def serialize_products(products):
-    result = []
-
-    for product in products:
-        # Get related category name if available
-        category_name = product.category.name_category if product.category else None
-
-        # Get list of image URLs
-        image_urls = [image.url for image in product.images]
-
-        # Get list of vehicles this product is compatible with
-        compatibility = []
-        for comp in product.compatibilities:
-            vehicle = comp.vehicle
-
-            # Get vehicle brand using the existing relationship
-            brand_name = None
-            if vehicle:
-                # Use the relationship established by the ORM
-                vehicle_brand = vehicle.vehicle_brand if hasattr(
-                    vehicle, 'vehicle_brand') else None
-                brand_name = vehicle_brand.brand_name if vehicle_brand else None
-
-            vehicle_data = {
-                "vehicle_name": comp.vehicle_name,
-                "vehicle_type": vehicle.vehicle_type if vehicle else None,
-                "start_year": vehicle.start_year if vehicle else None,
-                "end_year": vehicle.end_year if vehicle else None,
-                "brand": brand_name
-            }
-            compatibility.append(vehicle_data)
-
-        result.append({
-            "cod_product": product.cod_product,
-            "name_product": product.name_product,
-            "description": product.description,
-            "is_active": product.is_active,
-            "is_manufactured": product.is_manufactured,
-            "bar_code": product.bar_code,
-            "gear_quantity": product.gear_quantity,
-            "gear_dimensions": product.gear_dimensions,
-            "cross_reference": product.cross_reference,
-            "category": category_name,
-            "images": image_urls,
-            "compatibilities": compatibility
-        })
+def serialize_products(products, fieldset=None):
+    """
+    Products as the list endpoints return them, read from product_document in one query, or
+    only the keys of <fieldset> (see product_fieldset). Only cod_product of <products> is read.
+    """
+    codes = [product.cod_product for product in products]
+    summaries = get_product_summaries(codes, fieldset)
 
-    return result
+    return [summaries[code] for code in codes if code in summaries]
 
 
 def serialize_vehicle(vehicles):
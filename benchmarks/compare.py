@@ -0,0 +1,56 @@
+"""
+Compares two benchmark reports written by benchmarks.run.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Prints the median wall time and query count of each scenario side by side and flags
+changes beyond the threshold (percent). Exits with status 1 when a scenario got slower
+than the threshold or issues more queries, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    regressions = 0
+
+    print(f"{'scenario':32} {'before ms':>10} {'after ms':>10} {'change':>8} {'queries':>10}")
+
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+
+        if not old or "wall_ms" not in old or "wall_ms" not in new:
+            print(f"{name:32} {'-':>10} {'-':>10} {'n/a':>8}")
+            continue
+
+        old_ms, new_ms = old["wall_ms"]["median"], new["wall_ms"]["median"]
+        change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+        queries = f"{old.get('queries', '-')}->{new.get('queries', '-')}"
+
+        flag = ""
+        if change > args.threshold or (new.get("queries") or 0) > (old.get("queries") or 0):
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  faster"
+
+        print(f"{name:32} {old_ms:10.2f} {new_ms:10.2f} {change:+7.1f}% {queries:>10}{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
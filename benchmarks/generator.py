@@ -0,0 +1,202 @@
+"""
+Deterministic synthetic catalog.
+
+The same (scale, seed) pair always yields the same rows, so timings taken on two
+commits are comparable. Rows are plain dicts shaped like the tables in app.models,
+loaded with executemany inserts; `import_rows` yields rows shaped like the Excel
+sheet consumed by process_excel.
+"""
+import random
+from sqlalchemy import insert
+from app.models import (
+    Category, Compatibility, Images, Label, CustomShowcase, Product, Seller,
+    SellerBrands, SellerCategories, SellerVehicles, Vehicle, VehicleBrand
+)
+from app.services.product_document_service import refresh_product_documents
+
+
+SCALES = {
+    "small": {"sellers": 2, "categories": 20, "brands": 10, "vehicles": 200, "products": 1000},
+    "medium": {"sellers": 5, "categories": 80, "brands": 30, "vehicles": 1500, "products": 20000},
+    "large": {"sellers": 10, "categories": 200, "brands": 60, "vehicles": 6000, "products": 200000},
+}
+
+VEHICLE_TYPES = ("LEVE", "PESADO", "MOTO")
+WORDS = (
+    "ENGRENAGEM", "EIXO", "PINHAO", "COROA", "ROLAMENTO", "RETENTOR", "BUCHA",
+    "SINCRONIZADOR", "GARFO", "LUVA", "ANEL", "CAMBIO", "DIFERENCIAL", "TRANSMISSAO",
+)
+
+
+class CatalogSpec:
+    def __init__(self, sellers, categories, brands, vehicles, products,
+                 max_images=3, max_compat=6, labels_per_seller=3, showcase_size=12, seed=42):
+        self.sellers = sellers
+        self.categories = categories
+        self.brands = brands
+        self.vehicles = vehicles
+        self.products = products
+        self.max_images = max_images
+        self.max_compat = max_compat
+        self.labels_per_seller = labels_per_seller
+        self.showcase_size = showcase_size
+        self.seed = seed
+
+    @classmethod
+    def from_scale(cls, scale, **overrides):
+        params = dict(SCALES[scale])
+        params.update({k: v for k, v in overrides.items() if v is not None})
+
+        return cls(**params)
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def generate_catalog(spec):
+    """Returns {model: [row, ...]} in insertion (FK) order."""
+    rng = random.Random(spec.seed)
+
+    sellers = [
+        {"id": i, "name": f"SELLER {i}", "cnpj": f"{i:014d}", "seller_domain": f"seller{i}"}
+        for i in range(1, spec.sellers + 1)
+    ]
+    categories = [
+        {"hash_category": f"cat{i:05d}", "name_category": f"{rng.choice(WORDS)} {i}", "display_order": i}
+        for i in range(spec.categories)
+    ]
+    brands = [
+        {"hash_brand": f"brand{i:04d}", "brand_name": f"MARCA{i}", "display_order": i}
+        for i in range(spec.brands)
+    ]
+    vehicles = [
+        {
+            "vehicle_name": f"VEICULO{i:05d}",
+            "start_year": str(rng.randint(1970, 2015)),
+            "end_year": None if rng.random() < 0.3 else str(rng.randint(2016, 2025)),
+            "vehicle_type": rng.choice(VEHICLE_TYPES),
+            "hash_brand": rng.choice(brands)["hash_brand"],
+        }
+        for i in range(spec.vehicles)
+    ]
+    brand_of_vehicle = {vehicle["vehicle_name"]: vehicle["hash_brand"] for vehicle in vehicles}
+
+    products, images, compatibilities = [], [], []
+    seller_categories, seller_vehicles, seller_brands = set(), set(), set()
+
+    for i in range(spec.products):
+        cod_product = f"MB{i:07d}"
+        id_seller = sellers[i % spec.sellers]["id"]
+        hash_category = rng.choice(categories)["hash_category"]
+
+        products.append({
+            "cod_product": cod_product,
+            "name_product": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            "description": f"Produto sintetico {i}",
+            "is_active": True,
+            "is_manufactured": rng.random() < 0.85,
+            "bar_code": 7890000000000 + i,
+            "gear_quantity": rng.randint(1, 60),
+            "gear_dimensions": f"{rng.randint(10, 90)}x{rng.randint(10, 90)}",
+            "oem": f"OEM{rng.randint(1000, 9999)}",
+            "cross_reference": f"CR{i:07d}",
+            "hash_category": hash_category,
+            "id_seller": id_seller,
+        })
+        seller_categories.add((id_seller, hash_category))
+
+        for n in range(1, rng.randint(1, spec.max_images) + 1):
+            images.append({
+                "cod_product": cod_product,
+                "id_image": f"{cod_product}-{n}",
+                "url": f"https://cdn.example.com/{cod_product}-{n}.webp",
+            })
+
+        for vehicle in rng.sample(vehicles, rng.randint(1, min(spec.max_compat, len(vehicles)))):
+            compatibilities.append({"cod_product": cod_product, "vehicle_name": vehicle["vehicle_name"]})
+            seller_vehicles.add((id_seller, vehicle["vehicle_name"]))
+            seller_brands.add((id_seller, brand_of_vehicle[vehicle["vehicle_name"]]))
+
+    labels, showcase = [], []
+    for seller in sellers:
+        seller_products = [p["cod_product"] for p in products if p["id_seller"] == seller["id"]]
+
+        for n in range(spec.labels_per_seller):
+            name = f"VITRINE {seller['id']}-{n}"
+            labels.append({"name": name, "id_seller": seller["id"]})
+
+            picked = rng.sample(seller_products, min(spec.showcase_size, len(seller_products)))
+            showcase += [
+                {"cod_product": cod_product, "order": order, "name": name}
+                for order, cod_product in enumerate(picked)
+            ]
+
+    return {
+        Seller: sellers,
+        Category: categories,
+        VehicleBrand: brands,
+        Vehicle: vehicles,
+        Product: products,
+        Images: images,
+        Compatibility: compatibilities,
+        SellerCategories: [{"id_seller": s, "hash_category": h} for s, h in sorted(seller_categories)],
+        SellerVehicles: [{"id_seller": s, "vehicle_name": v} for s, v in sorted(seller_vehicles)],
+        SellerBrands: [{"id_seller": s, "hash_brand": b} for s, b in sorted(seller_brands)],
+        Label: labels,
+        CustomShowcase: showcase,
+    }
+
+
+def load_catalog(connection, catalog, chunk_size=5000):
+    """
+    Bulk-inserts the generated rows with Core executemany, bypassing the ORM, then builds the
+    product documents a backfilled database would have.
+    """
+    counts = {}
+
+    for model, rows in catalog.items():
+        for i in range(0, len(rows), chunk_size):
+            connection.execute(insert(model), rows[i:i + chunk_size])
+
+        counts[model.__tablename__] = len(rows)
+
+    refresh_product_documents(connection, [row["cod_product"] for row in catalog[Product]])
+
+    return counts
+
+
+def import_rows(catalog, count, prefix, seed=42):
+    """
+    Rows in the Excel layout read by process_excel, reusing existing categories,
+    brands and vehicles so the importer exercises both the lookup and the insert paths.
+    """
+    rng = random.Random(seed)
+    categories = catalog[Category]
+    vehicles = catalog[Vehicle]
+    brand_names = {brand["hash_brand"]: brand["brand_name"] for brand in catalog[VehicleBrand]}
+    id_seller = catalog[Seller][0]["id"]
+
+    rows = []
+    for i in range(count):
+        cod_product = f"{prefix}{i:06d}"
+        compat = rng.sample(vehicles, min(3, len(vehicles)))
+
+        rows.append({
+            "COD_PRODUCT": cod_product,
+            "NAME_PRODUCT": f"{rng.choice(WORDS)} IMPORTADO {i}",
+            "DESCRIPTION": f"Importado {i}",
+            "CATEGORY": rng.choice(categories)["name_category"],
+            "ID_SELLER": id_seller,
+            "BAR_CODE": 7891000000000 + i,
+            "GEAR_QUANTITY": rng.randint(1, 60),
+            "GEAR_DIMENSIONS": f"{rng.randint(10, 90)}x{rng.randint(10, 90)}",
+            "CROSS_REF": f"ICR{i:06d}",
+            "IMAGES": "|".join(f"https://cdn.example.com/{cod_product}-{n}.webp" for n in range(1, 3)),
+            "COMPATIBILITY": ";".join(v["vehicle_name"] for v in compat),
+            "VEHICLE_BRAND": ";".join(brand_names[v["hash_brand"]] for v in compat),
+            "TYPE_VEHICLE": ";".join(v["vehicle_type"] for v in compat),
+            "START_YEAR": ";".join(v["start_year"] or "Desconhecido" for v in compat),
+            "END_YEAR": ";".join(v["end_year"] or "Desconhecido" for v in compat),
+        })
+
+    return rows
@@ -0,0 +1,161 @@
+"""
+Query plans of the hot catalog filters, before and after the secondary indexes.
+
+Builds the schema from app.models on a throwaway SQLite database, fills it with
+synthetic rows, then prints EXPLAIN QUERY PLAN and the average query time for every
+access path twice: with the model-level indexes dropped and with them created.
+
+    python -m benchmarks.query_plans --products 50000 --repeat 200
+"""
+import argparse
+import random
+import time
+from sqlalchemy import create_engine, insert, text
+from app.extensions import db
+from app.models import (
+    Category, Compatibility, Images, Label, Product, Seller, Vehicle, VehicleBrand
+)
+
+
+HOT_QUERIES = (
+    ("product by seller",
+     "SELECT cod_product FROM product WHERE id_seller = :id_seller",
+     {"id_seller": 3}),
+    ("product by seller + category",
+     "SELECT cod_product FROM product WHERE id_seller = :id_seller AND hash_category = :hash_category",
+     {"id_seller": 3, "hash_category": "cat-7"}),
+    ("product by seller + manufactured",
+     "SELECT cod_product FROM product WHERE id_seller = :id_seller AND is_manufactured = :flag",
+     {"id_seller": 3, "flag": 1}),
+    ("compatibility by vehicle",
+     "SELECT cod_product FROM compatibility WHERE vehicle_name = :vehicle_name",
+     {"vehicle_name": "VEHICLE42"}),
+    ("vehicle by brand",
+     "SELECT vehicle_name FROM vehicle WHERE hash_brand = :hash_brand",
+     {"hash_brand": "brand-5"}),
+    ("images by product",
+     "SELECT id_image, url FROM images WHERE cod_product = :cod_product",
+     {"cod_product": "P000123"}),
+    ("image by id",
+     "SELECT url FROM images WHERE id_image = :id_image",
+     {"id_image": "P000123-1"}),
+    ("vehicle brand by name",
+     "SELECT hash_brand FROM vehicle_brand WHERE brand_name = :brand_name",
+     {"brand_name": "BRAND5"}),
+    ("category by name",
+     "SELECT hash_category FROM category WHERE name_category = :name_category",
+     {"name_category": "CATEGORY7"}),
+    ("labels by seller",
+     "SELECT name FROM label WHERE id_seller = :id_seller",
+     {"id_seller": 3}),
+)
+
+
+def model_indexes():
+    return [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+
+def seed(engine, products, sellers, seed_value):
+    rng = random.Random(seed_value)
+    categories = max(products // 500, 10)
+    brands = 40
+    vehicles = max(products // 50, 100)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Seller), [
+            {"id": i, "name": f"SELLER{i}", "cnpj": f"{i:014d}", "seller_domain": f"s{i}"}
+            for i in range(1, sellers + 1)
+        ])
+        conn.execute(insert(Category), [
+            {"hash_category": f"cat-{i}", "name_category": f"CATEGORY{i}"} for i in range(categories)
+        ])
+        conn.execute(insert(VehicleBrand), [
+            {"hash_brand": f"brand-{i}", "brand_name": f"BRAND{i}"} for i in range(brands)
+        ])
+        conn.execute(insert(Vehicle), [
+            {"vehicle_name": f"VEHICLE{i}", "vehicle_type": "CARRO",
+             "hash_brand": f"brand-{rng.randrange(brands)}"}
+            for i in range(vehicles)
+        ])
+        conn.execute(insert(Label), [
+            {"name": f"LABEL{i}", "id_seller": rng.randint(1, sellers)} for i in range(sellers * 5)
+        ])
+
+        product_rows, image_rows, compat_rows = [], [], []
+        for i in range(products):
+            cod_product = f"P{i:06d}"
+            product_rows.append({
+                "cod_product": cod_product,
+                "name_product": f"PRODUCT {i}",
+                "description": "",
+                "is_manufactured": rng.random() < 0.7,
+                "hash_category": f"cat-{rng.randrange(categories)}",
+                "id_seller": rng.randint(1, sellers),
+            })
+            image_rows += [
+                {"cod_product": cod_product, "id_image": f"{cod_product}-{n}", "url": f"https://cdn/{cod_product}-{n}.webp"}
+                for n in range(1, rng.randint(1, 3) + 1)
+            ]
+            compat_rows += [
+                {"cod_product": cod_product, "vehicle_name": name}
+                for name in {f"VEHICLE{rng.randrange(vehicles)}" for _ in range(rng.randint(1, 4))}
+            ]
+
+        conn.execute(insert(Product), product_rows)
+        conn.execute(insert(Images), image_rows)
+        conn.execute(insert(Compatibility), compat_rows)
+
+
+def explain(engine, repeat):
+    results = {}
+
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+
+        for name, sql, params in HOT_QUERIES:
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                conn.execute(text(sql), params).fetchall()
+            elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+            results[name] = (plan, elapsed_ms)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--sellers", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+
+    indexes = model_indexes()
+    for index in indexes:
+        index.drop(engine)
+
+    seed(engine, args.products, args.sellers, args.seed)
+    before = explain(engine, args.repeat)
+
+    for index in indexes:
+        index.create(engine)
+
+    after = explain(engine, args.repeat)
+
+    for name, _, _ in HOT_QUERIES:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+
+        print(f"== {name}")
+        print(f"   before ({ms_before:.3f} ms): {' | '.join(plan_before)}")
+        print(f"   after  ({ms_after:.3f} ms): {' | '.join(plan_after)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark runner.
+
+Generates a deterministic catalog, loads it into a fresh database (a temporary SQLite
+file by default, or --database-url for a local MySQL/Postgres schema that will be
+dropped and recreated), runs the timing scenarios through the Flask test client and
+writes the results as JSON so two commits can be compared with benchmarks.compare.
+
+    python -m benchmarks.run --scale small --output before.json
+    python -m benchmarks.run --scale small --output after.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# The app reads these at import time; benchmarks never talk to AWS
+os.environ.setdefault("JWT_ACCESS_TOKEN_EXPIRES", "3600")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("HASH_SECRET_KEY", "benchmark")
+os.environ.setdefault("API_TOKEN", "benchmark")
+
+import sqlalchemy
+from app import create_app
+from app.extensions import db
+from config.settings import Config
+from benchmarks.generator import CatalogSpec, SCALES, generate_catalog, load_catalog
+from benchmarks.scenarios import build_context, build_scenarios
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--products", type=int, help="override the number of products of the scale")
+    parser.add_argument("--sellers", type=int)
+    parser.add_argument("--vehicles", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--repeat", type=int, default=20, help="timed iterations per scenario")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--import-rows", type=int, default=200)
+    parser.add_argument("--only", nargs="*", help="scenario names or groups to run")
+    parser.add_argument("--output", help="JSON file to write (stdout when omitted)")
+
+    return parser.parse_args()
+
+
+def make_app(database_url):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        # Measure the application, not gzip or the per-key rate limits
+        COMPRESS_ENABLED = False
+        RATE_LIMIT_ENABLED = False
+
+    return create_app(BenchmarkConfig)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_server_timing(header):
+    """'db;dur=1.2;desc="5 queries", total;dur=3.4' -> {"db": (1.2, 5), "total": (3.4, None)}"""
+    timings = {}
+
+    for metric in filter(None, (part.strip() for part in (header or "").split(","))):
+        name, *params = metric.split(";")
+        duration, queries = None, None
+
+        for param in params:
+            key, _, value = param.partition("=")
+            if key == "dur":
+                duration = float(value)
+            elif key == "desc" and value.strip('"').endswith("queries"):
+                queries = int(value.strip('"').split()[0])
+
+        timings[name] = (duration, queries)
+
+    return timings
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean": statistics.fmean(ordered),
+        "max": ordered[-1],
+    }
+
+
+def run_scenario(client, scenario, ctx, headers, repeat, warmup):
+    wall, db_time, queries, sizes = [], [], [], []
+
+    for iteration in range(warmup + repeat):
+        start = time.perf_counter()
+        response = scenario.request(client, ctx, headers, iteration)
+        body = response.get_data()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if response.status_code >= 400:
+            return {"error": f"HTTP {response.status_code}: {body[:200].decode(errors='replace')}"}
+
+        if iteration < warmup:
+            continue
+
+        wall.append(elapsed_ms)
+        sizes.append(len(body))
+
+        db_timing = parse_server_timing(response.headers.get("Server-Timing")).get("db")
+        if db_timing:
+            db_time.append(db_timing[0])
+            queries.append(db_timing[1])
+
+    result = {"iterations": repeat, "wall_ms": summarize(wall), "response_bytes": max(sizes)}
+
+    if db_time:
+        result["db_ms"] = summarize(db_time)
+        result["queries"] = max(queries)
+
+    return result
+
+
+def main():
+    args = parse_args()
+
+    spec = CatalogSpec.from_scale(
+        args.scale, products=args.products, sellers=args.sellers, vehicles=args.vehicles, seed=args.seed
+    )
+
+    workdir = None
+    database_url = args.database_url
+    if not database_url:
+        workdir = tempfile.mkdtemp(prefix="mbdatastream-bench-")
+        database_url = f"sqlite:///{os.path.join(workdir, 'catalog.db')}"
+
+    app = make_app(database_url)
+    headers = {"API-Key": os.environ["API_TOKEN"]}
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+
+        db.drop_all()
+        db.create_all()
+
+        started = time.perf_counter()
+        catalog = generate_catalog(spec)
+        generate_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with db.engine.begin() as connection:
+            row_counts = load_catalog(connection, catalog)
+        load_seconds = time.perf_counter() - started
+
+    ctx = build_context(catalog)
+    client = app.test_client()
+
+    results = {}
+    for scenario in build_scenarios(args.import_rows):
+        if args.only and scenario.name not in args.only and scenario.group not in args.only:
+            continue
+
+        if not scenario.supports(dialect):
+            results[scenario.name] = {"group": scenario.group, "skipped": f"requires {', '.join(scenario.dialects)}"}
+            continue
+
+        print(f"running {scenario.name}...", file=sys.stderr)
+        outcome = run_scenario(
+            client, scenario, ctx, headers,
+            repeat=scenario.repeat or args.repeat,
+            warmup=min(args.warmup, 1) if scenario.repeat else args.warmup
+        )
+        results[scenario.name] = {"group": scenario.group, **outcome}
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "dialect": dialect,
+            "scale": args.scale,
+            "spec": spec.as_dict(),
+            "rows": row_counts,
+            "generate_seconds": round(generate_seconds, 3),
+            "load_seconds": round(load_seconds, 3),
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return report
+
+
+if __name__ == "__main__":
+    main()
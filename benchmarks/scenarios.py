@@ -0,0 +1,122 @@
+"""
+Timing scenarios driven through the Flask test client.
+
+Each scenario issues one request per iteration against the generated catalog.
+`dialects` restricts scenarios that rely on engine-specific SQL (the showcase
+queries use MySQL JSON functions).
+"""
+import io
+import pandas as pd
+from benchmarks.generator import import_rows
+
+
+class Scenario:
+    def __init__(self, name, group, request, dialects=None, repeat=None):
+        self.name = name
+        self.group = group
+        self.request = request
+        self.dialects = dialects
+        self.repeat = repeat
+
+    def supports(self, dialect):
+        return self.dialects is None or dialect in self.dialects
+
+
+def build_context(catalog):
+    """Picks stable targets (seller, category, vehicle, ...) from the generated rows."""
+    from app.models import Compatibility, Label, Product, SellerBrands, SellerCategories
+
+    id_seller = 1
+    products = [p for p in catalog[Product] if p["id_seller"] == id_seller]
+    product_codes = {p["cod_product"] for p in products}
+    vehicle_name = next(c["vehicle_name"] for c in catalog[Compatibility] if c["cod_product"] in product_codes)
+
+    return {
+        "id_seller": id_seller,
+        "cod_product": products[len(products) // 2]["cod_product"],
+        "hash_category": next(sc["hash_category"] for sc in catalog[SellerCategories] if sc["id_seller"] == id_seller),
+        "hash_brand": next(sb["hash_brand"] for sb in catalog[SellerBrands] if sb["id_seller"] == id_seller),
+        "vehicle_name": vehicle_name,
+        "search_term": products[0]["name_product"].split()[0],
+        "autocomplete_prefix": products[0]["name_product"][:3],
+        "batch_codes": [p["cod_product"] for p in products[:48]],
+        "label": next(label["name"] for label in catalog[Label] if label["id_seller"] == id_seller),
+        "catalog": catalog,
+    }
+
+
+def _get(path):
+    def run(client, ctx, headers, iteration):
+        return client.get(path.format(**ctx), headers=headers)
+
+    return run
+
+
+def _post_json(path, **body_from_ctx):
+    def run(client, ctx, headers, iteration):
+        body = {field: ctx[key] for field, key in body_from_ctx.items()}
+
+        return client.post(path.format(**ctx), json=body, headers=headers)
+
+    return run
+
+
+def _import(row_count):
+    def run(client, ctx, headers, iteration):
+        # Fresh product codes every iteration, so each run takes the insert path
+        rows = import_rows(ctx["catalog"], row_count, prefix=f"IMP{iteration:03d}-", seed=iteration)
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_excel(buffer, index=False)
+        buffer.seek(0)
+
+        return client.post(
+            "/product/create-from-csv",
+            data={"file": (buffer, "benchmark.xlsx")},
+            headers=headers,
+            content_type="multipart/form-data"
+        )
+
+    return run
+
+
+def build_scenarios(import_row_count=200):
+    return [
+        Scenario("list_all", "listing", _get("/product/all?page=1&per_page=16")),
+        Scenario("list_by_seller", "listing", _get("/product/get-all-by-seller/{id_seller}?per_page=48")),
+        Scenario("list_by_seller_sparse", "listing",
+                 _get("/product/get-all-by-seller/{id_seller}?per_page=48&fields=cod_product,name_product,image")),
+        # Sparse page larger than DOCUMENT_CHUNK_SIZE: the projection runs over several chunks
+        Scenario("list_all_sparse_large", "listing",
+                 _get("/product/all?per_page=900&fields=name_product&include=images,image_variants")),
+        Scenario("list_by_seller_deep_page", "listing",
+                 _get("/product/get-all-by-seller/{id_seller}?page=40&per_page=16")),
+        Scenario("list_by_category", "listing",
+                 _get("/product/category/{hash_category}?id_seller={id_seller}&per_page=48")),
+        Scenario("list_manufactured", "listing",
+                 _get("/product/get-all-by-seller/{id_seller}?is_manufactured=true&per_page=48")),
+        Scenario("categories_by_seller", "listing", _get("/category/all?id_seller={id_seller}")),
+        Scenario("vehicles_by_seller", "listing", _get("/vehicle/all?id_seller={id_seller}&per_page=48")),
+        Scenario("vehicles_by_brand", "listing", _get("/vehicle/brand/{hash_brand}?id_seller={id_seller}")),
+        Scenario("product_detail", "listing", _get("/product/{cod_product}")),
+        Scenario("product_batch", "listing", _post_json("/product/batch", codes="batch_codes")),
+        Scenario("search_contains", "search", _get("/product/search/{search_term}?id_seller={id_seller}")),
+        Scenario("search_exact", "search", _get("/product/search/{cod_product}?id_seller={id_seller}&exact=true")),
+        Scenario("autocomplete", "search", _get("/autocomplete/{id_seller}?q={autocomplete_prefix}")),
+        Scenario("autocomplete_vehicle", "search", _get("/autocomplete/{id_seller}?q={vehicle_name}&types=vehicles")),
+        Scenario("compat_lookup", "compatibility",
+                 _get("/product/compatibility/{vehicle_name}?id_seller={id_seller}&exact=true")),
+        Scenario("compat_lookup_contains", "compatibility",
+                 _get("/product/compatibility/{vehicle_name}?id_seller={id_seller}")),
+        Scenario("compat_all", "compatibility",
+                 _get("/product/compatibility-all/{vehicle_name}?id_seller={id_seller}")),
+        Scenario("showcase_items", "showcase",
+                 _get("/seller-db/get-seller-custom-showcase-items/{id_seller}"), dialects=("mysql",)),
+        Scenario("showcase_label", "showcase",
+                 _get("/seller-db/get-seller-custom-showcase/{id_seller}/{label}"), dialects=("mysql",)),
+        Scenario("showcase_labels", "showcase", _get("/seller-db/get-all-labels/{id_seller}")),
+        Scenario("export_json", "export", _get("/product/extract-all-xlsx/{id_seller}?format=json"), repeat=3),
+        Scenario("export_xlsx", "export", _get("/product/extract-all-xlsx/{id_seller}"), repeat=3),
+        Scenario("export_parquet", "export", _get("/product/extract-all-xlsx/{id_seller}?format=parquet"), repeat=3),
+        Scenario("export_arrow", "export", _get("/product/extract-all-xlsx/{id_seller}?format=arrow"), repeat=3),
+        Scenario("import_xlsx", "import", _import(import_row_count), repeat=3),
+    ]
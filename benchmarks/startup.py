@@ -0,0 +1,75 @@
+"""
+Worker startup cost: time to import the app package, time to run create_app(),
+resident memory afterwards and which heavy dependencies got imported on the way.
+
+Every sample runs in a fresh interpreter (like a new gunicorn worker without preload),
+so module caches never leak between samples.
+
+    python -m benchmarks.startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "boto3", "botocore", "PIL", "pyarrow")
+
+PROBE = """
+import json, os, resource, sys, time
+os.environ.setdefault("JWT_ACCESS_TOKEN_EXPIRES", "3600")
+os.environ.setdefault("AWS_DATABASE_URL", "sqlite://")
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "heavy": sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+
+def sample():
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE % (HEAVY_MODULES,)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        text=True
+    )
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="JSON file to write (stdout when omitted)")
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "import_ms": statistics.median(s["import_ms"] for s in samples),
+        "create_app_ms": statistics.median(s["create_app_ms"] for s in samples),
+        "max_rss_mb": statistics.median(s["max_rss_mb"] for s in samples),
+        "modules": samples[-1]["modules"],
+        "heavy_modules_loaded": samples[-1]["heavy"],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,4 +9,86 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.environ.get('AWS_DATABASE_URL')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
-    JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES'))
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES'))
+
+    # Connection pool of the sync (Flask-SQLAlchemy) engine, per worker process.
+    # Each gunicorn worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below MySQL's max_connections
+    # (leave room for migrations and the importer). With gthread workers, size the pool
+    # to the thread count: DB_POOL_SIZE = threads, DB_MAX_OVERFLOW = a few spare.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    # Recycle before MySQL wait_timeout / proxy idle timeouts drop the connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Compiled statement cache entries, per engine (SQLAlchemy default: 500)
+    DB_QUERY_CACHE_SIZE = int(os.environ.get('DB_QUERY_CACHE_SIZE', 1200))
+    DB_CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', 10))
+    # Comma-separated read replica URLs. Each gets its own pool sized like the primary's
+    # (count them in the max_connections budget of the replica); GET requests read from one.
+    DB_REPLICA_URLS = os.environ.get('DB_REPLICA_URLS', '')
+
+    # Spreadsheet import: concurrent shards per import (?workers= overrides, up to the max).
+    # Each shard holds one connection of the import's own pool while it runs.
+    IMPORT_WORKERS = int(os.environ.get('IMPORT_WORKERS', 4))
+    IMPORT_MAX_WORKERS = int(os.environ.get('IMPORT_MAX_WORKERS', 8))
+
+    # POST /product/batch: product codes accepted per request
+    PRODUCT_BATCH_MAX_CODES = int(os.environ.get('PRODUCT_BATCH_MAX_CODES', 100))
+
+    # Response compression (gzip/brotli)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_CACHE_SIZE = int(os.environ.get('COMPRESS_CACHE_SIZE', 0))
+
+    # Per-request instrumentation (Server-Timing header and /metrics)
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() == 'true'
+    # /autocomplete: in-memory prefix indexes, per worker. The seller's catalog_version is
+    # re-read at most every AUTOCOMPLETE_RECHECK_SECONDS, so edits show up within that delay.
+    AUTOCOMPLETE_RECHECK_SECONDS = float(os.environ.get('AUTOCOMPLETE_RECHECK_SECONDS', 2))
+    AUTOCOMPLETE_MAX_SELLERS = int(os.environ.get('AUTOCOMPLETE_MAX_SELLERS', 64))
+
+    # Shared cache (app/cache): per-worker L1 LRU in front of an L2 store shared by the workers.
+    # CACHE_BACKEND: sqlite (one file per host, CACHE_URL = its path), redis (CACHE_URL =
+    # redis://host:6379/0, for several hosts), memory (per process, tests) or none.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+    CACHE_URL = os.environ.get('CACHE_URL')
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'mbds:')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+    CACHE_L1_MAX_ENTRIES = int(os.environ.get('CACHE_L1_MAX_ENTRIES', 2048))
+    CACHE_L1_MAX_BYTES = int(os.environ.get('CACHE_L1_MAX_BYTES', 64 * 1024 * 1024))
+    # Other workers' invalidations reach a worker's L1 within this many seconds
+    CACHE_L1_TTL = float(os.environ.get('CACHE_L1_TTL', 5))
+
+    # Identical concurrent GETs of the expensive endpoints (showcase, compatibility) run once
+    # and share the response. SINGLE_FLIGHT_SHARED also coalesces across workers through a lock
+    # in the shared cache; waiters give up and run the view themselves after the timeout.
+    SINGLE_FLIGHT_ENABLED = os.environ.get('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+    SINGLE_FLIGHT_SHARED = os.environ.get('SINGLE_FLIGHT_SHARED', 'false').lower() == 'true'
+    SINGLE_FLIGHT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 10))
+    SINGLE_FLIGHT_POLL_INTERVAL = float(os.environ.get('SINGLE_FLIGHT_POLL_INTERVAL', 0.025))
+
+    # Per-API-key token buckets (app/middleware/rate_limit.py). RATE_LIMITS: "class:rate:burst"
+    # with rate in requests per second; exports and imports have their own budgets.
+    # RATE_LIMIT_STORAGE: memory (per worker) or cache (shared through CACHE_BACKEND).
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', 'default:20:60,export:0.05:3,import:0.02:2')
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    # Listing requests cost one extra token per this many rows skipped by ?page= / ?per_page=
+    RATE_LIMIT_DEEP_PAGE_ITEMS = int(os.environ.get('RATE_LIMIT_DEEP_PAGE_ITEMS', 2000))
+    RATE_LIMIT_MAX_COST = int(os.environ.get('RATE_LIMIT_MAX_COST', 10))
+
+    # Resized copies of product images (app/services/image_variant_service.py): one per size
+    # (longest edge, pixels) and format, rendered by IMAGE_VARIANT_WORKERS processes per worker.
+    # Needs Pillow; existing images get theirs from flask backfill-image-variants.
+    IMAGE_VARIANTS_ENABLED = os.environ.get('IMAGE_VARIANTS_ENABLED', 'true').lower() == 'true'
+    IMAGE_VARIANT_SIZES = os.environ.get('IMAGE_VARIANT_SIZES', '320,640')
+    IMAGE_VARIANT_FORMATS = os.environ.get('IMAGE_VARIANT_FORMATS', 'webp,jpeg')
+    IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+    IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+    # Seconds an upload waits for its variants before storing the image without them
+    IMAGE_VARIANT_TIMEOUT = float(os.environ.get('IMAGE_VARIANT_TIMEOUT', 30))
@@ -0,0 +1,120 @@
+"""
+Gunicorn production profile.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment (GUNICORN_*). The app is
+preloaded in the master and the heap is frozen before forking, so workers share
+the imported code copy-on-write; each worker then drops the DB connections and
+boto3 clients inherited from the master and opens its own.
+
+Database budget: workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections per
+container, see config/settings.py.
+"""
+import gc
+import importlib
+import multiprocessing
+import os
+
+
+def _available_cpus():
+    """CPUs this container may use: affinity mask capped by the cgroup v2 CPU quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+
+    return int(value) if value else default
+
+
+cpus = _available_cpus()
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# gthread: a few threads per worker overlap DB/S3 waits without the memory of extra processes.
+# "sync" restores the old behaviour; "gevent" needs gevent installed in the image and
+# GUNICORN_PRELOAD=false, so the monkey patching happens before the app is imported.
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "sync":
+    workers = _env_int("GUNICORN_WORKERS", cpus * 2 + 1)
+    threads = 1
+else:
+    workers = _env_int("GUNICORN_WORKERS", cpus + 1)
+    threads = _env_int("GUNICORN_THREADS", 4)
+
+if worker_class == "gevent":
+    worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 200)
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Spreadsheet imports/exports run inside the request
+timeout = _env_int("GUNICORN_TIMEOUT", 300)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Recycle workers now and then so fragmentation from large imports does not accumulate
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 2000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 200)
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+# Optional: heavy modules imported once in the master (e.g. "pandas,openpyxl") so workers
+# share them instead of each importing them on the first import/export request
+preload_modules = [m.strip() for m in os.environ.get("GUNICORN_PRELOAD_MODULES", "").split(",") if m.strip()]
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    for module in preload_modules:
+        importlib.import_module(module)
+
+    # Move everything imported so far out of the GC generations: collections in the workers
+    # would otherwise touch (and un-share) every object header inherited from the master
+    gc.collect()
+    gc.freeze()
+
+    server.log.info("Preloaded app, %d workers x %d threads (%s)", workers, threads, worker_class)
+
+
+def post_fork(server, worker):
+    from app.dal.S3_client import S3ClientSingleton
+    from app.dal.dynamo_client import DynamoSingleton
+
+    # boto3 clients hold connection pools and are not fork-safe
+    S3ClientSingleton.reset_instance()
+    DynamoSingleton.reset_instance()
+
+    if not preload_app:
+        return
+
+    from app.extensions import db
+
+    flask_app = server.app.wsgi()
+
+    # close=False: leave the parent's sockets alone, just forget them in this process
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    async_engine = getattr(db, "async_engine", None)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)